@@ -0,0 +1,853 @@
+"""
+Storage backends for PerformanceCache
+The default keeps entries in an in-process TLRU cache. The shared backend keeps
+them in one local cache server so every uvicorn worker sees the same entries.
+SQLiteL2Store is an optional persistent tier behind either of them
+"""
+import os
+import base64
+import heapq
+import json
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from cachetools import Cache, TLRUCache
+try:
+    import fcntl
+except ImportError:  # Windows - named pipes leave no stale socket files to guard
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def entry_size(entry: Any) -> int:
+    """Size of a cache entry as recorded by PerformanceCache.set"""
+    if isinstance(entry, dict):
+        return entry.get("size_bytes", 1)
+    return 1
+
+def entry_expiry(ttl: float) -> Callable[[Any, Any, float], float]:
+    """
+    TLRUCache ttu - entries are dropped at their own stale_until (kept past
+    expiry as a stale fallback; readers treat them as expired) or expires_at,
+    else after ttl
+    """
+    def ttu(key: Any, value: Any, now: float) -> float:
+        if isinstance(value, dict) and "expires_at" in value:
+            return value.get("stale_until") or value["expires_at"]
+        return now + ttl
+    return ttu
+
+class CacheBackend(ABC):
+    """
+    Key/value store for one data type
+    Implementations own expiry - each entry's expires_at, falling back to ttl -
+    and capacity - maxsize entries, or max_bytes of payload when a byte budget is set
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        ...
+
+    @abstractmethod
+    def pop(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @property
+    @abstractmethod
+    def bytes_used(self) -> int:
+        ...
+
+    @abstractmethod
+    def invalidate_tags(self, tags: List[str]) -> List[str]:
+        """Remove every entry carrying all of tags; returns the removed keys"""
+        ...
+
+    @abstractmethod
+    def expiries(self, keys: List[str]) -> Dict[str, float]:
+        """expires_at of the entries cached under keys, without touching their recency"""
+        ...
+
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+
+class TTLCacheBackend(CacheBackend):
+    """In-process TLRU cache - private to one worker and not thread-safe on its own"""
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: Optional[int] = None):
+        super().__init__(maxsize, ttl, max_bytes)
+        self._cache = _make_ttl_cache(maxsize, ttl, max_bytes)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._cache.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self._cache[key] = value
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        return self._cache.pop(key, default)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def bytes_used(self) -> int:
+        return _bytes_used(self._cache)
+
+    def invalidate_tags(self, tags: List[str]) -> List[str]:
+        return _invalidate_tags(self._cache, tags)
+
+    def expiries(self, keys: List[str]) -> Dict[str, float]:
+        return _expiries(self._cache, keys)
+
+    @property
+    def used(self) -> int:
+        """Capacity in use - bytes with a byte budget, else entries"""
+        return int(self._cache.currsize)
+
+    def evict_one(self, keep: Optional[str] = None) -> bool:
+        """
+        Free some capacity: expired entries first, else the least recently
+        used entry other than keep. False when there is nothing to evict
+        """
+        before = self._cache.currsize
+        self._cache.expire()
+        if self._cache.currsize < before:
+            return True
+        if not self._cache or (len(self._cache) == 1 and keep in self._cache):
+            return False
+        key, value = self._cache.popitem()
+        if key == keep:
+            # Other threads read every other entry of this shard after keep was
+            # set - evict the next least recently used entry and put keep back
+            self._cache.popitem()
+            self._cache[keep] = value
+        return True
+
+class StripedCacheBackend(CacheBackend):
+    """
+    Thread-safe in-process cache split into independently locked shards
+    Keys are data_type:user_id, so each user always lands on the same stripe
+    and threads working on different users rarely contend. Capacity (entries
+    or bytes) is one budget shared by all shards: any entry up to max_bytes
+    fits, and a set that takes the total over budget evicts from the fullest
+    shards, one lock at a time
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: Optional[int] = None, stripes: int = 16):
+        super().__init__(maxsize, ttl, max_bytes)
+        stripes = max(1, stripes)
+        self._shards: List[TTLCacheBackend] = [TTLCacheBackend(maxsize, ttl, max_bytes) for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def _used(self) -> int:
+        # Unlocked reads of each shard's counter - an estimate is enough to decide on eviction
+        return sum(shard.used for shard in self._shards)
+
+    def _enforce_capacity(self, keep: str):
+        capacity = self.max_bytes or self.maxsize
+        while self._used() > capacity:
+            for i in sorted(range(len(self._shards)), key=lambda i: self._shards[i].used, reverse=True):
+                with self._locks[i]:
+                    if self._shards[i].evict_one(keep):
+                        break
+            else:
+                return
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self._stripe(key)
+        with self._locks[i]:
+            return self._shards[i].get(key, default)
+
+    def set(self, key: str, value: Any):
+        i = self._stripe(key)
+        with self._locks[i]:
+            self._shards[i].set(key, value)
+        # Outside the shard lock, so no thread ever holds two stripe locks
+        self._enforce_capacity(key)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        i = self._stripe(key)
+        with self._locks[i]:
+            return self._shards[i].pop(key, default)
+
+    def clear(self):
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                shard.clear()
+
+    def __len__(self) -> int:
+        total = 0
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                total += len(shard)
+        return total
+
+    @property
+    def bytes_used(self) -> int:
+        total = 0
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                total += shard.bytes_used
+        return total
+
+    def invalidate_tags(self, tags: List[str]) -> List[str]:
+        removed = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                removed.extend(shard.invalidate_tags(tags))
+        return removed
+
+    def expiries(self, keys: List[str]) -> Dict[str, float]:
+        by_stripe: Dict[int, List[str]] = {}
+        for key in keys:
+            by_stripe.setdefault(self._stripe(key), []).append(key)
+        found = {}
+        for i, stripe_keys in by_stripe.items():
+            with self._locks[i]:
+                found.update(self._shards[i].expiries(stripe_keys))
+        return found
+
+class TagIndex:
+    """
+    Secondary index from tags (user:<id>, course:<id>, type:<data_type>, ...)
+    to cache keys. Expiry is tracked with a heap of expires_at so the index
+    sheds expired keys without scanning, whatever the cache does internally
+    """
+
+    def __init__(self):
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._tags_by_key: Dict[str, Tuple[Tuple[str, ...], float]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+
+    def add(self, key: str, tags: Iterable[str], expires_at: float):
+        self.discard(key)
+        tags = tuple(tags)
+        if not tags:
+            return
+        self._tags_by_key[key] = (tags, expires_at)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        heapq.heappush(self._expiry, (expires_at, key))
+        self.prune()
+
+    def discard(self, key: str):
+        indexed = self._tags_by_key.pop(key, None)
+        if not indexed:
+            return
+        for tag in indexed[0]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def prune(self, now: Optional[float] = None):
+        """Drop keys whose expiry has passed"""
+        now = now or time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            indexed = self._tags_by_key.get(key)
+            # A re-set key has a newer expiry and a newer heap item
+            if indexed and indexed[1] == expires_at:
+                self.discard(key)
+
+    def keys_matching(self, tags: List[str]) -> Set[str]:
+        """Keys carrying every tag - cost is bounded by the smallest tag set"""
+        self.prune()
+        if not tags:
+            return set()
+        key_sets = sorted((self._keys_by_tag.get(tag, set()) for tag in tags), key=len)
+        keys = set(key_sets[0])
+        for other in key_sets[1:]:
+            keys &= other
+        return keys
+
+    def clear(self):
+        self._keys_by_tag.clear()
+        self._tags_by_key.clear()
+        self._expiry.clear()
+
+class TaggedTLRUCache(TLRUCache):
+    """TLRUCache that keeps a TagIndex of each value's tags in step with evictions"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tag_index = TagIndex()
+
+    def __setitem__(self, key, value, cache_setitem=Cache.__setitem__):
+        super().__setitem__(key, value)
+        if isinstance(value, dict) and value.get("tags") and key in self:
+            self.tag_index.add(key, value["tags"], self.ttu(key, value, self.timer()))
+
+    def __delitem__(self, key):
+        # Capacity eviction (popitem), pop() and clear() all come through here
+        try:
+            super().__delitem__(key)
+        finally:
+            self.tag_index.discard(key)
+
+    def clear(self):
+        super().clear()
+        self.tag_index.clear()
+
+def _invalidate_tags(cache: TaggedTLRUCache, tags: List[str]) -> List[str]:
+    removed = []
+    for key in cache.tag_index.keys_matching(tags):
+        if cache.pop(key, None) is not None:
+            removed.append(key)
+        cache.tag_index.discard(key)
+    return removed
+
+def _expiries(cache: TLRUCache, keys: List[str]) -> Dict[str, float]:
+    # Cache.__getitem__ skips TLRUCache's recency update (and its expiry check -
+    # an expired entry not yet purged just reports its past expires_at)
+    found = {}
+    for key in keys:
+        try:
+            value = Cache.__getitem__(cache, key)
+        except KeyError:
+            continue
+        if isinstance(value, dict) and "expires_at" in value:
+            found[key] = value["expires_at"]
+    return found
+
+def _make_ttl_cache(maxsize: int, ttl: float, max_bytes: Optional[int]) -> TaggedTLRUCache:
+    """
+    Per-entry TTL cache capped by entry count, or by entry_size() bytes when
+    max_bytes is set. Expiry uses wall-clock time to match cached_at/expires_at
+    """
+    if max_bytes:
+        # Expired entries go first, then least recently used until the new one fits
+        return TaggedTLRUCache(maxsize=max_bytes, ttu=entry_expiry(ttl), timer=time.time, getsizeof=entry_size)
+    return TaggedTLRUCache(maxsize=maxsize, ttu=entry_expiry(ttl), timer=time.time)
+
+def _bytes_used(cache: TLRUCache) -> int:
+    if cache.getsizeof is entry_size:
+        return int(cache.currsize)
+    return sum(entry_size(entry) for entry in list(cache.values()))
+
+def wire_encode(message: Any) -> bytes:
+    """
+    JSON wire format of the shared cache - never pickle, so a peer can only
+    ever send data. bytes values travel as {"__bytes__": base64}; anything
+    else JSON cannot encode becomes a string, as in the L2 store
+    """
+    return json.dumps(message, default=_encode_wire_value, separators=(",", ":")).encode()
+
+def wire_decode(raw: bytes) -> Any:
+    return json.loads(raw, object_hook=_decode_wire_value)
+
+def _encode_wire_value(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    return str(value)
+
+def _decode_wire_value(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+def is_socket_path(address: Any) -> bool:
+    """Unix socket path (as opposed to a (host, port) pair or a Windows named pipe)"""
+    return isinstance(address, str) and not address.startswith("\\\\")
+
+def default_server_address() -> str:
+    """A named pipe on Windows, else a socket in a per-user 0700 directory"""
+    if sys.platform == "win32":
+        return r"\\.\pipe\easeboard-cache"
+    return os.path.join(tempfile.gettempdir(), f"easeboard-cache-{os.getuid()}", "cache.sock")
+
+def _private_dir(path: str) -> str:
+    """Create the socket's directory as 0700 and refuse one another user could write to"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise PermissionError(f"Shared cache directory {directory} must be private to this user (0700)")
+    return directory
+
+@contextmanager
+def _server_start_lock(address: Any):
+    """Serialize workers deciding who hosts the server (and who clears a stale socket)"""
+    if not is_socket_path(address) or fcntl is None:
+        yield
+        return
+    _private_dir(address)
+    with open(address + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+class SharedCacheServer:
+    """
+    Local cache server holding one TLRU cache per namespace
+    Clients talk to it over an authenticated multiprocessing connection
+    (a 0600 Unix socket by default, or TCP on localhost), one thread per
+    client, exchanging JSON messages (see wire_encode)
+    """
+
+    def __init__(self, address: Any, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.caches: Dict[str, TaggedTLRUCache] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+
+    def start(self) -> "SharedCacheServer":
+        """Bind and serve in a daemon thread; raises OSError if the address is taken"""
+        if is_socket_path(self.address):
+            _private_dir(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        if is_socket_path(self.address):
+            os.chmod(self.address, 0o600)
+        thread = threading.Thread(target=self._accept_loop, name="shared-cache-server", daemon=True)
+        thread.start()
+        logger.info(f"🗄️ Shared cache server listening on {self.address}")
+        return self
+
+    def stop(self):
+        if self._listener:
+            self._listener.close()
+            self._listener = None
+
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._listener is not None:
+                    logger.error(f"Shared cache accept error: {e}")
+                    continue
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    raw = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ["ok", self.handle(*wire_decode(raw))]
+                except Exception as e:
+                    reply = ["error", str(e)]
+                conn.send_bytes(wire_encode(reply))
+
+    def handle(self, op: str, namespace: str, *args) -> Any:
+        """Execute one command against the namespace cache"""
+        with self._lock:
+            if op == "configure":
+                maxsize, ttl, max_bytes = args
+                if namespace not in self.caches:
+                    self.caches[namespace] = _make_ttl_cache(maxsize, ttl, max_bytes)
+                return None
+            cache = self.caches[namespace]
+            if op == "get":
+                return cache.get(args[0])
+            if op == "set":
+                cache[args[0]] = args[1]
+                return None
+            if op == "pop":
+                return cache.pop(args[0], None)
+            if op == "clear":
+                cache.clear()
+                return None
+            if op == "len":
+                return len(cache)
+            if op == "bytes":
+                return _bytes_used(cache)
+            if op == "invalidate_tags":
+                return _invalidate_tags(cache, args[0])
+            if op == "expiries":
+                return _expiries(cache, args[0])
+        raise ValueError(f"Unknown shared cache op: {op}")
+
+class SharedCacheClient:
+    """
+    Connection to the shared cache server, shared by all backends of a process
+    If nobody is serving the address, this process starts the server itself,
+    so the first worker up hosts the cache for the others
+    """
+
+    def __init__(self, address: Any, authkey: bytes, autostart: bool = True):
+        self.address = address
+        self.authkey = authkey
+        self.autostart = autostart
+        self.server: Optional[SharedCacheServer] = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, Tuple[int, float, Optional[int]]] = {}
+
+    def register(self, namespace: str, maxsize: int, ttl: float, max_bytes: Optional[int] = None):
+        self._namespaces[namespace] = (maxsize, ttl, max_bytes)
+        try:
+            self.call("configure", namespace, maxsize, ttl, max_bytes)
+        except ConnectionError as e:
+            logger.warning(f"Shared cache unavailable at startup: {e}")
+
+    def _connect(self):
+        try:
+            conn = Client(self.address, authkey=self.authkey)
+        except (ConnectionRefusedError, FileNotFoundError):
+            if not self.autostart:
+                raise
+            conn = self._start_server()
+
+        # Namespaces are (re)declared on every connect so a restarted
+        # server picks up the cache sizes again
+        for namespace, config in self._namespaces.items():
+            conn.send_bytes(wire_encode(["configure", namespace, *config]))
+            conn.recv_bytes()
+        return conn
+
+    def _start_server(self):
+        """Host the server in this process unless another worker already does, then connect"""
+        with _server_start_lock(self.address):
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except (ConnectionRefusedError, FileNotFoundError):
+                pass
+            if is_socket_path(self.address) and os.path.exists(self.address):
+                # Left behind by a server that died - nobody is listening on it
+                os.unlink(self.address)
+            try:
+                self.server = SharedCacheServer(self.address, self.authkey).start()
+            except OSError:
+                # TCP port already bound by another worker - connect to it
+                pass
+        return Client(self.address, authkey=self.authkey)
+
+    def call(self, op: str, namespace: str, *args) -> Any:
+        """Send one command, reconnecting once if the connection dropped"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._conn is None:
+                        self._conn = self._connect()
+                    self._conn.send_bytes(wire_encode([op, namespace, *args]))
+                    status, result = wire_decode(self._conn.recv_bytes())
+                    break
+                except (EOFError, OSError) as e:
+                    if self._conn is not None:
+                        self._conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise ConnectionError(f"Shared cache at {self.address} unavailable: {e}")
+        if status == "error":
+            raise RuntimeError(result)
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        if self.server:
+            self.server.stop()
+
+class SharedCacheBackend(CacheBackend):
+    """
+    Backend stored in the shared cache server
+    Writes and invalidations are visible to every worker immediately; if the
+    server is unreachable reads degrade to misses and writes/invalidations are
+    dropped (logged) instead of failing requests - a server that comes back
+    starts empty, so nothing stale survives the outage
+    """
+
+    def __init__(
+        self,
+        client: SharedCacheClient,
+        namespace: str,
+        maxsize: int,
+        ttl: float,
+        max_bytes: Optional[int] = None
+    ):
+        super().__init__(maxsize, ttl, max_bytes)
+        self.client = client
+        self.namespace = namespace
+        client.register(namespace, maxsize, ttl, max_bytes)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self.client.call("get", self.namespace, key)
+        except ConnectionError as e:
+            logger.error(f"Shared cache get failed: {e}")
+            return default
+        return default if value is None else value
+
+    def set(self, key: str, value: Any):
+        try:
+            self.client.call("set", self.namespace, key, value)
+        except ConnectionError as e:
+            logger.error(f"Shared cache set failed: {e}")
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self.client.call("pop", self.namespace, key)
+        except ConnectionError as e:
+            logger.error(f"Shared cache pop failed: {e}")
+            return default
+        return default if value is None else value
+
+    def clear(self):
+        try:
+            self.client.call("clear", self.namespace)
+        except ConnectionError as e:
+            logger.error(f"Shared cache clear failed: {e}")
+
+    def __len__(self) -> int:
+        try:
+            return self.client.call("len", self.namespace)
+        except ConnectionError:
+            return 0
+
+    @property
+    def bytes_used(self) -> int:
+        try:
+            return self.client.call("bytes", self.namespace)
+        except ConnectionError:
+            return 0
+
+    def invalidate_tags(self, tags: List[str]) -> List[str]:
+        try:
+            return self.client.call("invalidate_tags", self.namespace, list(tags))
+        except ConnectionError as e:
+            logger.error(f"Shared cache invalidate failed: {e}")
+            return []
+
+    def expiries(self, keys: List[str]) -> Dict[str, float]:
+        try:
+            return self.client.call("expiries", self.namespace, list(keys))
+        except ConnectionError:
+            return {}
+
+class SQLiteL2Store:
+    """
+    Persistent second-tier cache in a SQLite file, keyed by data_type:user_id
+    Entries keep their cached_at metadata and expire by their own TTL. Writes
+    are queued and applied by a background thread so set() never waits on disk
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str, batch_size: int = 100):
+        self.path = path
+        self.batch_size = batch_size
+        self._read_conn = self._open()
+        self._read_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="cache-l2-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"💽 L2 cache store at {path}")
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                data_type TEXT NOT NULL,
+                value TEXT NOT NULL,
+                cached_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_tags_key ON cache_tags (key)")
+        conn.commit()
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry if it has not expired"""
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def entries(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield (data_type, key, entry) for every unexpired entry"""
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT data_type, key, value FROM cache_entries WHERE expires_at > ?",
+                (time.time(),)
+            ).fetchall()
+        for data_type, key, value in rows:
+            yield data_type, key, json.loads(value)
+
+    def put(self, key: str, data_type: str, entry: Dict[str, Any], ttl: float):
+        """Queue an entry for writing"""
+        cached_at = entry.get("cached_at", time.time())
+        # Pre-encoded JSON bytes are rebuilt on promotion rather than stored twice
+        value = json.dumps({k: v for k, v in entry.items() if k != "json_bytes"}, default=str)
+        expires_at = entry.get("expires_at", cached_at + ttl)
+        self._queue.put(("put", (key, data_type, value, cached_at, expires_at, tuple(entry.get("tags") or ()))))
+
+    def delete(self, key: str):
+        self._queue.put(("delete", (key,)))
+
+    def delete_tags(self, tags: List[str]):
+        """Queue removal of every entry carrying all of tags"""
+        self._queue.put(("delete_tags", tuple(tags)))
+
+    def clear(self):
+        self._queue.put(("clear", ()))
+
+    @property
+    def pending_writes(self) -> int:
+        return self._queue.qsize()
+
+    def _write_loop(self):
+        conn = self._open()
+        while True:
+            ops = [self._queue.get()]
+            # Drain whatever else is queued so bursts commit in one transaction
+            while len(ops) < self.batch_size:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(op is self._STOP for op in ops)
+            try:
+                for op in ops:
+                    if op is self._STOP:
+                        continue
+                    kind, args = op
+                    if kind == "put":
+                        *row, tags = args
+                        conn.execute("INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?)", row)
+                        conn.execute("DELETE FROM cache_tags WHERE key = ?", (row[0],))
+                        conn.executemany("INSERT INTO cache_tags VALUES (?, ?)", [(tag, row[0]) for tag in tags])
+                    elif kind == "delete":
+                        self._delete_keys(conn, [args[0]])
+                    elif kind == "delete_tags":
+                        keys = conn.execute(
+                            " INTERSECT ".join(["SELECT key FROM cache_tags WHERE tag = ?"] * len(args)), args
+                        ).fetchall()
+                        self._delete_keys(conn, [key for (key,) in keys])
+                    elif kind == "clear":
+                        conn.execute("DELETE FROM cache_entries")
+                        conn.execute("DELETE FROM cache_tags")
+                now = time.time()
+                conn.execute(
+                    "DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_entries WHERE expires_at <= ?)", (now,)
+                )
+                conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"L2 cache write failed: {e}")
+                conn.rollback()
+            if stop:
+                conn.close()
+                return
+
+    @staticmethod
+    def _delete_keys(conn: sqlite3.Connection, keys: List[str]):
+        conn.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys])
+        conn.executemany("DELETE FROM cache_tags WHERE key = ?", [(key,) for key in keys])
+
+    def close(self):
+        """Flush queued writes and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(self._STOP)
+            self._writer.join(timeout=10)
+        with self._read_lock:
+            self._read_conn.close()
+
+def create_l2_store(path: Optional[str] = None) -> Optional[SQLiteL2Store]:
+    """Build the L2 store from CACHE_L2_PATH; None when unset"""
+    path = path or os.getenv("CACHE_L2_PATH")
+    return SQLiteL2Store(path) if path else None
+
+# (data_type, maxsize, ttl, max_bytes) -> backend
+BackendFactory = Callable[[str, int, float, Optional[int]], CacheBackend]
+
+def parse_address(address: str) -> Any:
+    """host:port for TCP, anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+def default_lock_stripes() -> int:
+    """
+    One lock under the GIL, 16 stripes on a free-threaded build
+    With the GIL only one thread runs Python at a time, so striping cannot add
+    throughput - cache_benchmark.py measures it slower than one lock - and it
+    makes eviction only approximately LRU across shards. Without the GIL the
+    single lock serializes every thread and striping lets them run in parallel
+    """
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    return 1 if gil_enabled else 16
+
+def create_backend_factory(backend: Optional[str] = None) -> BackendFactory:
+    """
+    Build the backend factory from CACHE_BACKEND (memory | shared)
+    memory is split into CACHE_LOCK_STRIPES locked shards (see default_lock_stripes);
+    shared requires CACHE_SERVER_AUTHKEY (a secret shared by the workers) and
+    listens on CACHE_SERVER_ADDRESS - a socket path or host:port, by default a
+    0600 socket in a per-user directory
+    """
+    backend = (backend or os.getenv("CACHE_BACKEND", "memory")).lower()
+
+    if backend == "memory":
+        stripes = int(os.getenv("CACHE_LOCK_STRIPES") or default_lock_stripes())
+        return lambda data_type, maxsize, ttl, max_bytes=None: StripedCacheBackend(
+            maxsize, ttl, max_bytes, stripes
+        )
+
+    if backend == "shared":
+        authkey = os.getenv("CACHE_SERVER_AUTHKEY")
+        if not authkey:
+            raise ValueError(
+                "CACHE_BACKEND=shared requires CACHE_SERVER_AUTHKEY, e.g. "
+                "CACHE_SERVER_AUTHKEY=$(python -c 'import secrets; print(secrets.token_hex(32))')"
+            )
+        client = SharedCacheClient(
+            parse_address(os.getenv("CACHE_SERVER_ADDRESS") or default_server_address()),
+            authkey.encode()
+        )
+        return lambda data_type, maxsize, ttl, max_bytes=None: SharedCacheBackend(
+            client, data_type, maxsize, ttl, max_bytes
+        )
+
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
@@ -3,42 +3,213 @@ Enhanced Cache Manager with TTL for Canvas LMS Dashboard
 Implements in-memory caching with time-to-live for development speed
 """
 import asyncio
+import json
+import os
+import random
 import time
-from typing import Any, Dict, Optional, Callable, Tuple
-from cachetools import TTLCache
+import zlib
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Any, Awaitable, Dict, List, Optional, Callable, Tuple
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional fast codec
+    lz4_frame = None
+
+from cache_backends import BackendFactory, CacheBackend, SQLiteL2Store, create_backend_factory, create_l2_store
 import threading
 import logging
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class CachePolicy:
+    """
+    Caching policy for one data type - the single source of truth for its TTL
+    ttl, refresh_threshold, jitter and stale_ttl can be tuned at runtime; max_size,
+    max_bytes and compression are fixed when the cache is built
+    """
+    ttl: float
+    max_size: int
+    refresh_threshold: float = 0.8   # fraction of an entry's lifetime before background refresh
+    jitter: float = 0.0              # +/- fraction of ttl applied per entry
+    max_bytes: Optional[int] = None  # byte budget replacing the max_size entry cap
+    compression: Optional[str] = None
+    stale_ttl: float = 0.0           # seconds an expired entry stays stored as a stale fallback
+
+    RUNTIME_FIELDS = ("ttl", "refresh_threshold", "jitter", "stale_ttl")
+
+    def validate(self) -> "CachePolicy":
+        if self.ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if not 0 < self.refresh_threshold <= 1:
+            raise ValueError("refresh_threshold must be in (0, 1]")
+        if not 0 <= self.jitter < 1:
+            raise ValueError("jitter must be in [0, 1)")
+        if self.stale_ttl < 0:
+            raise ValueError("stale_ttl must not be negative")
+        return self
+
+# Data types with hit/miss tracking (tokens are cached but not tracked)
+TRACKED_TYPES = ("grades", "courses", "assignments")
+
+class ThreadLocalCounters:
+    """
+    Counters that each thread increments in its own dict, so increments
+    never race or contend; snapshot() sums every thread's counts
+    """
+    
+    def __init__(self, keys):
+        self._keys = tuple(keys)
+        self._local = threading.local()
+        self._per_thread = []
+        self._register_lock = threading.Lock()
+    
+    def _counts(self) -> Dict[str, float]:
+        counts = getattr(self._local, "counts", None)
+        if counts is None:
+            counts = dict.fromkeys(self._keys, 0)
+            self._local.counts = counts
+            with self._register_lock:
+                self._per_thread.append(counts)
+        return counts
+    
+    def incr(self, key: str, amount: float = 1):
+        counts = self._counts()
+        counts[key] = counts.get(key, 0) + amount
+    
+    def snapshot(self) -> Dict[str, float]:
+        with self._register_lock:
+            per_thread = list(self._per_thread)
+        totals = dict.fromkeys(self._keys, 0)
+        for counts in per_thread:
+            for key, value in list(counts.items()):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+DEFAULT_POLICIES = {
+    # No stale fallback by default - opt in per type with stale_ttl in CACHE_POLICY_FILE
+    # or CACHE_STALE_TTL_<TYPE> (stale entries count against the same size/byte budget)
+    "grades": CachePolicy(ttl=300, max_size=1000, jitter=0.1),        # 5 minutes for grades
+    "courses": CachePolicy(ttl=1800, max_size=500, jitter=0.1),       # 30 minutes for courses
+    "assignments": CachePolicy(ttl=900, max_size=2000, jitter=0.1),   # 15 minutes for assignments
+    "tokens": CachePolicy(ttl=3600, max_size=100)                     # 1 hour for tokens
+}
+
 class PerformanceCache:
     """
     High-performance TTL cache manager for Canvas API data
     Features:
     - In-memory TTL caching for sub-second responses
-    - Background refresh to prevent cache misses
+    - Background refresh (stale-while-revalidate) to prevent cache misses
     - User-scoped caching for multi-tenant support
+    - Pluggable storage backend (in-process TTLCache or shared across workers)
+    - Optional persistent L2 tier so restarts start warm
+    - Optional byte budgets so memory use tracks payload size, not entry count
+    - Optional pre-encoded JSON bytes so cache hits skip serialization
+    - Optional per-type compression of large entries (zlib, or lz4 when installed)
     - Automatic cache warming
+    - Single-flight loading so one expiry never becomes a thundering herd
+    - Thread-safe: locked (striped on free-threaded builds) storage and per-thread counters
     """
     
-    def __init__(self):
-        # Separate caches for different data types with appropriate TTLs
-        self.grades_cache = TTLCache(maxsize=1000, ttl=300)      # 5 minutes for grades
-        self.courses_cache = TTLCache(maxsize=500, ttl=1800)     # 30 minutes for courses  
-        self.assignments_cache = TTLCache(maxsize=2000, ttl=900) # 15 minutes for assignments
-        self.user_tokens_cache = TTLCache(maxsize=100, ttl=3600) # 1 hour for tokens
+    def __init__(
+        self,
+        max_concurrent_refreshes: int = 8,
+        refresh_timeout: float = 30.0,
+        backend_factory: Optional[BackendFactory] = None,
+        l2_store: Optional[SQLiteL2Store] = None,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        store_json: bool = False,
+        compression_threshold: int = 4096
+    ):
+        # Defaults to in-process TTLCache storage
+        backend_factory = backend_factory or create_backend_factory("memory")
+        self.policies = {dtype: replace(policy) for dtype, policy in DEFAULT_POLICIES.items()}
+        self.policies.update({dtype: policy.validate() for dtype, policy in (policies or {}).items()})
+        self.store_json = store_json
+        self.compression = {
+            dtype: resolve_codec(policy.compression)
+            for dtype, policy in self.policies.items() if policy.compression
+        }
+        self.compression_threshold = compression_threshold
+        
+        # Separate caches for different data types, sized by their policies;
+        # a byte budget replaces the entry-count cap for that type
+        self.grades_cache = self._build_cache(backend_factory, "grades")
+        self.courses_cache = self._build_cache(backend_factory, "courses")
+        self.assignments_cache = self._build_cache(backend_factory, "assignments")
+        self.user_tokens_cache = self._build_cache(backend_factory, "tokens")
         
-        # Performance metrics
-        self.hit_counts = {"grades": 0, "courses": 0, "assignments": 0}
-        self.miss_counts = {"grades": 0, "courses": 0, "assignments": 0}
-        self.refresh_tasks = {}
+        # Performance metrics - per-thread counters, aggregated in get_stats
+        self.hit_counts = ThreadLocalCounters(TRACKED_TYPES)
+        self.miss_counts = ThreadLocalCounters(TRACKED_TYPES)
+        self.coalesced_counts = ThreadLocalCounters(TRACKED_TYPES)
+        self.refresh_stats = ThreadLocalCounters(("scheduled", "completed", "failed", "skipped"))
+        
+        # Optional L2 tier - tokens are never persisted
+        self.l2_store = l2_store
+        self.l2_hit_counts = ThreadLocalCounters(TRACKED_TYPES)
+        self.l2_miss_counts = ThreadLocalCounters(TRACKED_TYPES)
+        self.compression_stats = {
+            dtype: ThreadLocalCounters(("entries", "raw_bytes", "compressed_bytes", "compress_ms", "decompress_ms"))
+            for dtype in self.policies
+        }
         
-        # Background refresh lock
-        self._refresh_lock = threading.Lock()
+        # Background refresh: loaders per data type, running tasks per cache key
+        self.loaders: Dict[str, Callable[[str], Awaitable[Any]]] = {}
+        self.refresh_tasks: Dict[str, asyncio.Task] = {}
+        self.max_concurrent_refreshes = max_concurrent_refreshes
+        self.refresh_timeout = refresh_timeout
+        self._refresh_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # In-flight loads keyed by cache key (single-flight coalescing);
+        # only touched from the event loop thread
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Bumped per key by swap_user_data, so a load that started before a
+        # swap cannot overwrite the newer snapshot when it finishes
+        self._generations: Dict[str, int] = {}
+        self._swap_lock = threading.Lock()
         
         logger.info("🚀 Performance cache initialized with TTL caching")
     
+    def _build_cache(self, backend_factory: BackendFactory, data_type: str) -> CacheBackend:
+        policy = self.policies[data_type]
+        # Backend ttl is only the fallback - entries carry their own expires_at
+        # (and stale_until, how long the backend keeps them past it)
+        return backend_factory(data_type, policy.max_size, policy.ttl * (1 + policy.jitter), policy.max_bytes)
+    
+    def get_policies(self) -> Dict[str, Dict[str, Any]]:
+        """Current policy per data type"""
+        return {dtype: asdict(policy) for dtype, policy in self.policies.items()}
+    
+    def update_policy(self, data_type: str, **changes) -> CachePolicy:
+        """
+        Adjust ttl, refresh_threshold, jitter or stale_ttl at runtime
+        New values apply to entries cached from now on
+        """
+        if data_type not in self.policies:
+            raise KeyError(data_type)
+        fixed = set(changes) - set(CachePolicy.RUNTIME_FIELDS)
+        if fixed:
+            raise ValueError(f"Not adjustable at runtime: {', '.join(sorted(fixed))}")
+        policy = replace(self.policies[data_type], **changes).validate()
+        self.policies[data_type] = policy
+        logger.info(f"⚙️ Updated {data_type} cache policy: {changes}")
+        return policy
+    
+    def _entry_ttl(self, data_type: str) -> float:
+        """Policy TTL with random jitter so bulk-loaded entries do not expire together"""
+        policy = self.policies[data_type]
+        if not policy.jitter:
+            return policy.ttl
+        return policy.ttl * (1 + random.uniform(-policy.jitter, policy.jitter))
+    
     def _get_user_key(self, user_id: str, data_type: str) -> str:
         """Generate user-scoped cache key"""
         return f"{data_type}:{user_id}"
@@ -49,23 +220,29 @@ class PerformanceCache:
         Returns None if cache miss
         """
         cache = self._get_cache_for_type(data_type)
-        if not cache:
+        if cache is None:
             return None
             
         key = self._get_user_key(user_id, data_type)
         
         try:
             data = cache.get(key)
+            if data is not None and time.time() >= data.get("expires_at", float("inf")):
+                # Kept only as a stale fallback (see get_stale_entry)
+                data = None
+            if data is None and self.l2_store and data_type in TRACKED_TYPES:
+                data = self._promote_from_l2(key, data_type, cache)
+            
             if data is not None:
-                self.hit_counts[data_type] += 1
+                self.hit_counts.incr(data_type)
                 logger.debug(f"✅ Cache HIT for {data_type}:{user_id}")
                 
                 # Background refresh if data is getting stale (80% of TTL)
                 self._maybe_background_refresh(user_id, data_type, key)
                 
-                return data
+                return self._unpack(data_type, data)
             else:
-                self.miss_counts[data_type] += 1
+                self.miss_counts.incr(data_type)
                 logger.debug(f"❌ Cache MISS for {data_type}:{user_id}")
                 return None
                 
@@ -73,33 +250,281 @@ class PerformanceCache:
             logger.error(f"Cache get error for {data_type}: {e}")
             return None
     
-    def set(self, user_id: str, data_type: str, data: Any) -> bool:
+    def expires_at(self, user_id: str, data_type: str) -> Optional[float]:
+        """Expiry of a user's cached entry, without counting a hit or miss (None if not cached)"""
+        return self.expiries([user_id], data_type).get(user_id)
+
+    def expiries(self, user_ids: List[str], data_type: str) -> Dict[str, float]:
+        """
+        Expiry of each listed user's cached entry (users without one are left out)
+        A single backend call that neither counts hits nor refreshes LRU recency
+        """
+        cache = self._get_cache_for_type(data_type)
+        if cache is None:
+            return {}
+        keys = {self._get_user_key(user_id, data_type): user_id for user_id in user_ids}
+        return {keys[key]: expires_at for key, expires_at in cache.expiries(list(keys)).items()}
+
+    def set(self, user_id: str, data_type: str, data: Any, tags: Optional[List[str]] = None) -> bool:
         """
         Set cached data with timestamp
+        Extra tags are indexed alongside the derived user/type/course tags
         """
+        return self._store(user_id, data_type, data, tags) is not None
+    
+    def _store(
+        self, user_id: str, data_type: str, data: Any, tags: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Cache data and return the stored entry, or None if it was not cached"""
         cache = self._get_cache_for_type(data_type)
-        if not cache:
-            return False
+        if cache is None:
+            return None
             
         key = self._get_user_key(user_id, data_type)
         
         try:
-            # Add metadata for cache management
-            cached_data = {
-                "data": data,
-                "cached_at": time.time(),
-                "user_id": user_id
-            }
-            
-            cache[key] = cached_data
+            cached_data = self._make_entry(user_id, data_type, data, tags=tags)
+            cache[key] = self._pack(data_type, cached_data)
+            if self.l2_store and data_type in TRACKED_TYPES:
+                self.l2_store.put(key, data_type, cached_data, self.policies[data_type].ttl)
             logger.debug(f"💾 Cached {data_type} for user {user_id}")
-            return True
+            return self._view(cached_data)
             
         except Exception as e:
             logger.error(f"Cache set error for {data_type}: {e}")
-            return False
+            return None
+    
+    def swap_user_data(self, user_id: str, snapshot: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Replace a user's entries for several data types in one step, e.g. after a sync
+        Every entry is built (encoded, compressed) before the first one is
+        swapped in, and the swap itself never yields to the event loop, so a
+        reader gets the old entry or the new one - never a miss. Loads already
+        in flight for these keys are superseded rather than written back.
+        Returns the new entries by data type
+        """
+        staged = []
+        for data_type, data in snapshot.items():
+            cache = self._get_cache_for_type(data_type)
+            if cache is None:
+                raise KeyError(data_type)
+            entry = self._make_entry(user_id, data_type, data)
+            staged.append((data_type, self._get_user_key(user_id, data_type), cache, entry, self._pack(data_type, entry)))
+        
+        with self._swap_lock:
+            for data_type, key, cache, entry, stored in staged:
+                cache[key] = stored
+                self._generations[key] = self._generations.get(key, 0) + 1
+        
+        if self.l2_store:
+            for data_type, key, cache, entry, stored in staged:
+                if data_type in TRACKED_TYPES:
+                    self.l2_store.put(key, data_type, entry, self.policies[data_type].ttl)
+        logger.info(f"🔁 Swapped in {', '.join(snapshot)} for user {user_id}")
+        return {data_type: self._view(entry) for data_type, key, cache, entry, stored in staged}
+    
+    def get_stale_entry(self, user_id: str, data_type: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored entry even if it has expired - kept by the backend until its
+        stale_until (the policy's stale_ttl past expiry) and removed by any
+        invalidation, like a live entry. Not counted as a hit or miss
+        """
+        cache = self._get_cache_for_type(data_type)
+        stored = cache.get(self._get_user_key(user_id, data_type)) if cache is not None else None
+        return self._unpack(data_type, stored) if stored else None
+    
+    def _make_entry(
+        self,
+        user_id: str,
+        data_type: str,
+        data: Any,
+        cached_at: Optional[float] = None,
+        expires_at: Optional[float] = None,
+        tags: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Wrap data with cache metadata, including its (jittered) expiry and tags
+        JSON bytes are attached when store_json is on or the type is compressed;
+        size_bytes only when it is known from them or a byte budget needs it
+        """
+        cached_at = cached_at or time.time()
+        cached_data = {
+            "data": data,
+            "cached_at": cached_at,
+            "expires_at": expires_at or cached_at + self._entry_ttl(data_type),
+            "user_id": user_id,
+            "tags": entry_tags(user_id, data_type, data, tags)
+        }
+        if self.policies[data_type].stale_ttl:
+            cached_data["stale_until"] = cached_data["expires_at"] + self.policies[data_type].stale_ttl
+        if self.store_json or data_type in self.compression:
+            cached_data["json_bytes"] = encode_json(data)
+            cached_data["size_bytes"] = len(cached_data["json_bytes"])
+        elif self.policies[data_type].max_bytes:
+            cached_data["size_bytes"] = self._estimate_size(data)
+        return cached_data
+    
+    def _view(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Entry as handed to callers - JSON bytes only when store_json is on"""
+        if not self.store_json and "json_bytes" in entry:
+            entry = {k: v for k, v in entry.items() if k != "json_bytes"}
+        return entry
+    
+    def _pack(self, data_type: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Storage form of an entry - compressed JSON when the type and size call for it"""
+        codec = self.compression.get(data_type)
+        if not codec or entry["size_bytes"] < self.compression_threshold:
+            return self._view(entry)
+        
+        raw = entry["json_bytes"]
+        started = time.perf_counter()
+        payload = CODECS[codec][0](raw)
+        stats = self.compression_stats[data_type]
+        stats.incr("compress_ms", (time.perf_counter() - started) * 1000)
+        stats.incr("entries")
+        stats.incr("raw_bytes", len(raw))
+        stats.incr("compressed_bytes", len(payload))
+        return {
+            "compressed": payload,
+            "codec": codec,
+            "cached_at": entry["cached_at"],
+            "expires_at": entry["expires_at"],
+            **({"stale_until": entry["stale_until"]} if "stale_until" in entry else {}),
+            "user_id": entry["user_id"],
+            "tags": entry["tags"],
+            "size_bytes": len(payload)
+        }
     
-    def _get_cache_for_type(self, data_type: str) -> Optional[TTLCache]:
+    def _unpack(self, data_type: str, stored: Dict[str, Any]) -> Dict[str, Any]:
+        """Inverse of _pack - decompress and decode a stored entry"""
+        if "compressed" not in stored:
+            return stored
+        
+        started = time.perf_counter()
+        raw = CODECS[stored["codec"]][1](stored["compressed"])
+        entry = {
+            "data": decode_json(raw),
+            "cached_at": stored["cached_at"],
+            "expires_at": stored["expires_at"],
+            **({"stale_until": stored["stale_until"]} if "stale_until" in stored else {}),
+            "user_id": stored["user_id"],
+            "tags": stored.get("tags", []),
+            "size_bytes": stored["size_bytes"]
+        }
+        if self.store_json:
+            entry["json_bytes"] = raw
+        self.compression_stats[data_type].incr("decompress_ms", (time.perf_counter() - started) * 1000)
+        return entry
+    
+    @staticmethod
+    def _estimate_size(data: Any) -> int:
+        """Approximate payload size as its compact JSON length"""
+        try:
+            return len(json.dumps(data, separators=(",", ":"), default=str))
+        except (TypeError, ValueError):
+            return len(repr(data))
+    
+    def _promote_from_l2(self, key: str, data_type: str, cache: CacheBackend) -> Optional[Any]:
+        """Copy an unexpired L2 entry into L1 and return its stored form"""
+        data = self.l2_store.get(key)
+        if data is None or time.time() >= data.get("expires_at", 0):
+            self.l2_miss_counts.incr(data_type)
+            return None
+        self.l2_hit_counts.incr(data_type)
+        stored = self._pack(data_type, self._from_l2(data_type, data))
+        cache[key] = stored
+        logger.debug(f"💽 L2 HIT for {key}")
+        return stored
+    
+    def _from_l2(self, data_type: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild an L2 entry, keeping its original cached_at and expiry"""
+        return self._make_entry(
+            entry["user_id"], data_type, entry["data"], entry["cached_at"], entry.get("expires_at"),
+            entry.get("tags")
+        )
+    
+    def warm_from_l2(self) -> int:
+        """Load every unexpired L2 entry into L1 - call once at startup"""
+        if not self.l2_store:
+            return 0
+        warmed = 0
+        for data_type, key, entry in self.l2_store.entries():
+            cache = self._get_cache_for_type(data_type)
+            if cache is None or time.time() >= entry.get("expires_at", 0):
+                continue
+            cache[key] = self._pack(data_type, self._from_l2(data_type, entry))
+            warmed += 1
+        logger.info(f"🔥 Warmed {warmed} cache entries from L2")
+        return warmed
+    
+    async def get_or_load(
+        self,
+        user_id: str,
+        data_type: str,
+        loader: Callable[[], Awaitable[Any]],
+        force_refresh: bool = False
+    ) -> Tuple[Any, str]:
+        """
+        Get cached data or load it, with only one in-flight load per key
+        Concurrent callers that miss while a load is running await the same
+        future instead of hitting the database again.
+        Returns (data, source) where source is memory_cache, coalesced or database
+        """
+        entry, source = await self.get_or_load_entry(user_id, data_type, loader, force_refresh)
+        return entry["data"], source
+    
+    async def get_or_load_entry(
+        self,
+        user_id: str,
+        data_type: str,
+        loader: Callable[[], Awaitable[Any]],
+        force_refresh: bool = False
+    ) -> Tuple[Dict[str, Any], str]:
+        """Same as get_or_load but returns the whole cache entry (data plus metadata)"""
+        if not force_refresh:
+            cached_data = self.get(user_id, data_type)
+            if cached_data:
+                return cached_data, "memory_cache"
+        
+        key = self._get_user_key(user_id, data_type)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if data_type in TRACKED_TYPES:
+                self.coalesced_counts.incr(data_type)
+            logger.debug(f"🔗 Coalesced load for {data_type}:{user_id}")
+            return await asyncio.shield(inflight), "coalesced"
+        
+        # Run the load as its own task so a cancelled caller does not abort
+        # the load for everyone else waiting on it
+        task = asyncio.ensure_future(self._load_and_set(user_id, data_type, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish_load(key, t))
+        return await asyncio.shield(task), "database"
+    
+    async def _load_and_set(self, user_id: str, data_type: str, loader: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """Run loader, cache its result and return the new entry"""
+        key = self._get_user_key(user_id, data_type)
+        generation = self._generations.get(key)
+        data = await loader()
+        if self._generations.get(key) != generation:
+            # A sync swapped in fresher data while this load ran - serve that instead
+            stored = self._get_cache_for_type(data_type).get(key)
+            if stored is not None:
+                return self._view(self._unpack(data_type, stored))
+        entry = self._store(user_id, data_type, data)
+        # An entry can be refused (e.g. over the byte budget) - still hand back the data
+        return entry if entry is not None else self._view(self._make_entry(user_id, data_type, data))
+    
+    def _finish_load(self, key: str, task: asyncio.Future):
+        """Clear in-flight marker once a load settles"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so it is not reported as never retrieved
+        # when every waiter has gone away
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Cache load failed for {key}: {task.exception()}")
+    
+    def _get_cache_for_type(self, data_type: str) -> Optional[CacheBackend]:
         """Get appropriate cache based on data type"""
         cache_map = {
             "grades": self.grades_cache,
@@ -115,7 +540,7 @@ class PerformanceCache:
         This prevents cache misses by refreshing proactively
         """
         cache = self._get_cache_for_type(data_type)
-        if not cache:
+        if cache is None:
             return
             
         try:
@@ -126,44 +551,141 @@ class PerformanceCache:
             cached_at = cached_item.get("cached_at", 0)
             cache_age = time.time() - cached_at
             
-            # Get TTL for this cache type
-            ttl_map = {"grades": 300, "courses": 1800, "assignments": 900}
-            ttl = ttl_map.get(data_type, 600)
+            # Lifetime of this entry (its jittered TTL) and the policy's threshold
+            policy = self.policies[data_type]
+            lifetime = cached_item.get("expires_at", cached_at + policy.ttl) - cached_at
             
-            # If cache is 80% expired, refresh in background
-            if cache_age > (ttl * 0.8):
-                refresh_key = f"{data_type}:{user_id}"
-                if refresh_key not in self.refresh_tasks:
-                    logger.info(f"🔄 Triggering background refresh for {data_type}:{user_id}")
-                    # Mark refresh as in progress
-                    self.refresh_tasks[refresh_key] = time.time()
+            # Past the refresh threshold (80% by default), refresh in background
+            # while the current (stale) value keeps being served
+            if cache_age > (lifetime * policy.refresh_threshold):
+                self._schedule_refresh(user_id, data_type, cache_key)
                     
         except Exception as e:
             logger.error(f"Background refresh check error: {e}")
     
-    def invalidate(self, user_id: str, data_type: Optional[str] = None):
+    def register_loader(self, data_type: str, loader: Callable[[str], Awaitable[Any]]):
+        """
+        Register the async loader used to refresh a data type in the background
+        loader is called with the user_id and returns the fresh data
+        """
+        self.loaders[data_type] = loader
+        logger.info(f"🔌 Registered background loader for {data_type}")
+    
+    def _schedule_refresh(self, user_id: str, data_type: str, cache_key: str):
+        """Start a background refresh task unless one is already running"""
+        loader = self.loaders.get(data_type)
+        if not loader:
+            return
+        if cache_key in self.refresh_tasks or cache_key in self._inflight:
+            return
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called outside the event loop (e.g. executor thread) - nothing to schedule on
+            self.refresh_stats.incr("skipped")
+            return
+        
+        if self._refresh_semaphore is None:
+            self._refresh_semaphore = asyncio.Semaphore(self.max_concurrent_refreshes)
+        
+        logger.info(f"🔄 Triggering background refresh for {data_type}:{user_id}")
+        task = loop.create_task(self._run_refresh(user_id, data_type, loader))
+        self.refresh_tasks[cache_key] = task
+        self.refresh_stats.incr("scheduled")
+        task.add_done_callback(lambda t: self._finish_refresh(cache_key, t))
+    
+    async def _run_refresh(self, user_id: str, data_type: str, loader: Callable[[str], Awaitable[Any]]):
+        """Reload one key with bounded concurrency and a hard timeout"""
+        async with self._refresh_semaphore:
+            await asyncio.wait_for(
+                self.get_or_load(user_id, data_type, lambda: loader(user_id), force_refresh=True),
+                timeout=self.refresh_timeout
+            )
+    
+    def _finish_refresh(self, cache_key: str, task: asyncio.Task):
+        """Drop the refresh marker and record the outcome"""
+        if self.refresh_tasks.get(cache_key) is task:
+            del self.refresh_tasks[cache_key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.refresh_stats.incr("failed")
+            logger.error(f"Background refresh failed for {cache_key}: {task.exception()!r}")
+        else:
+            self.refresh_stats.incr("completed")
+            logger.debug(f"✅ Background refresh completed for {cache_key}")
+    
+    async def shutdown(self):
+        """Cancel outstanding background refreshes"""
+        tasks = list(self.refresh_tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.refresh_tasks.clear()
+        if self.l2_store:
+            # Flush queued L2 writes so the next start is warm
+            await asyncio.get_running_loop().run_in_executor(None, self.l2_store.close)
+    
+    def invalidate(
+        self,
+        user_id: str,
+        data_type: Optional[str] = None,
+        course_id: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ):
         """
         Invalidate cache for user - either specific type or all types
+        With course_id or tags only the user's entries carrying them are dropped
         """
+        if course_id is not None or tags:
+            filters = [f"user:{user_id}"] + ([f"course:{course_id}"] if course_id is not None else []) + list(tags or [])
+            return self.invalidate_tags(filters, data_type)
         if data_type:
             cache = self._get_cache_for_type(data_type)
-            if cache:
+            if cache is not None:
                 key = self._get_user_key(user_id, data_type)
                 cache.pop(key, None)
+                if self.l2_store:
+                    self.l2_store.delete(key)
                 logger.info(f"🗑️ Invalidated {data_type} cache for user {user_id}")
         else:
             # Invalidate all caches for user
             for dtype in ["grades", "courses", "assignments"]:
                 cache = self._get_cache_for_type(dtype)
-                if cache:
+                if cache is not None:
                     key = self._get_user_key(user_id, dtype)
                     cache.pop(key, None)
+                    if self.l2_store:
+                        self.l2_store.delete(key)
             logger.info(f"🗑️ Invalidated ALL caches for user {user_id}")
     
+    def invalidate_tags(self, tags: List[str], data_type: Optional[str] = None) -> int:
+        """
+        Invalidate every entry carrying all of tags, e.g. ["course:42"] or
+        ["user:7", "course:42"]; optionally limited to one data type
+        Returns the number of L1 entries removed
+        """
+        if not tags:
+            raise ValueError("At least one tag is required")
+        removed = 0
+        for dtype in ([data_type] if data_type else TRACKED_TYPES):
+            cache = self._get_cache_for_type(dtype)
+            if cache is None:
+                continue
+            removed += len(cache.invalidate_tags(list(tags) + [f"type:{dtype}"]))
+            if self.l2_store:
+                self.l2_store.delete_tags(list(tags) + [f"type:{dtype}"])
+        logger.info(f"🗑️ Invalidated {removed} cache entries tagged {', '.join(tags)}")
+        return removed
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
-        total_hits = sum(self.hit_counts.values())
-        total_misses = sum(self.miss_counts.values())
+        hit_counts = self.hit_counts.snapshot()
+        miss_counts = self.miss_counts.snapshot()
+        total_hits = sum(hit_counts.values())
+        total_misses = sum(miss_counts.values())
         total_requests = total_hits + total_misses
         
         hit_rate = (total_hits / total_requests * 100) if total_requests > 0 else 0
@@ -171,22 +693,159 @@ class PerformanceCache:
         return {
             "hit_rate": f"{hit_rate:.1f}%",
             "total_requests": total_requests,
-            "hit_counts": self.hit_counts.copy(),
-            "miss_counts": self.miss_counts.copy(),
+            "hit_counts": hit_counts,
+            "miss_counts": miss_counts,
+            "coalesced_counts": self.coalesced_counts.snapshot(),
+            "refresh_stats": {**self.refresh_stats.snapshot(), "in_progress": len(self.refresh_tasks)},
+            "l2_stats": {
+                "enabled": int(self.l2_store is not None),
+                "hits": sum(self.l2_hit_counts.snapshot().values()),
+                "misses": sum(self.l2_miss_counts.snapshot().values()),
+                "pending_writes": self.l2_store.pending_writes if self.l2_store else 0
+            },
             "cache_sizes": {
                 "grades": len(self.grades_cache),
                 "courses": len(self.courses_cache),
                 "assignments": len(self.assignments_cache)
+            },
+            "compression_stats": {
+                dtype: self._compression_summary(counters.snapshot())
+                for dtype, counters in self.compression_stats.items()
+            },
+            # Only measured when entries carry JSON bytes or a byte budget needs sizes
+            "cache_bytes": {
+                dtype: self._get_cache_for_type(dtype).bytes_used
+                if self.store_json or self.policies[dtype].max_bytes or dtype in self.compression else None
+                for dtype in TRACKED_TYPES
             }
         }
     
+    @staticmethod
+    def _compression_summary(stats: Dict[str, float]) -> Dict[str, float]:
+        ratio = round(stats["raw_bytes"] / stats["compressed_bytes"], 2) if stats["compressed_bytes"] else 0
+        return {**stats, "ratio": ratio}
+    
     def clear_all(self):
         """Clear all caches - use for testing/reset"""
         self.grades_cache.clear()
         self.courses_cache.clear()
         self.assignments_cache.clear()
         self.user_tokens_cache.clear()
+        if self.l2_store:
+            self.l2_store.clear()
         logger.info("🧹 All caches cleared")
 
-# Global cache instance
-performance_cache = PerformanceCache()
+def entry_tags(user_id: str, data_type: str, data: Any, extra: Optional[List[str]] = None) -> List[str]:
+    """
+    Tags for an entry: its user, its data type and every course it mentions
+    (course_id on assignment/grade rows, id on course rows), plus any extras
+    """
+    tags = [f"user:{user_id}", f"type:{data_type}"]
+    course_field = "id" if data_type == "courses" else "course_id"
+    if isinstance(data, list):
+        courses = {row.get(course_field) for row in data if isinstance(row, dict)}
+        tags.extend(f"course:{course_id}" for course_id in sorted(courses - {None}, key=str))
+    for tag in extra or ():
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+def encode_json(data: Any) -> bytes:
+    """
+    Encode data as compact JSON bytes, using orjson when installed
+    Dates and datetimes become ISO 8601 strings with either encoder, as in
+    FastAPI's own responses
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, separators=(",", ":"), default=_json_default, ensure_ascii=False).encode("utf-8")
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+def decode_json(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+# codec name -> (compress, decompress)
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda raw: zlib.compress(raw, 6), zlib.decompress)
+}
+if lz4_frame is not None:
+    CODECS["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+
+def resolve_codec(codec: str) -> str:
+    """Validate a codec name, falling back to zlib when lz4 is not installed"""
+    codec = codec.lower()
+    if codec == "lz4" and lz4_frame is None:
+        logger.warning("lz4 not installed - falling back to zlib compression")
+        return "zlib"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown cache compression codec: {codec}")
+    return codec
+
+def load_policies(path: Optional[str] = None) -> Dict[str, CachePolicy]:
+    """
+    Build cache policies from defaults, an optional JSON file and the environment
+    CACHE_POLICY_FILE: {"grades": {"ttl": 120, "jitter": 0.2}, ...}
+    Per type env overrides: CACHE_TTL_<TYPE>, CACHE_MAX_SIZE_<TYPE>,
+    CACHE_REFRESH_THRESHOLD_<TYPE>, CACHE_JITTER_<TYPE>, CACHE_MAX_BYTES_<TYPE>,
+    CACHE_COMPRESS_<TYPE> (zlib | lz4), CACHE_STALE_TTL_<TYPE>
+    Raises ValueError naming the data type, field or variable it cannot apply
+    """
+    policies = {dtype: replace(policy) for dtype, policy in DEFAULT_POLICIES.items()}
+    
+    path = path or os.getenv("CACHE_POLICY_FILE")
+    if path:
+        known_fields = {f.name for f in fields(CachePolicy)}
+        with open(path, encoding="utf-8") as f:
+            for dtype, overrides in json.load(f).items():
+                if dtype not in policies:
+                    raise ValueError(f"{path}: unknown cache data type {dtype!r} (expected one of {', '.join(policies)})")
+                if not isinstance(overrides, dict):
+                    raise ValueError(f"{path}: policy for {dtype!r} must be an object")
+                unknown = sorted(set(overrides) - known_fields)
+                if unknown:
+                    raise ValueError(f"{path}: unknown {dtype} policy field(s): {', '.join(unknown)}")
+                policies[dtype] = replace(policies[dtype], **overrides)
+    
+    env_fields = {
+        "TTL": ("ttl", float),
+        "MAX_SIZE": ("max_size", int),
+        "REFRESH_THRESHOLD": ("refresh_threshold", float),
+        "JITTER": ("jitter", float),
+        "MAX_BYTES": ("max_bytes", int),
+        "COMPRESS": ("compression", str),
+        "STALE_TTL": ("stale_ttl", float)
+    }
+    for dtype in policies:
+        for env_name, (field, cast) in env_fields.items():
+            name = f"CACHE_{env_name}_{dtype.upper()}"
+            value = os.getenv(name)
+            if value:
+                try:
+                    policies[dtype] = replace(policies[dtype], **{field: cast(value)})
+                except ValueError:
+                    raise ValueError(f"{name}: invalid {field} {value!r}") from None
+    
+    for dtype, policy in policies.items():
+        try:
+            policy.validate()
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid {dtype} cache policy: {e}") from None
+    return policies
+
+# Global cache instance - CACHE_BACKEND=shared makes all workers share one cache,
+# CACHE_L2_PATH adds the persistent SQLite tier, policies come from load_policies(),
+# CACHE_STORE_JSON=1 keeps pre-encoded JSON for zero-serialization hits,
+# compressed types only compress entries above CACHE_COMPRESS_MIN_BYTES
+performance_cache = PerformanceCache(
+    backend_factory=create_backend_factory(),
+    l2_store=create_l2_store(),
+    policies=load_policies(),
+    store_json=os.getenv("CACHE_STORE_JSON", "").lower() in ("1", "true", "yes"),
+    compression_threshold=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "4096"))
+)
@@ -0,0 +1,212 @@
+"""
+Periodic cache pre-warming for recently active users
+The GET endpoints report each read here. Every interval, the warmer reloads
+the grades/courses/assignments entries of users seen within the active window
+that are missing or will expire before the next cycle, a few at a time and
+within a time budget, so a returning student's first load is a hit. Expiries
+are read with one batched peek per data type, off the event loop and without
+refreshing LRU recency, so warming does not keep idle entries from eviction.
+
+A warmed key counts as a prevented miss when a later read is served by the
+warmed entry after the entry it replaced would have expired; each cycle
+reports those against all reads since the previous cycle
+"""
+import asyncio
+import os
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_manager import TRACKED_TYPES, PerformanceCache
+
+logger = logging.getLogger(__name__)
+
+class CacheWarmer:
+    """Tracks active users and re-populates their cache entries ahead of expiry"""
+
+    def __init__(
+        self,
+        cache: PerformanceCache,
+        interval: float = 60.0,
+        concurrency: int = 4,
+        budget: float = 20.0,
+        active_window: float = 3600.0,
+        max_users: int = 10000
+    ):
+        self.cache = cache
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.budget = budget
+        self.active_window = active_window
+        self.max_users = max_users
+
+        # user_id -> last read, oldest first
+        self.active_users: "OrderedDict[str, float]" = OrderedDict()
+        # (user_id, data_type) -> (cached_at of the warmed entry, expiry of the entry it replaced)
+        self._warmed: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._reads = 0
+        self._prevented = 0
+
+        self.cycles: deque = deque(maxlen=20)
+        self.totals = {"cycles": 0, "warmed": 0, "failed": 0, "skipped": 0, "prevented_misses": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def record_access(
+        self,
+        user_id: str,
+        data_type: str,
+        entry: Optional[Dict[str, Any]] = None,
+        source: Optional[str] = None
+    ):
+        """Note a read from the GET endpoints - marks the user active and scores warmed entries"""
+        now = time.time()
+        self.active_users[user_id] = now
+        self.active_users.move_to_end(user_id)
+        while len(self.active_users) > self.max_users:
+            self.active_users.popitem(last=False)
+
+        if entry is None:
+            return
+        self._reads += 1
+        warmed = self._warmed.get((user_id, data_type))
+        if warmed and source == "memory_cache" and entry.get("cached_at") == warmed[0] and now >= warmed[1]:
+            self._prevented += 1
+            del self._warmed[(user_id, data_type)]
+
+    def active(self, now: Optional[float] = None) -> List[str]:
+        """Users read within the active window, after dropping the ones that went idle"""
+        now = now or time.time()
+        while self.active_users:
+            user_id, seen = next(iter(self.active_users.items()))
+            if now - seen <= self.active_window:
+                break
+            del self.active_users[user_id]
+        return list(self.active_users)
+
+    def due_keys(self, user_ids: List[str], now: Optional[float] = None) -> List[Tuple[str, str, float]]:
+        """
+        (user_id, data_type, current expiry) of the users' entries due for warming, soonest first
+        Blocking (one backend call per data type) - run_cycle calls it in an executor
+        """
+        now = now or time.time()
+        horizon = now + self.interval + self.budget
+        due = []
+        for data_type in TRACKED_TYPES:
+            if data_type not in self.cache.loaders:
+                continue
+            expiries = self.cache.expiries(user_ids, data_type)
+            for user_id in user_ids:
+                expires_at = expiries.get(user_id, 0.0)
+                if expires_at < horizon:
+                    due.append((user_id, data_type, expires_at))
+        due.sort(key=lambda item: item[2])
+        return due
+
+    async def _warm(self, slots: asyncio.Semaphore, user_id: str, data_type: str, expires_at: float):
+        async with slots:
+            loader = self.cache.loaders[data_type]
+            entry, _ = await self.cache.get_or_load_entry(
+                user_id, data_type, lambda: loader(user_id), force_refresh=True
+            )
+        self._warmed[(user_id, data_type)] = (entry["cached_at"], expires_at)
+
+    async def run_cycle(self) -> Dict[str, Any]:
+        """Warm every due key within the budget and return the cycle report"""
+        started = time.time()
+        users = self.active(started)
+        due = await asyncio.get_running_loop().run_in_executor(None, self.due_keys, users, started) if users else []
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.create_task(self._warm(slots, *item)) for item in due]
+
+        warmed = failed = skipped = 0
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=self.budget)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            skipped = len(pending)
+            for task in done:
+                if task.exception() is not None:
+                    failed += 1
+                    logger.warning(f"⚠️ Cache warming failed: {task.exception()!r}")
+                else:
+                    warmed += 1
+
+        reads, prevented = self._reads, self._prevented
+        self._reads = self._prevented = 0
+        # Warmed entries older than the active window will not be scored any more
+        self._warmed = {k: v for k, v in self._warmed.items() if started - v[0] <= self.active_window}
+
+        report = {
+            "started_at": started,
+            "duration_ms": round((time.time() - started) * 1000, 2),
+            "active_users": len(self.active_users),
+            "due": len(due),
+            "warmed": warmed,
+            "failed": failed,
+            "skipped": skipped,
+            "reads": reads,
+            "prevented_misses": prevented,
+            "prevented_miss_rate": f"{prevented / reads * 100:.1f}%" if reads else "0.0%"
+        }
+        self.cycles.append(report)
+        self.totals["cycles"] += 1
+        for name in ("warmed", "failed", "skipped", "prevented_misses"):
+            self.totals[name] += report[name]
+        if due:
+            logger.info(
+                f"🔥 Warmed {warmed}/{len(due)} keys in {report['duration_ms']:.0f}ms "
+                f"({report['prevented_miss_rate']} of {reads} reads were prevented misses)"
+            )
+        return report
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                logger.error(f"❌ Cache warming cycle failed: {e}")
+
+    def start(self):
+        """Start periodic warming on the running loop (no-op when interval is 0)"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(
+            f"🔥 Cache warming every {self.interval:.0f}s "
+            f"({self.concurrency} at a time, {self.budget:.0f}s budget)"
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.interval > 0,
+            "interval": self.interval,
+            "concurrency": self.concurrency,
+            "budget": self.budget,
+            "active_window": self.active_window,
+            "active_users": len(self.active_users),
+            "totals": dict(self.totals),
+            "cycles": list(self.cycles)
+        }
+
+def create_cache_warmer(cache: PerformanceCache) -> CacheWarmer:
+    """
+    Build the warmer from CACHE_WARM_INTERVAL (seconds, default 60, 0 disables),
+    CACHE_WARM_CONCURRENCY (4), CACHE_WARM_BUDGET (seconds per cycle, 20) and
+    CACHE_WARM_ACTIVE_WINDOW (seconds since a user's last read, 3600)
+    """
+    return CacheWarmer(
+        cache,
+        interval=float(os.getenv("CACHE_WARM_INTERVAL", "60")),
+        concurrency=int(os.getenv("CACHE_WARM_CONCURRENCY", "4")),
+        budget=float(os.getenv("CACHE_WARM_BUDGET", "20")),
+        active_window=float(os.getenv("CACHE_WARM_ACTIVE_WINDOW", "3600"))
+    )
@@ -0,0 +1,17 @@
+"""
+Canvas client code shared with the scripts/ directory (delta merge rules, HTTP cache)
+The backend runs from backend/ with flat imports, so scripts/ is appended to
+sys.path and its modules are imported from here - one implementation for the
+CLI fetcher and the background sync
+"""
+import os
+import sys
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+
+from canvas_delta import keep_records, merge_records, new_counts  # noqa: E402
+from canvas_http_cache import HttpCache  # noqa: E402
+
+__all__ = ["HttpCache", "keep_records", "merge_records", "new_counts"]
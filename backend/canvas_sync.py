@@ -0,0 +1,290 @@
+"""
+Incremental Canvas sync for background_canvas_sync
+Each user keeps a cursor (last successful sync time per course and resource)
+and the merged snapshot of their previous sync, so later syncs only request
+submissions graded since the cursor and report what actually changed.
+The normalized grades/courses/assignments of the last sync are stored too,
+for the cache loaders to serve
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from canvas_shared import keep_records, merge_records, new_counts
+from http_cache import CanvasRateLimited, ConditionalResponseCache, data_path, raise_for_canvas_status
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ("assignments", "submissions")
+
+class SyncStateStore:
+    """Per-user sync state (cursors + snapshot) as JSON rows in a SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sync_state (
+                user_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS synced_data (
+                user_id TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (user_id, data_type)
+            )"""
+        )
+        self._conn.commit()
+        logger.info(f"🧭 Canvas sync state at {path}")
+
+    def load(self, user_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM sync_state WHERE user_id = ?", (user_id,)).fetchone()
+        state = json.loads(row[0]) if row else {}
+        state.setdefault("cursors", {})
+        state.setdefault("snapshot", {resource: {} for resource in RESOURCES})
+        return state
+
+    def save(self, user_id: str, state: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (user_id, json.dumps(state, default=str), time.time())
+            )
+            self._conn.commit()
+
+    def save_data(self, user_id: str, snapshot: Dict[str, List[Dict]]):
+        """Store a normalized snapshot (see normalize_snapshot()) in one transaction"""
+        synced_at = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO synced_data VALUES (?, ?, ?, ?)",
+                [
+                    (user_id, data_type, json.dumps(data, default=str), synced_at)
+                    for data_type, data in snapshot.items()
+                ]
+            )
+            self._conn.commit()
+
+    def load_data(self, user_id: str, data_type: str) -> Optional[List[Dict]]:
+        """A data type from the user's last synced snapshot, or None before their first sync"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM synced_data WHERE user_id = ? AND data_type = ?", (user_id, data_type)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def create_sync_state_store(path: Optional[str] = None) -> SyncStateStore:
+    """Build the sync state store from CANVAS_SYNC_DB (default data/canvas_sync.db)"""
+    return SyncStateStore(path or os.getenv("CANVAS_SYNC_DB") or data_path("canvas_sync.db"))
+
+def normalize_snapshot(result: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    """
+    Turn a sync result into the cached grades/courses/assignments shapes
+    (the same records the API endpoints serve, plus a few extra Canvas fields)
+    """
+    course_names = {course["id"]: course.get("name") for course in result["courses"]}
+    courses = [
+        {"id": course["id"], "name": course.get("name"), "code": course.get("course_code")}
+        for course in result["courses"]
+    ]
+    assignments = [
+        {
+            "id": assignment["id"],
+            "name": assignment.get("name"),
+            "due_date": assignment.get("due_at"),
+            "course_id": assignment.get("course_id"),
+            "points_possible": assignment.get("points_possible")
+        }
+        for assignment in result["assignments"]
+    ]
+
+    assignment_names = {assignment["id"]: assignment["name"] for assignment in assignments}
+    grades = []
+    for submission in result["submissions"]:
+        # Canvas submissions point at their assignment through assignment_id;
+        # without one the grade stays unlinked rather than guessing from its own id
+        assignment_id = submission.get("assignment_id") or (submission.get("assignment") or {}).get("id")
+        grades.append({
+            "id": submission["id"],
+            "score": submission.get("score"),
+            "assignment": assignment_names.get(assignment_id),
+            "course": course_names.get(submission.get("course_id")),
+            "course_id": submission.get("course_id"),
+            "assignment_id": assignment_id,
+            "points_possible": (submission.get("assignment") or {}).get("points_possible"),
+            "graded_at": submission.get("graded_at")
+        })
+
+    return {"grades": grades, "courses": courses, "assignments": assignments}
+
+class CanvasDeltaSync:
+    """
+    One user's Canvas sync over the shared aiohttp session
+    Courses and assignments are fetched in full (Canvas has no updated-since
+    filter for them); submissions use graded_since once a course has a cursor.
+    A throttled request pauses the whole sync for a jittered, exponentially
+    growing backoff and is retried up to max_retries times
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        canvas_url: str,
+        canvas_token: str,
+        store: SyncStateStore,
+        max_concurrency: int = 4,
+        http_cache: Optional[ConditionalResponseCache] = None,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        max_retries: int = 5
+    ):
+        self.session = session
+        self.canvas_url = canvas_url.rstrip("/")
+        self.canvas_token = canvas_token
+        self.headers = {"Authorization": f"Bearer {canvas_token}"}
+        self.store = store
+        self.http_cache = http_cache
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.api_calls = 0
+        self.throttled = 0
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retries = max_retries
+        self.blocked_until = 0.0
+
+    async def fetch_pages(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """GET every page of an endpoint, following Link rel="next" headers"""
+        url: Optional[str] = f"{self.canvas_url}{endpoint}"
+        query = [(k, str(v)) for k, v in (params or {}).items()]
+        records: List[Dict] = []
+        while url:
+            async with self.semaphore:
+                page, url = await self._get_page_with_backoff(url, query)
+            records.extend(page)
+            query = []
+        return records
+
+    async def _get_page_with_backoff(self, url: str, query: List[Tuple[str, str]]) -> Tuple[Any, Optional[str]]:
+        """_get_page, waiting out the sync-wide pause and retrying throttled requests"""
+        for attempt in range(self.max_retries + 1):
+            delay = self.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.api_calls += 1
+            try:
+                return await self._get_page(url, query)
+            except CanvasRateLimited as e:
+                self.throttled += 1
+                if attempt == self.max_retries:
+                    raise
+                delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+                logger.warning(f"⏳ Canvas throttled the sync ({e}), backing off {delay:.1f}s")
+
+    async def _get_page(self, url: str, query: List[Tuple[str, str]]) -> Tuple[Any, Optional[str]]:
+        """One page and its next link - revalidated through the HTTP cache when there is one"""
+        if self.http_cache:
+            return await self.http_cache.get_page(self.session, url, query, self.canvas_token)
+        async with self.session.get(url, params=query, headers=self.headers) as response:
+            await raise_for_canvas_status(response)
+            next_link = response.links.get("next")
+            return await response.json(content_type=None), str(next_link["url"]) if next_link else None
+
+    async def _fetch_course(self, course: Dict, cursors: Dict[str, str]) -> Tuple[Any, Any]:
+        """Assignments and graded submissions for one course; failures come back as exceptions"""
+        course_id = course["id"]
+        params = {"per_page": 100}
+        if cursors.get("submissions"):
+            params["graded_since"] = cursors["submissions"]
+        return await asyncio.gather(
+            self.fetch_pages(f"/api/v1/courses/{course_id}/assignments", {"per_page": 100}),
+            self.fetch_pages(f"/api/v1/courses/{course_id}/students/self/submissions", params),
+            return_exceptions=True
+        )
+
+    async def run(self, user_id: str) -> Dict[str, Any]:
+        """
+        Sync one user and persist the merged snapshot and advanced cursors
+        Returns courses, merged assignments/submissions, per-resource delta counts
+        (records kept from the previous sync because their fetch failed count as
+        stale) and a status: "ok", "partial" with some fetches failed, or
+        "failed" when every course fetch did
+        """
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(None, self.store.load, user_id)
+        started = datetime.now(timezone.utc).isoformat()
+
+        courses = await self.fetch_pages("/api/v1/courses", {"enrollment_state": "active", "per_page": 100})
+        results = await asyncio.gather(
+            *(self._fetch_course(course, state["cursors"].get(str(course["id"]), {})) for course in courses)
+        )
+
+        counts = {resource: new_counts() for resource in RESOURCES}
+        merged: Dict[str, List[Dict]] = {resource: [] for resource in RESOURCES}
+        snapshot = {resource: {} for resource in RESOURCES}
+        cursors: Dict[str, Dict[str, str]] = {}
+        errors = []
+
+        for course, fetched in zip(courses, results):
+            course_key = str(course["id"])
+            course_cursors = state["cursors"].get(course_key, {})
+            for resource, records in zip(RESOURCES, fetched):
+                previous = state["snapshot"].get(resource, {}).get(course_key, {})
+                if isinstance(records, Exception):
+                    # Keep the previous records and cursor; retry in full next time
+                    errors.append(f"{resource} for course {course_key}: {records}")
+                    snapshot[resource][course_key] = keep_records(previous, counts[resource])
+                    if resource in course_cursors:
+                        cursors.setdefault(course_key, {})[resource] = course_cursors[resource]
+                else:
+                    if resource == "submissions":
+                        records = [r for r in records if r.get("score") is not None]
+                    for record in records:
+                        record["course_id"] = course["id"]
+                    complete = resource == "assignments" or not course_cursors.get(resource)
+                    snapshot[resource][course_key] = merge_records(previous, records, complete, counts[resource])
+                    cursors.setdefault(course_key, {})[resource] = started
+                merged[resource].extend(snapshot[resource][course_key].values())
+
+        # Courses that dropped out of the active list lose their cursor and records
+        await loop.run_in_executor(None, self.store.save, user_id, {"cursors": cursors, "snapshot": snapshot})
+
+        if not errors:
+            status = "ok"
+        elif len(errors) == len(courses) * len(RESOURCES):
+            status = "failed"
+        else:
+            status = "partial"
+
+        return {
+            "status": status,
+            "courses": courses,
+            "assignments": merged["assignments"],
+            "submissions": merged["submissions"],
+            "delta": counts,
+            "since": started,
+            "api_calls": self.api_calls,
+            "throttled": self.throttled,
+            "errors": errors
+        }
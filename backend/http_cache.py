@@ -0,0 +1,107 @@
+"""
+Conditional GET cache for Canvas API calls
+Keeps each response body with its ETag/Last-Modified per URL, query and token,
+revalidates with If-None-Match/If-Modified-Since and serves 304s from the store.
+The store itself is shared with scripts/canvas_fetcher.py
+"""
+import asyncio
+import json
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from canvas_shared import HttpCache
+
+logger = logging.getLogger(__name__)
+
+def data_path(name: str) -> str:
+    """Default location of a backend SQLite file - under BACKEND_DATA_DIR (default backend/data/)"""
+    directory = os.getenv("BACKEND_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+class CanvasRateLimited(Exception):
+    """Canvas refused a request for quota - 403 "Rate Limit Exceeded" or 429"""
+
+async def raise_for_canvas_status(response: aiohttp.ClientResponse):
+    """raise_for_status, but a throttled request raises CanvasRateLimited so callers can back off"""
+    if response.status == 429 or (response.status == 403 and "rate limit" in (await response.text()).lower()):
+        raise CanvasRateLimited(
+            f"{response.status} rate limited, {response.headers.get('X-Rate-Limit-Remaining', '?')} quota left"
+        )
+    response.raise_for_status()
+
+class ConditionalResponseCache(HttpCache):
+    """The shared HTTP cache (scripts/canvas_http_cache.py) with an aiohttp page fetch and request counters"""
+
+    def __init__(self, path: str, max_age: float = 30 * 86400):
+        super().__init__(path, max_age)
+        self.stats["requests"] = 0
+        logger.info(f"📦 Canvas HTTP cache at {path}")
+
+    async def get_page(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        params: List[Tuple[str, str]],
+        token: str
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        Conditional GET of one page; returns (decoded JSON, next page URL)
+        A 304 is answered from the stored body, with the stored next link; one
+        with no stored body to serve is treated as a miss and fetched in full
+        """
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self.lookup, url, params, token)
+
+        headers = {"Authorization": f"Bearer {token}", **self.conditional_headers(cached)}
+        self.stats["requests"] += 1
+        async with session.get(url, params=params, headers=headers) as response:
+            if response.status != 304:
+                return await self._read(loop, url, params, token, response)
+            if cached:
+                return await loop.run_in_executor(None, self.not_modified, cached)
+
+        # Nothing stored to answer the 304 with (e.g. sent by an intermediary) - refetch unconditionally
+        self.stats["requests"] += 1
+        headers = {"Authorization": f"Bearer {token}", "Cache-Control": "no-cache"}
+        async with session.get(url, params=params, headers=headers) as response:
+            if response.status == 304:
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history, status=304,
+                    message="Not Modified for an unconditional request"
+                )
+            return await self._read(loop, url, params, token, response)
+
+    async def _read(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        url: str,
+        params: List[Tuple[str, str]],
+        token: str,
+        response: aiohttp.ClientResponse
+    ) -> Tuple[Any, Optional[str]]:
+        """Decode a full response and store it when it carries validators"""
+        await raise_for_canvas_status(response)
+        body = await response.read()
+        next_link = response.links.get("next")
+        next_url = str(next_link["url"]) if next_link else None
+        await loop.run_in_executor(None, self.save, url, params, token, response.headers, body, next_url)
+        return json.loads(body), next_url
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "entries": self.entries(),
+            "not_modified_rate": round(self.stats["not_modified"] / requests, 3) if requests else 0.0
+        }
+
+def create_http_cache(path: Optional[str] = None) -> Optional[ConditionalResponseCache]:
+    """Build the HTTP cache from CANVAS_HTTP_CACHE_DB (default data/canvas_http_cache.db); off when set to ''"""
+    path = path if path is not None else os.getenv("CANVAS_HTTP_CACHE_DB")
+    if path is None:
+        path = data_path("canvas_http_cache.db")
+    return ConditionalResponseCache(path) if path else None
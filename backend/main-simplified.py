@@ -83,11 +83,11 @@ async def fetch_canvas_data(endpoint: str, user_id: str, canvas_token: str, canv
     cache_key = f"{user_id}:{endpoint}"
     
     # Check cache first
-    cached_data = cache.get(cache_key)
+    cached_data = cache.get(user_id, endpoint)
     if cached_data:
         performance_stats["cache_hits"] += 1
         logger.info(f"Cache hit for {cache_key}")
-        return cached_data
+        return cached_data["data"]
     
     performance_stats["cache_misses"] += 1
     logger.info(f"Cache miss for {cache_key}")
@@ -102,7 +102,7 @@ async def fetch_canvas_data(endpoint: str, user_id: str, canvas_token: str, canv
         data = await loop.run_in_executor(None, make_canvas_request, url, headers)
         
         # Cache the result
-        cache.set(cache_key, data)
+        cache.set(user_id, endpoint, data)
         
         return data
     except Exception as e:
@@ -135,7 +135,7 @@ async def get_courses(user_id: str, canvas_token: str, canvas_url: str):
     with PerformanceTimer():
         try:
             data = await fetch_canvas_data("courses", user_id, canvas_token, canvas_url)
-            return {"data": data, "cached": cache.get(f"{user_id}:courses") is not None}
+            return {"data": data, "cached": cache.get(user_id, "courses") is not None}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
@@ -145,7 +145,7 @@ async def get_assignments(user_id: str, canvas_token: str, canvas_url: str):
     with PerformanceTimer():
         try:
             data = await fetch_canvas_data("assignments", user_id, canvas_token, canvas_url)
-            return {"data": data, "cached": cache.get(f"{user_id}:assignments") is not None}
+            return {"data": data, "cached": cache.get(user_id, "assignments") is not None}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
@@ -155,7 +155,7 @@ async def get_grades(user_id: str, canvas_token: str, canvas_url: str):
     with PerformanceTimer():
         try:
             data = await fetch_canvas_data("grades", user_id, canvas_token, canvas_url)
-            return {"data": data, "cached": cache.get(f"{user_id}:grades") is not None}
+            return {"data": data, "cached": cache.get(user_id, "grades") is not None}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
@@ -178,9 +178,9 @@ async def get_all_canvas_data(user_id: str, canvas_token: str, canvas_url: str):
                 "assignments": assignments if not isinstance(assignments, Exception) else None,
                 "grades": grades if not isinstance(grades, Exception) else None,
                 "cached": {
-                    "courses": cache.get(f"{user_id}:courses") is not None,
-                    "assignments": cache.get(f"{user_id}:assignments") is not None,
-                    "grades": cache.get(f"{user_id}:grades") is not None
+                    "courses": cache.get(user_id, "courses") is not None,
+                    "assignments": cache.get(user_id, "assignments") is not None,
+                    "grades": cache.get(user_id, "grades") is not None
                 },
                 "errors": {
                     "courses": str(courses) if isinstance(courses, Exception) else None,
@@ -197,7 +197,7 @@ async def get_all_canvas_data(user_id: str, canvas_token: str, canvas_url: str):
 @app.post("/api/cache/clear")
 async def clear_cache():
     """Clear all cache data"""
-    cache.clear()
+    cache.clear_all()
     return {"message": "Cache cleared successfully"}
 
 @app.post("/api/cache/refresh/{user_id}")
@@ -207,8 +207,7 @@ async def refresh_user_cache(user_id: str, canvas_token: str, canvas_url: str, b
     async def refresh_data():
         try:
             # Clear existing cache for this user
-            for endpoint in ["courses", "assignments", "grades"]:
-                cache.delete(f"{user_id}:{endpoint}")
+            cache.invalidate(user_id)
             
             # Fetch fresh data
             await get_all_canvas_data(user_id, canvas_token, canvas_url)
@@ -1,9 +1,11 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Depends
+from fastapi import FastAPI, HTTPException, Request, Depends, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Awaitable, AsyncIterator
 import uvicorn
 import os
+import json
 import asyncio
 import aiohttp
 import time
@@ -11,6 +13,10 @@ import logging
 from datetime import datetime
 from dotenv import load_dotenv
 from cache_manager import performance_cache
+from cache_warmer import create_cache_warmer
+from canvas_sync import CanvasDeltaSync, SyncStateStore, create_sync_state_store, normalize_snapshot
+from http_cache import ConditionalResponseCache, create_http_cache
+from sync_scheduler import SyncJob, SyncQueueFull, SyncScheduler, create_sync_scheduler
 
 # Load environment variables
 load_dotenv()
@@ -49,10 +55,27 @@ class CacheStats(BaseModel):
     total_requests: int
     hit_counts: Dict[str, int]
     miss_counts: Dict[str, int]
+    coalesced_counts: Dict[str, int]
+    refresh_stats: Dict[str, int]
+    l2_stats: Dict[str, int]
     cache_sizes: Dict[str, int]
+    compression_stats: Dict[str, Dict[str, float]]
+    cache_bytes: Dict[str, Optional[int]]
+
+class CachePolicyUpdate(BaseModel):
+    ttl: Optional[float] = None
+    refresh_threshold: Optional[float] = None
+    jitter: Optional[float] = None
+    stale_ttl: Optional[float] = None
 
 # Global session for connection pooling
 http_session: Optional[aiohttp.ClientSession] = None
+sync_state_store: Optional[SyncStateStore] = None
+canvas_http_cache: Optional[ConditionalResponseCache] = None
+sync_scheduler: Optional[SyncScheduler] = None
+
+# Pre-warms active users' entries ahead of expiry (CACHE_WARM_INTERVAL=0 disables)
+cache_warmer = create_cache_warmer(performance_cache)
 
 @app.on_event("startup")
 async def startup_event():
@@ -64,14 +87,43 @@ async def startup_event():
         timeout=timeout,
         connector=connector
     )
+    
+    # Loaders for stale-while-revalidate refreshes of hot keys
+    performance_cache.register_loader("grades", lambda uid: fetch_grades_from_db(uid, http_session))
+    performance_cache.register_loader("courses", lambda uid: fetch_courses_from_db(uid, http_session))
+    performance_cache.register_loader("assignments", lambda uid: fetch_assignments_from_db(uid, http_session))
+    
+    # Per-user delta sync cursors for background_canvas_sync
+    global sync_state_store, canvas_http_cache
+    if sync_state_store is None:
+        sync_state_store = create_sync_state_store()
+        canvas_http_cache = create_http_cache()
+    
+    # Worker pool behind POST /api/canvas/sync/{user_id}
+    global sync_scheduler
+    if sync_scheduler is None:
+        sync_scheduler = create_sync_scheduler(run_sync_job)
+        await sync_scheduler.start()
+    
+    # Start warm from the persistent tier when CACHE_L2_PATH is set
+    performance_cache.warm_from_l2()
+    cache_warmer.start()
     logger.info("🚀 FastAPI server started with connection pooling")
 
 @app.on_event("shutdown") 
 async def shutdown_event():
     """Clean up HTTP session"""
     global http_session
+    if sync_scheduler:
+        await sync_scheduler.stop()
+    await cache_warmer.stop()
+    await performance_cache.shutdown()
     if http_session:
         await http_session.close()
+    if sync_state_store:
+        sync_state_store.close()
+    if canvas_http_cache:
+        canvas_http_cache.close()
 
 async def get_http_session() -> aiohttp.ClientSession:
     """Dependency to get HTTP session"""
@@ -80,6 +132,19 @@ async def get_http_session() -> aiohttp.ClientSession:
         await startup_event()
     return http_session
 
+def build_cached_response(field: str, entry: Dict[str, Any], source: str, response_time: float) -> Response:
+    """
+    Splice the entry's pre-encoded JSON bytes into the response envelope,
+    so the payload is never validated or serialized again
+    """
+    envelope = json.dumps({
+        "cached": source == "memory_cache",
+        "response_time_ms": response_time,
+        "source": source
+    })
+    body = b'{"' + field.encode() + b'":' + entry["json_bytes"] + b"," + envelope[1:].encode()
+    return Response(content=body, media_type="application/json")
+
 @app.get("/")
 async def root():
     """Health check endpoint with cache stats"""
@@ -105,37 +170,29 @@ async def get_cached_grades(
     start_time = time.time()
     
     try:
-        # Check cache first (unless force refresh)
-        if not force_refresh:
-            cached_data = performance_cache.get(user_id, "grades")
-            if cached_data:
-                response_time = (time.time() - start_time) * 1000
-                logger.info(f"⚡ Grades cache HIT - {response_time:.1f}ms")
-                return {
-                    "grades": cached_data["data"],
-                    "cached": True,
-                    "response_time_ms": response_time,
-                    "source": "memory_cache"
-                }
-        
-        # Cache miss - fetch from database/API
-        logger.info(f"🔄 Fetching grades for user {user_id}")
-        
-        # Simulate database fetch (replace with actual Supabase query)
-        # In production, this would call your Supabase API
-        grades_data = await fetch_grades_from_db(user_id, session)
-        
-        # Cache the result
-        performance_cache.set(user_id, "grades", grades_data)
+        # Cache first (unless force refresh); concurrent misses share one load
+        entry, source = await performance_cache.get_or_load_entry(
+            user_id,
+            "grades",
+            lambda: fetch_grades_from_db(user_id, session),
+            force_refresh=force_refresh
+        )
+        cache_warmer.record_access(user_id, "grades", entry, source)
         
         response_time = (time.time() - start_time) * 1000
-        logger.info(f"💾 Grades fetched and cached - {response_time:.1f}ms")
+        if source == "memory_cache":
+            logger.info(f"⚡ Grades cache HIT - {response_time:.1f}ms")
+        else:
+            logger.info(f"💾 Grades fetched and cached ({source}) - {response_time:.1f}ms")
+        
+        if "json_bytes" in entry:
+            return build_cached_response("grades", entry, source, response_time)
         
         return {
-            "grades": grades_data,
-            "cached": False,
+            "grades": entry["data"],
+            "cached": source == "memory_cache",
             "response_time_ms": response_time,
-            "source": "database"
+            "source": source
         }
         
     except Exception as e:
@@ -155,29 +212,29 @@ async def get_cached_courses(
     start_time = time.time()
     
     try:
-        # Check cache first
-        if not force_refresh:
-            cached_data = performance_cache.get(user_id, "courses")
-            if cached_data:
-                response_time = (time.time() - start_time) * 1000
-                logger.info(f"⚡ Courses cache HIT - {response_time:.1f}ms")
-                return {
-                    "courses": cached_data["data"],
-                    "cached": True,
-                    "response_time_ms": response_time,
-                    "source": "memory_cache"
-                }
-        
-        # Fetch from database
-        courses_data = await fetch_courses_from_db(user_id, session)
-        performance_cache.set(user_id, "courses", courses_data)
+        # Cache first; concurrent misses share one load
+        entry, source = await performance_cache.get_or_load_entry(
+            user_id,
+            "courses",
+            lambda: fetch_courses_from_db(user_id, session),
+            force_refresh=force_refresh
+        )
+        cache_warmer.record_access(user_id, "courses", entry, source)
         
         response_time = (time.time() - start_time) * 1000
+        if source == "memory_cache":
+            logger.info(f"⚡ Courses cache HIT - {response_time:.1f}ms")
+        else:
+            logger.info(f"💾 Courses fetched and cached ({source}) - {response_time:.1f}ms")
+        
+        if "json_bytes" in entry:
+            return build_cached_response("courses", entry, source, response_time)
+        
         return {
-            "courses": courses_data,
-            "cached": False,
+            "courses": entry["data"],
+            "cached": source == "memory_cache",
             "response_time_ms": response_time,
-            "source": "database"
+            "source": source
         }
         
     except Exception as e:
@@ -197,29 +254,29 @@ async def get_cached_assignments(
     start_time = time.time()
     
     try:
-        # Check cache first
-        if not force_refresh:
-            cached_data = performance_cache.get(user_id, "assignments")
-            if cached_data:
-                response_time = (time.time() - start_time) * 1000
-                logger.info(f"⚡ Assignments cache HIT - {response_time:.1f}ms")
-                return {
-                    "assignments": cached_data["data"],
-                    "cached": True,
-                    "response_time_ms": response_time,
-                    "source": "memory_cache"
-                }
-        
-        # Fetch from database
-        assignments_data = await fetch_assignments_from_db(user_id, session)
-        performance_cache.set(user_id, "assignments", assignments_data)
+        # Cache first; concurrent misses share one load
+        entry, source = await performance_cache.get_or_load_entry(
+            user_id,
+            "assignments",
+            lambda: fetch_assignments_from_db(user_id, session),
+            force_refresh=force_refresh
+        )
+        cache_warmer.record_access(user_id, "assignments", entry, source)
         
         response_time = (time.time() - start_time) * 1000
+        if source == "memory_cache":
+            logger.info(f"⚡ Assignments cache HIT - {response_time:.1f}ms")
+        else:
+            logger.info(f"💾 Assignments fetched and cached ({source}) - {response_time:.1f}ms")
+        
+        if "json_bytes" in entry:
+            return build_cached_response("assignments", entry, source, response_time)
+        
         return {
-            "assignments": assignments_data,
-            "cached": False,
+            "assignments": entry["data"],
+            "cached": source == "memory_cache",
             "response_time_ms": response_time,
-            "source": "database"
+            "source": source
         }
         
     except Exception as e:
@@ -229,33 +286,58 @@ async def get_cached_assignments(
 @app.get("/api/canvas/all/{user_id}")
 async def get_all_canvas_data_parallel(
     user_id: str,
+    budget_ms: float = Query(3000, gt=0),
     session: aiohttp.ClientSession = Depends(get_http_session)
 ) -> Dict[str, Any]:
     """
     Fetch ALL Canvas data in parallel for dashboard
+    Every section must finish within budget_ms; one that is too slow is
+    cancelled and one that fails is reported, and both fall back to stale
+    cached data (flagged in "sections", kept only for types with a stale_ttl)
+    or null, so the response time is
+    bounded by the budget instead of the slowest fetch
     Target: <3s response time for complete dashboard
     """
     start_time = time.time()
     
     try:
-        # Parallel fetch using asyncio.gather
         logger.info(f"🚀 Parallel fetch starting for user {user_id}")
         
-        tasks = [
-            fetch_grades_from_cache_or_db(user_id, session),
-            fetch_courses_from_cache_or_db(user_id, session), 
-            fetch_assignments_from_cache_or_db(user_id, session)
-        ]
+        timings: Dict[str, float] = {}
+        tasks = {
+            section: asyncio.create_task(timed_section(section, fetch(user_id, session), timings))
+            for section, fetch in DASHBOARD_SECTIONS.items()
+        }
+        done, pending = await asyncio.wait(tasks.values(), timeout=budget_ms / 1000)
         
-        grades_data, courses_data, assignments_data = await asyncio.gather(*tasks)
+        # Cancelling only abandons the wait - the shared cache load keeps
+        # running and caches its result for the next request
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        response: Dict[str, Any] = {}
+        sections: Dict[str, Dict[str, Any]] = {}
+        for section, task in tasks.items():
+            report = {"status": "fresh", "stale": False, "elapsed_ms": timings.get(section)}
+            if task in pending:
+                report["status"] = "timeout"
+            elif task.exception() is not None:
+                report.update(status="error", error=str(task.exception()))
+                logger.warning(f"⚠️ Dashboard section {section} failed for user {user_id}: {task.exception()}")
+            
+            response[section] = task.result() if report["status"] == "fresh" else section_fallback(user_id, section, report)
+            sections[section] = report
         
         response_time = (time.time() - start_time) * 1000
-        logger.info(f"⚡ Parallel fetch completed - {response_time:.1f}ms")
+        partial = any(report["status"] != "fresh" for report in sections.values())
+        logger.info(f"⚡ Parallel fetch completed{' (partial)' if partial else ''} - {response_time:.1f}ms")
         
         return {
-            "grades": grades_data,
-            "courses": courses_data,
-            "assignments": assignments_data,
+            **response,
+            "sections": sections,
+            "partial": partial,
+            "budget_ms": budget_ms,
             "response_time_ms": response_time,
             "parallel_fetch": True,
             "timestamp": datetime.now().isoformat()
@@ -265,88 +347,301 @@ async def get_all_canvas_data_parallel(
         logger.error(f"❌ Error in parallel fetch: {e}")
         raise HTTPException(status_code=500, detail=f"Parallel fetch failed: {str(e)}")
 
+@app.get("/api/canvas/all/{user_id}/stream")
+async def stream_all_canvas_data(
+    user_id: str,
+    budget_ms: float = Query(3000, gt=0),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    session: aiohttp.ClientSession = Depends(get_http_session)
+) -> StreamingResponse:
+    """
+    Streaming variant of /api/canvas/all - one frame per section as it is ready
+    Cached sections are flushed before any database load starts; the rest
+    follow as they finish, with the same budget and stale fallback. A final
+    "complete" frame carries the totals. format=sse sends Server-Sent Events
+    """
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_dashboard(user_id, session, budget_ms, format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/canvas/sync/{user_id}")
 async def trigger_background_sync(
     user_id: str,
     credentials: CanvasCredentials,
-    background_tasks: BackgroundTasks,
+    priority: str = "interactive",
     session: aiohttp.ClientSession = Depends(get_http_session)
 ) -> Dict[str, Any]:
     """
-    Trigger background Canvas sync without blocking
+    Queue a background Canvas sync without blocking
+    Repeat requests for a user coalesce into the sync already queued;
+    priority=periodic marks scheduled syncs, which yield to interactive ones
     """
     try:
-        # Invalidate cache to force fresh data
-        performance_cache.invalidate(user_id)
-        
-        # Add background task for heavy sync operation
-        background_tasks.add_task(
-            background_canvas_sync, 
-            user_id, 
-            credentials.canvas_url, 
-            credentials.canvas_token,
-            session
-        )
+        # Cached data keeps being served until the sync swaps in the fresh snapshot
+        job, status = sync_scheduler.submit(user_id, credentials.canvas_url, credentials.canvas_token, priority)
         
         return {
-            "message": "Background sync started",
+            "message": "Background sync queued" if status == "queued" else "Background sync already queued",
             "user_id": user_id,
-            "timestamp": datetime.now().isoformat(),
-            "estimated_completion": "2-5 minutes"
+            "status": status,
+            "job": job.to_dict(),
+            "timestamp": datetime.now().isoformat()
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SyncQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Sync queue is full: {e}")
     except Exception as e:
         logger.error(f"❌ Sync trigger error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to trigger sync: {str(e)}")
 
+@app.get("/api/canvas/sync/{user_id}/status")
+async def get_sync_status(user_id: str) -> Dict[str, Any]:
+    """Queued, running and last finished sync for a user, with timings"""
+    status = sync_scheduler.status(user_id) if sync_scheduler else None
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No sync requested for user {user_id}")
+    return status
+
+@app.get("/api/canvas/sync/stats")
+async def get_sync_statistics() -> Dict[str, Any]:
+    """Sync scheduler counters and current queue depth"""
+    return sync_scheduler.get_stats() if sync_scheduler else {}
+
+@app.get("/api/cache/warming/stats")
+async def get_cache_warming_statistics() -> Dict[str, Any]:
+    """Pre-warming settings, totals and the most recent cycles"""
+    return cache_warmer.get_stats()
+
 @app.get("/api/cache/stats")
 async def get_cache_statistics() -> CacheStats:
     """Get detailed cache performance statistics"""
     stats = performance_cache.get_stats()
     return CacheStats(**stats)
 
-@app.delete("/api/cache/{user_id}")
-async def invalidate_user_cache(user_id: str, data_type: Optional[str] = None):
-    """Invalidate cache for specific user and data type"""
-    performance_cache.invalidate(user_id, data_type)
+@app.get("/api/canvas/http-cache/stats")
+async def get_canvas_http_cache_statistics() -> Dict[str, Any]:
+    """Conditional GET stats for Canvas calls made by background syncs"""
+    if canvas_http_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **canvas_http_cache.get_stats()}
+
+@app.get("/api/cache/policy")
+async def get_cache_policies() -> Dict[str, Any]:
+    """Get the active cache policy per data type"""
+    return performance_cache.get_policies()
+
+@app.put("/api/cache/policy/{data_type}")
+async def update_cache_policy(data_type: str, update: CachePolicyUpdate) -> Dict[str, Any]:
+    """Tune TTL, refresh threshold, jitter or stale TTL for a data type without a redeploy"""
+    changes = update.model_dump(exclude_none=True)
+    try:
+        performance_cache.update_policy(data_type, **changes)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown cache data type: {data_type}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
+        "message": f"Cache policy updated for {data_type}",
+        "policy": performance_cache.get_policies()[data_type]
+    }
+
+@app.delete("/api/cache")
+async def invalidate_tagged_cache(
+    course_id: Optional[str] = None,
+    data_type: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None)
+):
+    """Invalidate entries across all users by course and/or tag, e.g. after a course-wide grade change"""
+    tags = ([f"course:{course_id}"] if course_id is not None else []) + (tag or [])
+    if not tags:
+        raise HTTPException(status_code=400, detail="Specify course_id or at least one tag")
+    if data_type and data_type not in performance_cache.get_policies():
+        raise HTTPException(status_code=404, detail=f"Unknown cache data type: {data_type}")
+    invalidated = performance_cache.invalidate_tags(tags, data_type)
+    return {
+        "message": f"Cache invalidated for tags {', '.join(tags)}",
+        "data_type": data_type or "all",
+        "invalidated": invalidated
+    }
+
+@app.delete("/api/cache/{user_id}")
+async def invalidate_user_cache(
+    user_id: str,
+    data_type: Optional[str] = None,
+    course_id: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None)
+):
+    """Invalidate cache for specific user, optionally narrowed to a data type, course or tags"""
+    invalidated = performance_cache.invalidate(user_id, data_type, course_id=course_id, tags=tag)
+    response = {
         "message": f"Cache invalidated for user {user_id}",
         "data_type": data_type or "all"
     }
+    if invalidated is not None:
+        response["invalidated"] = invalidated
+    return response
 
 # Helper functions for data fetching
-async def fetch_grades_from_cache_or_db(user_id: str, session: aiohttp.ClientSession):
+async def fetch_grades_from_cache_or_db(user_id: str, session: aiohttp.ClientSession, force_refresh: bool = False):
     """Fetch grades from cache or database"""
-    cached = performance_cache.get(user_id, "grades")
-    if cached:
-        return cached["data"]
-    
-    data = await fetch_grades_from_db(user_id, session)
-    performance_cache.set(user_id, "grades", data)
-    return data
+    entry, source = await performance_cache.get_or_load_entry(
+        user_id, "grades", lambda: fetch_grades_from_db(user_id, session), force_refresh=force_refresh
+    )
+    cache_warmer.record_access(user_id, "grades", entry, source)
+    return entry["data"]
 
-async def fetch_courses_from_cache_or_db(user_id: str, session: aiohttp.ClientSession):
+async def fetch_courses_from_cache_or_db(user_id: str, session: aiohttp.ClientSession, force_refresh: bool = False):
     """Fetch courses from cache or database"""
-    cached = performance_cache.get(user_id, "courses")
-    if cached:
-        return cached["data"]
-    
-    data = await fetch_courses_from_db(user_id, session)
-    performance_cache.set(user_id, "courses", data)
-    return data
+    entry, source = await performance_cache.get_or_load_entry(
+        user_id, "courses", lambda: fetch_courses_from_db(user_id, session), force_refresh=force_refresh
+    )
+    cache_warmer.record_access(user_id, "courses", entry, source)
+    return entry["data"]
 
-async def fetch_assignments_from_cache_or_db(user_id: str, session: aiohttp.ClientSession):
+async def fetch_assignments_from_cache_or_db(user_id: str, session: aiohttp.ClientSession, force_refresh: bool = False):
     """Fetch assignments from cache or database"""
-    cached = performance_cache.get(user_id, "assignments")
-    if cached:
-        return cached["data"]
+    entry, source = await performance_cache.get_or_load_entry(
+        user_id, "assignments", lambda: fetch_assignments_from_db(user_id, session), force_refresh=force_refresh
+    )
+    cache_warmer.record_access(user_id, "assignments", entry, source)
+    return entry["data"]
+
+# Sections of the aggregated dashboard, in response order
+DASHBOARD_SECTIONS = {
+    "grades": fetch_grades_from_cache_or_db,
+    "courses": fetch_courses_from_cache_or_db,
+    "assignments": fetch_assignments_from_cache_or_db
+}
+
+async def timed_section(section: str, fetch: Awaitable[Any], timings: Dict[str, float]) -> Any:
+    """Await one dashboard section, recording how long it took even when it fails"""
+    started = time.perf_counter()
+    try:
+        return await fetch
+    finally:
+        timings[section] = round((time.perf_counter() - started) * 1000, 2)
+
+def section_fallback(user_id: str, section: str, report: Dict[str, Any]) -> Any:
+    """Stale cached data (or None) for a section that timed out or failed; flags it in report"""
+    stale = performance_cache.get_stale_entry(user_id, section)
+    report.update(stale=stale is not None, cached_at=stale["cached_at"] if stale else None)
+    return stale["data"] if stale else None
+
+def encode_frame(frame: Dict[str, Any], format: str, data_json: Optional[bytes] = None) -> bytes:
+    """
+    One NDJSON line or SSE event; data_json (pre-encoded JSON bytes of the
+    section data) is spliced in as "data" instead of serializing it again
+    """
+    body = json.dumps(frame, default=str).encode()
+    if data_json is not None:
+        body = b'{"data":' + data_json + b"," + body[1:]
+    if format == "sse":
+        return b"event: " + frame["type"].encode() + b"\ndata: " + body + b"\n\n"
+    return body + b"\n"
+
+async def stream_dashboard(
+    user_id: str, session: aiohttp.ClientSession, budget_ms: float, format: str
+) -> AsyncIterator[bytes]:
+    """Frames for stream_all_canvas_data: cache hits first, then loads in completion order"""
+    start_time = time.time()
+    statuses: Dict[str, str] = {}
+    
+    def elapsed() -> float:
+        return round((time.time() - start_time) * 1000, 2)
+    
+    # Cache hits go out before any load is started
+    misses = []
+    for section in DASHBOARD_SECTIONS:
+        entry = performance_cache.get(user_id, section)
+        if entry is None:
+            misses.append(section)
+            continue
+        cache_warmer.record_access(user_id, section, entry, "memory_cache")
+        statuses[section] = "fresh"
+        frame = {"type": "section", "section": section, "status": "fresh", "stale": False,
+                 "source": "memory_cache", "elapsed_ms": elapsed()}
+        if "json_bytes" in entry:
+            yield encode_frame(frame, format, entry["json_bytes"])
+        else:
+            yield encode_frame({"data": entry["data"], **frame}, format)
+    
+    # Misses were just counted - load them without checking the cache again
+    timings: Dict[str, float] = {}
+    tasks = {
+        asyncio.create_task(
+            timed_section(section, DASHBOARD_SECTIONS[section](user_id, session, force_refresh=True), timings)
+        ): section
+        for section in misses
+    }
+    pending = set(tasks)
+    deadline = start_time + budget_ms / 1000
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - time.time()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                section = tasks[task]
+                report: Dict[str, Any] = {"status": "fresh", "stale": False}
+                if task.exception() is not None:
+                    report.update(status="error", error=str(task.exception()))
+                    logger.warning(f"⚠️ Dashboard section {section} failed for user {user_id}: {task.exception()}")
+                    data = section_fallback(user_id, section, report)
+                else:
+                    data = task.result()
+                statuses[section] = report["status"]
+                yield encode_frame(
+                    {"data": data, "type": "section", "section": section, **report,
+                     "source": "database", "elapsed_ms": elapsed(), "load_ms": timings.get(section)},
+                    format
+                )
+        
+        # Past the budget - the shared loads keep running and cache their results
+        for task in pending:
+            task.cancel()
+            section = tasks[task]
+            report = {"status": "timeout"}
+            data = section_fallback(user_id, section, report)
+            statuses[section] = "timeout"
+            yield encode_frame(
+                {"data": data, "type": "section", "section": section, **report, "elapsed_ms": elapsed()}, format
+            )
+    finally:
+        # Also reached when the client disconnects mid-stream
+        for task in pending:
+            task.cancel()
     
-    data = await fetch_assignments_from_db(user_id, session)
-    performance_cache.set(user_id, "assignments", data)
-    return data
+    partial = any(status != "fresh" for status in statuses.values())
+    logger.info(f"⚡ Streamed dashboard for user {user_id}{' (partial)' if partial else ''} - {elapsed():.1f}ms")
+    yield encode_frame(
+        {"type": "complete", "sections": statuses, "partial": partial, "budget_ms": budget_ms,
+         "response_time_ms": elapsed(), "timestamp": datetime.now().isoformat()},
+        format
+    )
+
+async def load_synced_data(user_id: str, data_type: str) -> Optional[List[Dict]]:
+    """
+    The user's records from their last background sync, or None before one
+    The loaders serve these first, so a warmer or SWR refresh after a sync
+    rewrites the swapped-in snapshot instead of replacing it with older data
+    """
+    if sync_state_store is None:
+        return None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, sync_state_store.load_data, user_id, data_type)
 
 async def fetch_grades_from_db(user_id: str, session: aiohttp.ClientSession) -> List[Dict]:
-    """Simulate database fetch for grades (replace with actual Supabase call)"""
+    """Grades from the last background sync, else simulate database fetch (replace with actual Supabase call)"""
+    synced = await load_synced_data(user_id, "grades")
+    if synced is not None:
+        return synced
     await asyncio.sleep(0.1)  # Simulate DB query time
     return [
         {"id": 1, "score": 95, "assignment": "Quiz 1", "course": "Math 101"},
@@ -354,7 +649,10 @@ async def fetch_grades_from_db(user_id: str, session: aiohttp.ClientSession) ->
     ]
 
 async def fetch_courses_from_db(user_id: str, session: aiohttp.ClientSession) -> List[Dict]:
-    """Simulate database fetch for courses"""
+    """Courses from the last background sync, else simulate database fetch"""
+    synced = await load_synced_data(user_id, "courses")
+    if synced is not None:
+        return synced
     await asyncio.sleep(0.1)
     return [
         {"id": 1, "name": "Math 101", "code": "MATH101"},
@@ -362,28 +660,63 @@ async def fetch_courses_from_db(user_id: str, session: aiohttp.ClientSession) ->
     ]
 
 async def fetch_assignments_from_db(user_id: str, session: aiohttp.ClientSession) -> List[Dict]:
-    """Simulate database fetch for assignments"""
+    """Assignments from the last background sync, else simulate database fetch"""
+    synced = await load_synced_data(user_id, "assignments")
+    if synced is not None:
+        return synced
     await asyncio.sleep(0.1)
     return [
         {"id": 1, "name": "Quiz 2", "due_date": "2024-12-20", "course_id": 1},
         {"id": 2, "name": "Final Essay", "due_date": "2024-12-22", "course_id": 2}
     ]
 
-async def background_canvas_sync(user_id: str, canvas_url: str, canvas_token: str, session: aiohttp.ClientSession):
-    """Background task for heavy Canvas API sync"""
+async def run_sync_job(job: SyncJob) -> Dict[str, Any]:
+    """Sync scheduler runner - one job over the pooled session"""
+    return await background_canvas_sync(job.user_id, job.canvas_url, job.canvas_token, await get_http_session())
+
+async def background_canvas_sync(
+    user_id: str, canvas_url: str, canvas_token: str, session: aiohttp.ClientSession
+) -> Dict[str, Any]:
+    """Background task for heavy Canvas API sync; returns a summary and re-raises failures"""
     try:
         logger.info(f"🔄 Starting background sync for user {user_id}")
         
-        # Simulate heavy Canvas API calls
-        await asyncio.sleep(2)  # Simulate API calls
+        # Delta sync - only submissions graded since this user's last sync are requested
+        store = sync_state_store or create_sync_state_store()
+        sync = CanvasDeltaSync(session, canvas_url, canvas_token, store, http_cache=canvas_http_cache)
+        result = await sync.run(user_id)
+        if result["status"] == "failed":
+            raise RuntimeError(f"every course fetch failed ({len(result['errors'])} requests), e.g. {result['errors'][0]}")
+        
+        # Persist where the loaders read it first, so later refreshes keep the synced data
+        snapshot = normalize_snapshot(result)
+        await asyncio.get_running_loop().run_in_executor(None, store.save_data, user_id, snapshot)
         
-        # Update cache with fresh data after sync
-        performance_cache.invalidate(user_id)
+        # Swap the fresh data in - readers see the old or the new snapshot, never a miss
+        performance_cache.swap_user_data(user_id, snapshot)
         
-        logger.info(f"✅ Background sync completed for user {user_id}")
+        delta = ", ".join(
+            f"{resource} {counts['new']} new/{counts['updated']} updated/{counts['unchanged']} unchanged/{counts['stale']} stale"
+            for resource, counts in result["delta"].items()
+        )
+        finished = "completed" if result["status"] == "ok" else "partially completed"
+        logger.info(
+            f"✅ Background sync {finished} for user {user_id} in {result['api_calls']} API calls "
+            f"({result['throttled']} throttled): {delta}"
+        )
+        for error in result["errors"]:
+            logger.warning(f"⚠️ Background sync for user {user_id} kept previous {error}")
+        return {
+            "status": result["status"],
+            "api_calls": result["api_calls"],
+            "throttled": result["throttled"],
+            "delta": result["delta"],
+            "errors": result["errors"]
+        }
         
     except Exception as e:
-        logger.error(f"❌ Background sync failed for user {user_id}: {e}")
+        logger.error(f"❌ Background sync failed for user {user_id}, keeping cached data: {e}")
+        raise
 
 if __name__ == "__main__":
     uvicorn.run(
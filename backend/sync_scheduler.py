@@ -0,0 +1,207 @@
+"""
+In-process scheduler for background Canvas syncs
+A fixed pool of workers drains a priority queue, interactive requests ahead of
+periodic ones. Each user has at most one running and one queued sync: repeat
+requests coalesce into the queued job (taking the newest credentials and the
+more urgent priority), and a request that arrives mid-sync queues one follow-up
+that starts when the running sync finishes. A runner result with status
+"partial" (some fetches failed) leaves the job in the partial state
+"""
+import asyncio
+import itertools
+import os
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "periodic": 1}
+
+class SyncQueueFull(Exception):
+    """Raised when the queue already holds max_queued jobs"""
+
+@dataclass
+class SyncJob:
+    """One user's sync, from first request to completion (the token is dropped once it has run)"""
+    user_id: str
+    canvas_url: str
+    canvas_token: Optional[str]
+    priority: str = "interactive"
+    state: str = "queued"
+    requested_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    requests: int = 1
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status view - timings in ms, credentials left out"""
+        now = time.time()
+        started = self.started_at or now
+        return {
+            "state": self.state,
+            "priority": self.priority,
+            "requests": self.requests,
+            "requested_at": self.requested_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wait_ms": round((started - self.requested_at) * 1000, 2),
+            "run_ms": round(((self.finished_at or now) - self.started_at) * 1000, 2) if self.started_at else None,
+            "result": self.result,
+            "error": self.error
+        }
+
+class SyncScheduler:
+    """Bounded, deduplicating sync queue with a worker pool"""
+
+    def __init__(
+        self,
+        runner: Callable[[SyncJob], Awaitable[Optional[Dict[str, Any]]]],
+        workers: int = 4,
+        max_queued: int = 100
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._order = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+
+        # Per user: the queued job (in the heap, or waiting on the running one),
+        # the running job and the last finished job
+        self.queued: Dict[str, SyncJob] = {}
+        self.running: Dict[str, SyncJob] = {}
+        self.finished: Dict[str, SyncJob] = {}
+        self.max_finished = 10000
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "completed": 0, "partial": 0, "failed": 0}
+
+    async def start(self):
+        """Start the worker pool on the running loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"🧵 Sync scheduler started ({self.workers} workers, {self.max_queued} queued max)")
+
+    async def stop(self):
+        """Cancel workers; running syncs are interrupted and queued ones dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(
+        self, user_id: str, canvas_url: str, canvas_token: str, priority: str = "interactive"
+    ) -> Tuple[SyncJob, str]:
+        """
+        Queue a sync for user_id, or fold the request into the one already queued
+        Returns the job and how the request was handled ("queued" or "coalesced");
+        raises SyncQueueFull when a new job would exceed max_queued
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown sync priority: {priority}")
+        self.stats["submitted"] += 1
+
+        job = self.queued.get(user_id)
+        if job is not None:
+            job.requests += 1
+            job.canvas_url, job.canvas_token = canvas_url, canvas_token
+            self.stats["coalesced"] += 1
+            if PRIORITIES[priority] < PRIORITIES[job.priority]:
+                job.priority = priority
+                if user_id not in self.running:
+                    # The older heap entry is skipped when it comes up
+                    self._push(job)
+            return job, "coalesced"
+
+        if len(self.queued) >= self.max_queued:
+            self.stats["rejected"] += 1
+            raise SyncQueueFull(f"{len(self.queued)} syncs already queued")
+
+        job = SyncJob(user_id, canvas_url, canvas_token, priority)
+        self.queued[user_id] = job
+        if user_id not in self.running:
+            self._push(job)
+        return job, "queued"
+
+    def _push(self, job: SyncJob):
+        self._queue.put_nowait((PRIORITIES[job.priority], next(self._order), job))
+
+    def status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Queued, running and last finished sync for a user (None if never seen)"""
+        queued, running, finished = self.queued.get(user_id), self.running.get(user_id), self.finished.get(user_id)
+        current = running or queued or finished
+        if current is None:
+            return None
+        return {
+            "user_id": user_id,
+            "state": current.state,
+            "running": running.to_dict() if running else None,
+            "queued": queued.to_dict() if queued else None,
+            "last": finished.to_dict() if finished else None
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            priority, _, job = await self._queue.get()
+            if self.queued.get(job.user_id) is not job or PRIORITIES[job.priority] != priority:
+                continue  # superseded by a higher-priority entry for the same job
+            await self._run(job)
+
+    async def _run(self, job: SyncJob):
+        user_id = job.user_id
+        del self.queued[user_id]
+        self.running[user_id] = job
+        job.state = "running"
+        job.started_at = time.time()
+        try:
+            job.result = await self.runner(job)
+            if (job.result or {}).get("status") == "partial":
+                job.state = "partial"
+                self.stats["partial"] += 1
+            else:
+                job.state = "done"
+                self.stats["completed"] += 1
+        except asyncio.CancelledError:
+            job.state = "failed"
+            job.error = "cancelled"
+            raise
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            self.stats["failed"] += 1
+        finally:
+            job.finished_at = time.time()
+            # Finished jobs are kept for status only - no live credentials in memory
+            job.canvas_token = None
+            del self.running[user_id]
+            self._remember(job)
+            # A request that came in during this sync gets its turn now
+            follow_up = self.queued.get(user_id)
+            if follow_up is not None:
+                self._push(follow_up)
+
+    def _remember(self, job: SyncJob):
+        self.finished.pop(job.user_id, None)
+        self.finished[job.user_id] = job
+        while len(self.finished) > self.max_finished:
+            del self.finished[next(iter(self.finished))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "queued": len(self.queued),
+            "running": len(self.running)
+        }
+
+def create_sync_scheduler(runner: Callable[[SyncJob], Awaitable[Optional[Dict[str, Any]]]]) -> SyncScheduler:
+    """Build the scheduler from SYNC_WORKERS (default 4) and SYNC_QUEUE_SIZE (default 100)"""
+    return SyncScheduler(
+        runner,
+        workers=int(os.getenv("SYNC_WORKERS", "4")),
+        max_queued=int(os.getenv("SYNC_QUEUE_SIZE", "100"))
+    )
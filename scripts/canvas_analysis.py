@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+NumPy-backed analyze_data() for canvas_fetcher.py
+Same result as RunningAnalysis, computed over whole columns: due dates are
+parsed in bulk (the canonical Canvas form YYYY-MM-DDTHH:MM:SS[Z] straight
+from its code points, anything else row by row with datetime.fromisoformat),
+assignments are binned into upcoming/overdue/completed with boolean masks, and
+grade aggregates come out overall and per course.
+
+The per-row quirks of the loop are kept on purpose so results stay identical:
+unparseable due dates are skipped entirely, a submitted assignment counts as
+completed whatever its due date, and a due date whose awareness differs from
+`now` (the loop's naive-vs-aware TypeError) is neither upcoming nor overdue.
+Sums are accumulated left to right, as sum() does, so the rounding matches.
+
+The engine stays opt-in (canvas_fetcher.py --numpy). On 100k synthetic rows
+(analysis_benchmark.py) it is about 1.4x faster than the loop with a naive
+`now` but only on par with an aware one, where the loop no longer pays for a
+TypeError per row; the aware due dates themselves are converted in bulk. What
+is left is the per-row dict access that builds the columns.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # analyze_data keeps using RunningAnalysis
+    np = None
+
+# Due date kinds
+INVALID = 0
+AWARE = 1
+NAIVE = 2
+
+CANONICAL_LENGTH = 19  # YYYY-MM-DDTHH:MM:SS
+SEPARATORS = {4: '-', 7: '-', 10: 'T', 13: ':', 16: ':'}
+DIGITS = [i for i in range(CANONICAL_LENGTH) if i not in SEPARATORS]
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NAT = -2 ** 63  # datetime64 NaT as int64
+MONTH_DAYS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]) if np is not None else None
+
+def available() -> bool:
+    return np is not None
+
+def parse_one(value: Any) -> Tuple[int, int]:
+    """Kind and epoch microseconds (UTC for aware dates) of one due date, exactly as the loop parses it"""
+    if not isinstance(value, str) or not value:
+        return INVALID, NAT
+    try:
+        due = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return INVALID, NAT
+    if due.tzinfo is not None:
+        return AWARE, (due.astimezone(timezone.utc).replace(tzinfo=None) - EPOCH) // MICROSECOND
+    return NAIVE, (due - EPOCH) // MICROSECOND
+
+def field(columns: 'np.ndarray', start: int, stop: int) -> 'np.ndarray':
+    """Decimal value of the digit columns [start, stop)"""
+    value = columns[start].astype(np.int64) - ord('0')
+    for column in range(start + 1, stop):
+        value = value * 10 + columns[column] - ord('0')
+    return value
+
+def epoch_days(year: 'np.ndarray', month: 'np.ndarray', day: 'np.ndarray') -> 'np.ndarray':
+    """Days since 1970-01-01 of proleptic Gregorian dates (H. Hinnant's days_from_civil)"""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+def parse_due_dates(values: Sequence[Any]) -> Tuple['np.ndarray', 'np.ndarray']:
+    """
+    Bulk-parse due dates into (kinds, datetime64[us] stamps)
+    Aware dates are stored as UTC, naive ones as written; invalid rows are NaT.
+    Canonical rows are decoded from their code points, one character position
+    (a contiguous column) at a time; the rest (fractions, offsets, date-only ...)
+    go through parse_one()
+    """
+    n = len(values)
+    kinds = np.zeros(n, dtype=np.int8)
+    stamps = np.full(n, np.datetime64('NaT'), dtype='datetime64[us]')
+    if n == 0:
+        return kinds, stamps
+
+    # Two spare characters tell a 19/20-character string from a longer one
+    width = CANONICAL_LENGTH + 2
+    present = [v or '' for v in values]
+    text = np.array(present, dtype=f'U{width}')
+    columns = np.ascontiguousarray(text.view(np.uint32).reshape(n, width).T)
+
+    zulu = (columns[CANONICAL_LENGTH] == ord('Z')) & (columns[CANONICAL_LENGTH + 1] == 0)
+    canonical = (columns[CANONICAL_LENGTH] == 0) | zulu
+    for position in range(CANONICAL_LENGTH):
+        if position in SEPARATORS:
+            canonical &= columns[position] == ord(SEPARATORS[position])
+        else:
+            # uint32 wraps, so anything below '0' ends up above 9 too
+            canonical &= columns[position] - ord('0') <= 9
+
+    year, month, day = field(columns, 0, 4), field(columns, 5, 7), field(columns, 8, 10)
+    hour, minute, second = field(columns, 11, 13), field(columns, 14, 16), field(columns, 17, 19)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = MONTH_DAYS[np.clip(month, 0, 12)] + (leap & (month == 2))
+    canonical &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+    canonical &= (hour <= 23) & (minute <= 59) & (second <= 59)
+
+    seconds = epoch_days(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    stamps[canonical] = (seconds[canonical] * 1_000_000).view('datetime64[us]')
+    kinds[canonical] = np.where(zulu[canonical], AWARE, NAIVE)
+
+    rest = [i for i in np.flatnonzero(~canonical).tolist() if present[i]]
+    parsed = [parse_one(values[i]) for i in rest]
+    if parsed:
+        kinds[rest] = [kind for kind, _ in parsed]
+        stamps[rest] = np.array([micros for _, micros in parsed], dtype=np.int64).view('datetime64[us]')
+    return kinds, stamps
+
+def sequential_sum(values: 'np.ndarray') -> float:
+    """Left-to-right sum (np.sum is pairwise, which can differ from sum() in the last bit)"""
+    return float(np.cumsum(values)[-1]) if len(values) else 0
+
+def grade_summary(score_sum: float, score_count: int, points_sum: float, points_count: int, graded: int) -> Dict:
+    avg_score = score_sum / score_count if score_count else 0
+    avg_points = points_sum / points_count if points_count else 0
+    overall_percentage = (avg_score / avg_points * 100) if avg_points > 0 else 0
+    return {
+        'total_graded': graded,
+        'average_score': round(avg_score, 2),
+        'average_points_possible': round(avg_points, 2),
+        'overall_percentage': round(overall_percentage, 2)
+    }
+
+def grade_columns(submissions: List[Dict]) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """Score and points_possible columns with their inclusion masks"""
+    scores = [s.get('score') for s in submissions]
+    has_score = np.array([score is not None for score in scores], dtype=bool)
+    score_values = np.array(scores, dtype=np.float64)  # None -> NaN, masked out by has_score
+
+    # Only truthy points_possible count, as in `if ...get('points_possible'):`
+    points = [s.get('assignment') and s['assignment'].get('points_possible') for s in submissions]
+    point_values = np.array([p or 0 for p in points], dtype=np.float64)
+    has_points = point_values != 0
+    return score_values, has_score, point_values, has_points
+
+def course_grades(submissions: List[Dict]) -> List[Dict]:
+    """Grade aggregates per course_id, in order of first appearance"""
+    if not submissions:
+        return []
+    score_values, has_score, point_values, has_points = grade_columns(submissions)
+
+    codes: Dict[Any, int] = {}
+    names: Dict[Any, Any] = {}
+    for submission in submissions:
+        course_id = submission.get('course_id')
+        if course_id not in codes:
+            codes[course_id] = len(codes)
+            names[course_id] = submission.get('course_name')
+    course_codes = np.fromiter(
+        (codes[s.get('course_id')] for s in submissions), dtype=np.int64, count=len(submissions)
+    )
+
+    size = len(codes)
+    graded = np.bincount(course_codes, minlength=size)
+    score_sums = np.bincount(course_codes, weights=np.where(has_score, score_values, 0.0), minlength=size)
+    score_counts = np.bincount(course_codes, weights=has_score, minlength=size)
+    points_sums = np.bincount(course_codes, weights=np.where(has_points, point_values, 0), minlength=size)
+    points_counts = np.bincount(course_codes, weights=has_points, minlength=size)
+
+    return [
+        {
+            'course_id': course_id,
+            'course_name': names[course_id],
+            **grade_summary(
+                float(score_sums[code]), int(score_counts[code]),
+                float(points_sums[code]), int(points_counts[code]), int(graded[code])
+            )
+        }
+        for course_id, code in codes.items()
+    ]
+
+def analyze_vectorized(
+    assignments: List[Dict],
+    submissions: List[Dict],
+    now: Optional[datetime] = None,
+    upcoming_limit: int = 10,
+    overdue_limit: int = 5,
+    per_course: bool = False
+) -> Dict:
+    """
+    analyze_data() over NumPy columns - identical to RunningAnalysis(now).result()
+    With per_course, the result also carries 'course_grades' (see course_grades())
+    """
+    now = now or datetime.now()
+    next_week = now + timedelta(days=7)
+    # Only due dates of the same awareness as `now` are comparable with it
+    comparable = NAIVE if now.tzinfo is None else AWARE
+    if comparable == AWARE:
+        now = now.astimezone(timezone.utc).replace(tzinfo=None)
+        next_week = next_week.astimezone(timezone.utc).replace(tzinfo=None)
+
+    kinds, stamps = parse_due_dates([a.get('due_at') for a in assignments])
+    submitted = np.array(
+        [bool(a.get('submission') and a['submission'].get('submitted_at')) for a in assignments], dtype=bool
+    )
+
+    completed = (kinds != INVALID) & submitted
+    pending = (kinds == comparable) & ~submitted
+    past_due = stamps < np.datetime64(now, 'us')
+    overdue = pending & past_due
+    upcoming = pending & ~past_due & (stamps <= np.datetime64(next_week, 'us'))
+
+    score_values, has_score, point_values, has_points = grade_columns(submissions)
+    grades = grade_summary(
+        sequential_sum(score_values[has_score]), int(has_score.sum()),
+        sequential_sum(point_values[has_points]), int(has_points.sum()),
+        len(submissions)
+    )
+
+    analysis = {
+        'assignments': {
+            'total': len(assignments),
+            'upcoming': int(upcoming.sum()),
+            'overdue': int(overdue.sum()),
+            'completed': int(completed.sum())
+        },
+        'grades': grades,
+        'upcoming_assignments': [assignments[i] for i in np.flatnonzero(upcoming)[:upcoming_limit]],
+        'overdue_assignments': [assignments[i] for i in np.flatnonzero(overdue)[:overdue_limit]]
+    }
+    if per_course:
+        analysis['course_grades'] = course_grades(submissions)
+    return analysis
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Batch Canvas fetch: many accounts in one process
+Reads (canvas_url, token, user_id) rows and fetches every account with
+AsyncCanvasDataFetcher over one pooled aiohttp session per Canvas host, so
+connections and TLS sessions are reused across accounts instead of being set
+up again per run. Requests in flight are bounded per account (--concurrency),
+per host (--per-host) and overall (--global); --workers accounts run at a time,
+and an account that fails only marks its own row as failed.
+
+Writes <output-dir>/<user_id>.json per account, plus <output-dir>/summary.json
+with each account's status and the throughput in accounts per minute.
+
+Accounts file: CSV rows of canvas_url,token,user_id (blank lines, '#' comments
+and a canvas_url,token,user_id header are skipped)
+
+Usage: python canvas_batch.py <accounts.csv> [--output-dir canvas_batch] [--workers 8]
+                              [--per-host 16] [--global 64] [--concurrency 4] [--rate 10]
+                              [--delta] [--quiet]
+"""
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from canvas_fetcher import AsyncCanvasDataFetcher, SyncState, aiohttp
+
+def read_accounts(path: str) -> List[Dict[str, str]]:
+    """
+    Parse the accounts file; malformed rows raise ValueError with their line number,
+    as do user_ids that repeat (or map to the same output file as) an earlier one
+    """
+    accounts = []
+    seen: Dict[str, int] = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for line_number, row in enumerate(csv.reader(f), 1):
+            row = [cell.strip() for cell in row]
+            if not any(row) or row[0].startswith('#'):
+                continue
+            if [cell.lower() for cell in row] == ['canvas_url', 'token', 'user_id']:
+                continue
+            if len(row) != 3 or not all(row):
+                raise ValueError(f"{path}:{line_number}: expected canvas_url,token,user_id")
+            name = output_name(row[2])
+            if name in seen:
+                raise ValueError(
+                    f"{path}:{line_number}: user_id {row[2]!r} writes {name}.json like line {seen[name]}"
+                )
+            seen[name] = line_number
+            accounts.append({'canvas_url': row[0].rstrip('/'), 'token': row[1], 'user_id': row[2]})
+    return accounts
+
+def output_name(user_id: str) -> str:
+    """user_id made safe to use as a file name"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', user_id) or 'account'
+
+class RequestSlots:
+    """One slot from each semaphore (account, host, global), held for the length of a request"""
+
+    def __init__(self, *semaphores: asyncio.Semaphore):
+        self.semaphores = semaphores
+
+    async def __aenter__(self):
+        # Always taken in the same order, so accounts cannot deadlock each other
+        acquired = []
+        try:
+            for semaphore in self.semaphores:
+                await semaphore.acquire()
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            raise
+
+    async def __aexit__(self, *exc_info):
+        for semaphore in reversed(self.semaphores):
+            semaphore.release()
+
+class BatchFetcher:
+    """Worker pool over an account list, sharing one session and request limit per Canvas host"""
+
+    def __init__(self, accounts: List[Dict[str, str]], output_dir: str, workers: int = 8,
+                 per_host: int = 16, global_limit: int = 64, concurrency: int = 4,
+                 rate: float = 10.0, delta: bool = False, verbose: bool = True):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for batch fetching (pip install aiohttp)")
+        self.accounts = accounts
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.global_limit = max(1, global_limit)
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.delta = delta
+        self.verbose = verbose
+
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.global_slots: Optional[asyncio.Semaphore] = None
+        self.results: List[Dict[str, Any]] = []
+
+    def log(self, message: str, level: str = 'INFO'):
+        if self.verbose:
+            timestamp = datetime.now().strftime('%H:%M:%S')
+            print(f"[{timestamp}] {level}: {message}")
+
+    def host_pool(self, canvas_url: str) -> Tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        """The shared session and request limit for a Canvas host, created on first use"""
+        host = urlsplit(canvas_url).netloc or canvas_url
+        if host not in self.sessions:
+            connector = aiohttp.TCPConnector(limit=self.per_host, limit_per_host=self.per_host)
+            self.sessions[host] = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+            self.host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self.sessions[host], self.host_slots[host]
+
+    async def fetch_account(self, account: Dict[str, str]) -> Dict[str, Any]:
+        """Fetch and save one account; any failure stays in this account's row"""
+        started = time.monotonic()
+        row: Dict[str, Any] = {
+            'user_id': account['user_id'],
+            'canvas_url': account['canvas_url'],
+            'status': 'ok',
+            'output': None,
+            'api_calls': 0,
+            'errors': []
+        }
+        try:
+            session, host_slots = self.host_pool(account['canvas_url'])
+            sync_state = None
+            if self.delta:
+                sync_state = SyncState(SyncState.default_path(account['canvas_url'], account['token']))
+            fetcher = AsyncCanvasDataFetcher(
+                account['canvas_url'], account['token'], verbose=False,
+                concurrency=self.concurrency, rate=self.rate, sync_state=sync_state,
+                shared_session=session,
+                request_slots=RequestSlots(asyncio.Semaphore(self.concurrency), host_slots, self.global_slots)
+            )
+            result = await fetcher.fetch_all_data_async()
+
+            path = os.path.join(self.output_dir, f"{output_name(account['user_id'])}.json")
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, fetcher.save_to_file, result, path)
+
+            row.update(
+                output=path,
+                api_calls=result['metadata']['api_calls_made'],
+                errors=list(result['metadata']['errors']),
+                **result['statistics']
+            )
+            if row['errors']:
+                row['status'] = 'partial' if result['statistics']['courses'] else 'failed'
+        except Exception as e:
+            row['status'] = 'failed'
+            row['errors'].append(f"{type(e).__name__}: {e}")
+
+        row['duration_seconds'] = round(time.monotonic() - started, 2)
+        icon = {'ok': '✅', 'partial': '⚠️', 'failed': '❌'}[row['status']]
+        self.log(f"{icon} {row['user_id']}: {row['status']} in {row['duration_seconds']:.1f}s "
+                 f"({row['api_calls']} API calls)", 'INFO' if row['status'] == 'ok' else 'WARN')
+        return row
+
+    async def worker(self, queue: 'asyncio.Queue[Dict[str, str]]'):
+        while True:
+            try:
+                account = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self.results.append(await self.fetch_account(account))
+
+    async def run_async(self) -> Dict[str, Any]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.global_slots = asyncio.Semaphore(self.global_limit)
+        queue: asyncio.Queue = asyncio.Queue()
+        for account in self.accounts:
+            queue.put_nowait(account)
+
+        self.log(f"🚀 Batch fetch of {len(self.accounts)} accounts ({self.workers} workers, "
+                 f"{self.per_host} requests/host, {self.global_limit} overall)")
+        started = time.monotonic()
+        try:
+            await asyncio.gather(*(self.worker(queue) for _ in range(min(self.workers, len(self.accounts)))))
+        finally:
+            for session in self.sessions.values():
+                await session.close()
+            self.sessions.clear()
+
+        return self.summarize(time.monotonic() - started)
+
+    def run(self) -> Dict[str, Any]:
+        return asyncio.run(self.run_async())
+
+    def summarize(self, duration: float) -> Dict[str, Any]:
+        """Batch summary, also written to <output-dir>/summary.json"""
+        order = {account['user_id']: i for i, account in enumerate(self.accounts)}
+        accounts = sorted(self.results, key=lambda row: order.get(row['user_id'], len(order)))
+        counts = {status: sum(1 for row in accounts if row['status'] == status) for status in ('ok', 'partial', 'failed')}
+        summary = {
+            'finished_at': datetime.now().isoformat(),
+            'duration_seconds': round(duration, 2),
+            'accounts': len(accounts),
+            **counts,
+            'accounts_per_minute': round(len(accounts) / duration * 60, 2) if duration > 0 else 0.0,
+            'api_calls': sum(row['api_calls'] for row in accounts),
+            'hosts': len(self.host_slots),
+            'results': accounts
+        }
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+def option(name: str, default: float) -> float:
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return float(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1].startswith('--'):
+        print(__doc__.split('Usage:')[1].strip())
+        sys.exit(1)
+
+    output_dir = 'canvas_batch'
+    if '--output-dir' in sys.argv and sys.argv.index('--output-dir') + 1 < len(sys.argv):
+        output_dir = sys.argv[sys.argv.index('--output-dir') + 1]
+
+    try:
+        accounts = read_accounts(sys.argv[1])
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not accounts:
+        print("❌ No accounts to fetch")
+        sys.exit(1)
+
+    batch = BatchFetcher(
+        accounts,
+        output_dir,
+        workers=int(option('--workers', 8)),
+        per_host=int(option('--per-host', 16)),
+        global_limit=int(option('--global', 64)),
+        concurrency=int(option('--concurrency', 4)),
+        rate=option('--rate', 10.0),
+        delta='--delta' in sys.argv,
+        verbose='--quiet' not in sys.argv
+    )
+    summary = batch.run()
+
+    print(f"\n📋 Batch Summary:")
+    print(f"  👥 Accounts: {summary['accounts']} ({summary['ok']} ok, {summary['partial']} partial, {summary['failed']} failed)")
+    print(f"  🌐 Hosts: {summary['hosts']}")
+    print(f"  📡 API calls: {summary['api_calls']}")
+    print(f"  ⏱️ Duration: {summary['duration_seconds']:.1f}s ({summary['accounts_per_minute']:.1f} accounts/min)")
+    print(f"  💾 Saved to: {output_dir}")
+
+    if summary['failed']:
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Columnar export for canvas_fetcher.py results
+Writes courses, assignments and submissions as one table file each, under a
+fixed schema: Parquet when pyarrow is installed, otherwise the compact .ccol
+binary format below. The repeated course_id/course_name/course_code columns are
+dictionary-encoded, and reads are column-selective and memory-mapped.
+
+.ccol layout (little-endian):
+    b"CCOL1\\n" | uint32 header length | JSON header | column blocks (8-byte aligned)
+The header holds the row count and, per column, its type, block offset and
+length, plus the dictionary values of dict columns. Column blocks are:
+    int64 / timestamp  int64 values (timestamp = microseconds since epoch, UTC),
+                       INT_NULL for missing values
+    float64            float64 values, NaN for missing values
+    dict / dict_int64  int32 codes into the header's dictionary (of strings / integers),
+                       -1 for missing
+    string             uint8 validity, then int32 offsets (rows + 1), then UTF-8 bytes
+    bool               int8 values, -1 for missing
+
+Usage: python canvas_columnar.py <export_dir> [table] [column ...]
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import weakref
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # fall back to .ccol
+    pa = None
+    pq = None
+
+MAGIC = b"CCOL1\n"
+INT_NULL = -2 ** 63
+
+def _get(*path: str) -> Callable[[Dict], Any]:
+    """Accessor for a (possibly nested) record field"""
+    def get(record: Dict) -> Any:
+        value: Any = record
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+    return get
+
+# table -> [(column, type, accessor)]
+SCHEMA: Dict[str, List[Tuple[str, str, Callable[[Dict], Any]]]] = {
+    'courses': [
+        ('id', 'int64', _get('id')),
+        ('name', 'string', _get('name')),
+        ('course_code', 'string', _get('course_code')),
+        ('start_at', 'timestamp', _get('start_at')),
+        ('end_at', 'timestamp', _get('end_at')),
+    ],
+    'assignments': [
+        ('id', 'int64', _get('id')),
+        ('course_id', 'dict_int64', _get('course_id')),
+        ('course_name', 'dict', _get('course_name')),
+        ('course_code', 'dict', _get('course_code')),
+        ('name', 'string', _get('name')),
+        ('due_at', 'timestamp', _get('due_at')),
+        ('points_possible', 'float64', _get('points_possible')),
+        ('submitted_at', 'timestamp', _get('submission', 'submitted_at')),
+        ('html_url', 'string', _get('html_url')),
+    ],
+    'submissions': [
+        ('id', 'int64', _get('id')),
+        ('assignment_id', 'int64', _get('assignment_id')),
+        ('course_id', 'dict_int64', _get('course_id')),
+        ('course_name', 'dict', _get('course_name')),
+        ('course_code', 'dict', _get('course_code')),
+        ('assignment_name', 'dict', _get('assignment', 'name')),
+        ('score', 'float64', _get('score')),
+        ('points_possible', 'float64', _get('assignment', 'points_possible')),
+        ('submitted_at', 'timestamp', _get('submitted_at')),
+        ('graded_at', 'timestamp', _get('graded_at')),
+        ('late', 'bool', _get('late')),
+        ('workflow_state', 'dict', _get('workflow_state')),
+    ],
+}
+
+# NDJSONWriter-style record kinds -> tables
+TABLES = {'course': 'courses', 'assignment': 'assignments', 'submission': 'submissions'}
+
+def parse_timestamp(value: Any) -> int:
+    """Canvas ISO-8601 timestamp -> microseconds since epoch (UTC), INT_NULL if missing/invalid"""
+    if not value:
+        return INT_NULL
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return INT_NULL
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1_000_000)
+
+def to_int(value: Any) -> Optional[int]:
+    """int(value), or None when missing or not an integer (e.g. "N/A", True, 1.5e400)"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value if INT_NULL < value < 2 ** 63 else None
+
+def to_float(value: Any) -> Optional[float]:
+    """float(value), or None when missing or not a number (e.g. "excused")"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+class ColumnBuffer:
+    """Typed in-memory column - records are not kept once appended"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.dictionary: Dict[Any, int] = {}
+        self.values: Any
+        if kind in ('int64', 'timestamp'):
+            self.values = array('q')
+        elif kind == 'float64':
+            self.values = array('d')
+        elif kind in ('dict', 'dict_int64'):
+            self.values = array('i')
+        elif kind == 'bool':
+            self.values = array('b')
+        else:
+            self.values = []
+
+    def append(self, value: Any):
+        """Append one value; a missing or unconvertible value is stored as missing"""
+        if self.kind == 'int64':
+            value = to_int(value)
+            self.values.append(INT_NULL if value is None else value)
+        elif self.kind == 'timestamp':
+            self.values.append(parse_timestamp(value))
+        elif self.kind == 'float64':
+            value = to_float(value)
+            self.values.append(math.nan if value is None else value)
+        elif self.kind == 'bool':
+            self.values.append(-1 if value is None else int(bool(value)))
+        elif self.kind in ('dict', 'dict_int64'):
+            if value is not None:
+                value = to_int(value) if self.kind == 'dict_int64' else str(value)
+            if value is None:
+                self.values.append(-1)
+            else:
+                self.values.append(self.dictionary.setdefault(value, len(self.dictionary)))
+        else:
+            self.values.append(None if value is None else str(value))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+class ColumnarWriter:
+    """
+    Collects records into typed columns and writes one table file per record kind
+    Same interface as NDJSONWriter, so it works with stream_all_data()
+    """
+
+    def __init__(self, directory: str, use_parquet: Optional[bool] = None):
+        self.directory = directory
+        self.use_parquet = pa is not None if use_parquet is None else use_parquet
+        if self.use_parquet and pa is None:
+            raise RuntimeError("pyarrow is required for Parquet output (pip install pyarrow)")
+        self.counts = {kind: 0 for kind in TABLES}
+        self.columns = {
+            table: [ColumnBuffer(name, kind) for name, kind, _ in schema] for table, schema in SCHEMA.items()
+        }
+        self.closed = False
+
+    def write(self, kind: str, records: Iterable[Dict]):
+        table = TABLES[kind]
+        accessors = [accessor for _, _, accessor in SCHEMA[table]]
+        for record in records:
+            for column, accessor in zip(self.columns[table], accessors):
+                column.append(accessor(record))
+            self.counts[kind] += 1
+
+    def close(self, summary: Optional[Dict] = None):
+        if self.closed:
+            return
+        self.closed = True
+        os.makedirs(self.directory, exist_ok=True)
+        for table, columns in self.columns.items():
+            if self.use_parquet:
+                write_parquet(os.path.join(self.directory, f'{table}.parquet'), columns)
+            else:
+                write_ccol(os.path.join(self.directory, f'{table}.ccol'), columns)
+        if summary is not None:
+            with open(os.path.join(self.directory, 'summary.json'), 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, default=str, ensure_ascii=False)
+
+def write_parquet(path: str, columns: List[ColumnBuffer]):
+    arrays = []
+    for column in columns:
+        if column.kind in ('dict', 'dict_int64'):
+            value_type = pa.int64() if column.kind == 'dict_int64' else pa.string()
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array(column.values, type=pa.int32(), mask=[code < 0 for code in column.values]),
+                pa.array(list(column.dictionary), type=value_type)
+            ))
+        elif column.kind in ('int64', 'timestamp'):
+            mask = [value == INT_NULL for value in column.values]
+            arrow_type = pa.int64() if column.kind == 'int64' else pa.timestamp('us', tz='UTC')
+            arrays.append(pa.array(column.values, type=arrow_type, mask=mask))
+        elif column.kind == 'float64':
+            arrays.append(pa.array(column.values, type=pa.float64(), mask=[math.isnan(v) for v in column.values]))
+        elif column.kind == 'bool':
+            arrays.append(pa.array([None if v < 0 else bool(v) for v in column.values], type=pa.bool_()))
+        else:
+            arrays.append(pa.array(column.values, type=pa.string()))
+    table = pa.Table.from_arrays(arrays, names=[column.name for column in columns])
+    pq.write_table(table, path, compression='zstd')
+
+def write_ccol(path: str, columns: List[ColumnBuffer]):
+    """Write columns in the .ccol layout described in the module docstring"""
+    rows = len(columns[0]) if columns else 0
+    blocks: List[bytes] = []
+    header_columns = []
+    offset = 0
+    for column in columns:
+        if column.kind == 'string':
+            encoded = [None if value is None else value.encode('utf-8') for value in column.values]
+            validity = array('b', (value is not None for value in encoded))
+            offsets = array('i', [0])
+            for value in encoded:
+                offsets.append(offsets[-1] + (len(value) if value else 0))
+            block = _le(validity) + _pad(len(validity)) + _le(offsets) + b''.join(v for v in encoded if v)
+        else:
+            block = _le(column.values)
+        entry = {'name': column.name, 'type': column.kind, 'offset': offset, 'length': len(block)}
+        if column.kind in ('dict', 'dict_int64'):
+            entry['dictionary'] = list(column.dictionary)
+        header_columns.append(entry)
+        blocks.append(block + _pad(len(block)))
+        offset += len(blocks[-1])
+
+    header = json.dumps({'rows': rows, 'columns': header_columns}).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    prefix += _pad(len(prefix))
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix)
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp_path, path)
+
+def _le(values: array) -> bytes:
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _pad(length: int) -> bytes:
+    return b'\0' * (-length % 8)
+
+class CcolTable:
+    """
+    Memory-mapped .ccol table; only the columns you touch are decoded
+    Numeric columns come back as zero-copy memoryviews of the mapped file (byteswapped
+    copies on big-endian hosts). close() releases the views it handed out, so copy
+    out what must outlive the table
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a .ccol file")
+        (header_length,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._map[header_start:header_start + header_length])
+        self.rows: int = header['rows']
+        self.columns = {column['name']: column for column in header['columns']}
+        data_start = header_start + header_length
+        self._data_start = data_start + (-data_start % 8)
+        self._views: List[weakref.ref] = []
+
+    def _block(self, name: str) -> memoryview:
+        column = self.columns[name]
+        start = self._data_start + column['offset']
+        return memoryview(self._map)[start:start + column['length']]
+
+    @staticmethod
+    def _cast(block: memoryview, typecode: str) -> memoryview:
+        """Little-endian block as typed values - in place, or swapped into a copy on big-endian hosts"""
+        if sys.byteorder == 'big' and typecode != 'b':
+            values = array(typecode, bytes(block))
+            values.byteswap()
+            return memoryview(values)
+        return block.cast(typecode)
+
+    def raw(self, name: str) -> memoryview:
+        """View of a numeric column (int64/timestamp 'q', float64 'd', dict codes 'i', bool 'b'), valid until close()"""
+        kind = self.columns[name]['type']
+        if kind == 'string':
+            raise TypeError(f"{name} is a string column - use column()")
+        typecode = {'int64': 'q', 'timestamp': 'q', 'float64': 'd', 'dict': 'i', 'dict_int64': 'i', 'bool': 'b'}[kind]
+        view = self._cast(self._block(name), typecode)
+        self._views = [ref for ref in self._views if ref() is not None]
+        self._views.append(weakref.ref(view))
+        return view
+
+    def column(self, name: str) -> List[Any]:
+        """Decoded column values, None for missing"""
+        kind = self.columns[name]['type']
+        if kind == 'string':
+            block = self._block(name)
+            validity = block[:self.rows]
+            offsets_start = self.rows + (-self.rows % 8)
+            offsets = self._cast(block[offsets_start:offsets_start + 4 * (self.rows + 1)], 'i')
+            blob = block[offsets_start + 4 * (self.rows + 1):]
+            return [
+                bytes(blob[offsets[i]:offsets[i + 1]]).decode('utf-8') if validity[i] else None
+                for i in range(self.rows)
+            ]
+        with self.raw(name) as values:
+            if kind in ('dict', 'dict_int64'):
+                dictionary = self.columns[name]['dictionary']
+                return [dictionary[code] if code >= 0 else None for code in values]
+            if kind in ('int64', 'timestamp'):
+                return [None if value == INT_NULL else value for value in values]
+            if kind == 'float64':
+                return [None if math.isnan(value) else value for value in values]
+            return [None if value < 0 else bool(value) for value in values]
+
+    def close(self):
+        """
+        Release the raw() views and unmap the file; views re-exported elsewhere
+        (e.g. numpy.frombuffer) keep the mapping alive until they are dropped
+        """
+        for ref in self._views:
+            view = ref()
+            if view is not None:
+                try:
+                    view.release()
+                except BufferError:
+                    pass
+        self._views = []
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # unmapped when the last export goes away
+        self._file.close()
+
+    def __enter__(self) -> 'CcolTable':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_columns(directory: str, table: str, columns: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+    """
+    Read selected columns of an exported table (all columns when None)
+    Values are the same from either format: timestamps as microseconds since
+    epoch (UTC), None for missing values
+    """
+    names = columns or [name for name, _, _ in SCHEMA[table]]
+    parquet_path = os.path.join(directory, f'{table}.parquet')
+    if os.path.exists(parquet_path):
+        if pq is None:
+            raise RuntimeError("pyarrow is required to read Parquet exports (pip install pyarrow)")
+        data = pq.read_table(parquet_path, columns=names, memory_map=True)
+        for i, field in enumerate(data.schema):
+            if pa.types.is_timestamp(field.type):
+                data = data.set_column(i, field.name, data.column(i).cast(pa.int64()))
+        return data.to_pydict()
+    with CcolTable(os.path.join(directory, f'{table}.ccol')) as ccol:
+        return {name: ccol.column(name) for name in names}
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.split('Usage:')[1].strip())
+        sys.exit(1)
+    directory = sys.argv[1]
+    tables = [sys.argv[2]] if len(sys.argv) > 2 else list(SCHEMA)
+    for table in tables:
+        data = read_columns(directory, table, sys.argv[3:] or None)
+        rows = len(next(iter(data.values()), []))
+        print(f"📦 {table}: {rows} rows")
+        for name, values in data.items():
+            print(f"  {name}: {values[:3]}{' ...' if rows > 3 else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Delta-sync merge rules shared by canvas_fetcher.py and the backend's canvas_sync
+
+A course resource's records are kept keyed by record id. Each sync merges the
+fetched records into the previous ones and tallies what changed.
+"""
+from typing import Dict, List
+
+def new_counts() -> Dict[str, int]:
+    """Per-resource tallies: new, updated, unchanged, and stale (kept because the fetch failed)"""
+    return {'new': 0, 'updated': 0, 'unchanged': 0, 'stale': 0}
+
+def merge_records(previous: Dict[str, Dict], fetched: List[Dict], complete: bool,
+                  counts: Dict[str, int]) -> Dict[str, Dict]:
+    """
+    Merge fetched records into a course's previous records (keyed by id)
+
+    A complete fetch replaces them, dropping deleted records; a delta only
+    overlays what changed. Tallies new/updated/unchanged into counts.
+    """
+    merged = {} if complete else dict(previous)
+    fetched_keys = set()
+    for record in fetched:
+        key = str(record.get('id'))
+        fetched_keys.add(key)
+        old = previous.get(key)
+        if old is None:
+            counts['new'] += 1
+        elif old != record:
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+        merged[key] = record
+    if not complete:
+        counts['unchanged'] += len(previous.keys() - fetched_keys)
+    return merged
+
+def keep_records(previous: Dict[str, Dict], counts: Dict[str, int]) -> Dict[str, Dict]:
+    """The previous records of a resource whose fetch failed, counted as stale"""
+    counts['stale'] += len(previous)
+    return dict(previous)
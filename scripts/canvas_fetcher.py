@@ -4,15 +4,473 @@ Enhanced Canvas Data Fetcher with Backend Integration
 Works with the new Canvas LMS Dashboard backend caching system
 """
 
+import asyncio
+import hashlib
 import requests
 import json
+import os
+import random
+import re
 import sys
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Optional, Any, Tuple
+
+try:
+    import aiohttp
+except ImportError:  # only needed for --concurrency
+    aiohttp = None
+
+from canvas_analysis import analyze_vectorized, available as vectorized_available
+from canvas_columnar import ColumnarWriter
+from canvas_delta import keep_records, merge_records, new_counts
+from canvas_http_cache import HttpCache
+
+class SyncState:
+    """
+    Persistent delta-sync state for one Canvas user
+    
+    Holds a cursor (last successful sync time) per course and resource, plus
+    the merged snapshot from the previous run, keyed by course id then record id.
+    """
+    
+    RESOURCES = ('assignments', 'submissions')
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.cursors: Dict[str, Dict[str, str]] = {}
+        self.snapshot: Dict[str, Dict[str, Dict[str, Dict]]] = {resource: {} for resource in self.RESOURCES}
+        self.counts: Dict[str, Dict[str, int]] = {}
+        
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.cursors = state.get('cursors', {})
+            self.snapshot.update(state.get('snapshot', {}))
+    
+    @staticmethod
+    def default_path(canvas_url: str, api_token: str) -> str:
+        """State file per Canvas host and token, so each user keeps their own cursor"""
+        # host:port is not a valid file name on Windows
+        host = re.sub(r'[^A-Za-z0-9_.-]', '_', urlsplit(canvas_url).netloc) or 'canvas'
+        token_id = hashlib.sha256(api_token.encode()).hexdigest()[:12]
+        return os.path.join('.canvas_sync', f'{host}_{token_id}.json')
+    
+    def cursor(self, course_id: Any, resource: str) -> Optional[str]:
+        """ISO timestamp of the last successful sync of a course resource"""
+        return self.cursors.get(str(course_id), {}).get(resource)
+    
+    def advance(self, course_id: Any, resource: str, timestamp: str):
+        self.cursors.setdefault(str(course_id), {})[resource] = timestamp
+    
+    def merge(self, resource: str, course_id: Any, fetched: List[Dict], complete: bool) -> List[Dict]:
+        """
+        Merge fetched records into a course's snapshot and count new/updated/unchanged
+        
+        A complete fetch replaces the course's records (dropping deleted ones);
+        a delta fetch only overlays the records that changed.
+        """
+        previous = self.snapshot[resource].get(str(course_id), {})
+        merged = merge_records(previous, fetched, complete, self.counts.setdefault(resource, new_counts()))
+        self.snapshot[resource][str(course_id)] = merged
+        return list(merged.values())
+    
+    def keep(self, resource: str, course_id: Any) -> List[Dict]:
+        """Keep a course's previous records because their fetch failed (counted as stale)"""
+        previous = self.snapshot[resource].get(str(course_id), {})
+        kept = keep_records(previous, self.counts.setdefault(resource, new_counts()))
+        self.snapshot[resource][str(course_id)] = kept
+        return list(kept.values())
+    
+    def retain_courses(self, course_ids: Iterable[Any]):
+        """Forget cursors and records of courses no longer in the course list"""
+        keep = {str(course_id) for course_id in course_ids}
+        self.cursors = {course_id: cursor for course_id, cursor in self.cursors.items() if course_id in keep}
+        for resource in self.RESOURCES:
+            self.snapshot[resource] = {
+                course_id: records for course_id, records in self.snapshot[resource].items() if course_id in keep
+            }
+    
+    def save(self):
+        """Write the state atomically so an interrupted run keeps the previous cursor"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'cursors': self.cursors, 'snapshot': self.snapshot}, f, default=str, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+class FetchCheckpoint:
+    """
+    Append-only journal of finished fetch units, for --resume
+    
+    A unit is the course list or one course's assignments or submissions. Each
+    finished unit is written as one JSON line with its records and fsynced, so a
+    run that dies on course 30 of 40 resumes there instead of starting over. A
+    torn last line (the crash itself) is ignored. The journal (and its directory,
+    when nothing else is left in it) is removed once a run completes without
+    failed requests.
+    """
+    
+    def __init__(self, path: str, canvas_url: str, api_token: str, resume: bool = False):
+        self.path = path
+        self.header = {
+            'type': 'header',
+            'canvas_url': canvas_url.rstrip('/'),
+            'token_id': hashlib.sha256(api_token.encode()).hexdigest()[:12],
+            'started': datetime.now(timezone.utc).isoformat()
+        }
+        self.units: Dict[str, List[Dict]] = {}
+        self.resumed = resume and self._load()
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a' if self.resumed else 'w', encoding='utf-8')
+        if not self.resumed:
+            self._append(self.header)
+    
+    @staticmethod
+    def default_path(canvas_url: str, api_token: str) -> str:
+        """Journal next to the delta sync state, per Canvas host and token"""
+        return SyncState.default_path(canvas_url, api_token)[:-len('.json')] + '.checkpoint.jsonl'
+    
+    @staticmethod
+    def unit_key(resource: str, course_id: Any = None) -> str:
+        return resource if course_id is None else f'{resource}:{course_id}'
+    
+    @property
+    def started(self) -> str:
+        """When the checkpointed run began - resumed runs keep the original time"""
+        return self.header['started']
+    
+    def _load(self) -> bool:
+        """Read finished units from a journal of the same Canvas host and token"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        
+        entries = []
+        intact = 0
+        for line in data.splitlines(keepends=True):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break  # torn write from the interrupted run
+            if not line.endswith(b'\n'):
+                entries.pop()
+                break
+            intact += len(line)
+        
+        if not entries or entries[0].get('type') != 'header':
+            return False
+        header = entries[0]
+        if header.get('canvas_url') != self.header['canvas_url'] or header.get('token_id') != self.header['token_id']:
+            return False
+        
+        self.header = header
+        self.units = {entry['unit']: entry['records'] for entry in entries[1:]}
+        # Drop the torn tail so appended units start on a fresh line
+        with open(self.path, 'r+b') as f:
+            f.truncate(intact)
+        return True
+    
+    def _append(self, entry: Dict):
+        self._file.write(json.dumps(entry, default=str, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def get(self, resource: str, course_id: Any = None) -> Optional[List[Dict]]:
+        return self.units.get(self.unit_key(resource, course_id))
+    
+    def record(self, resource: str, course_id: Any, records: List[Dict]):
+        key = self.unit_key(resource, course_id)
+        self.units[key] = records
+        self._append({'type': 'unit', 'unit': key, 'records': records})
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+    
+    def complete(self):
+        """The run finished cleanly - the next one starts from scratch"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        directory = os.path.dirname(self.path)
+        if directory and not os.listdir(directory):
+            os.rmdir(directory)
+
+class AdaptiveRateLimiter:
+    """
+    Request pacing driven by Canvas's X-Rate-Limit-Remaining / X-Request-Cost headers
+    
+    Canvas meters each token with a leaky bucket (~700 units, refilling at
+    roughly 10 units/second). While plenty of quota is left requests go out back
+    to back at up to max_concurrency; as it drains, concurrency shrinks and the
+    gap between requests grows towards the time the bucket needs to refill one
+    request's cost. A 403 "Rate Limit Exceeded" or 429 pauses every user of the
+    limiter until the bucket has refilled one request's cost (or, without a
+    remaining header, for an exponentially growing, jittered backoff). Throttled
+    responses report a cost of 0, so only successful ones feed the estimates.
+    
+    One instance is shared by all live fetches for the same token (see
+    shared()) and can be used from threads (acquire) and event loops
+    (acquire_async) alike.
+    """
+    
+    _shared: 'weakref.WeakValueDictionary[str, AdaptiveRateLimiter]' = weakref.WeakValueDictionary()
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, max_concurrency: int = 8, min_interval: float = 0.0, max_interval: float = 2.0,
+                 refill_rate: float = 10.0, low_water: float = 0.1, high_water: float = 0.5,
+                 backoff_base: float = 1.0, backoff_cap: float = 30.0, max_retries: int = 5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.refill_rate = refill_rate
+        self.low_water = low_water
+        self.high_water = high_water
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retries = max_retries
+        
+        self.remaining: Optional[float] = None
+        self.capacity = 0.0
+        self.cost = 1.0
+        self.cost_samples = 0
+        self.in_flight = 0
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+        self.stats = {'requests': 0, 'throttled': 0, 'waited_seconds': 0.0}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls, api_token: str, max_concurrency: Optional[int] = None) -> 'AdaptiveRateLimiter':
+        """
+        The limiter for a token, created on first use - Canvas meters quota per
+        token, so every fetcher using the token shares one. It is dropped once
+        no fetcher holds it any more. max_concurrency raises the token-wide
+        ceiling to at least that many requests; each caller bounds its own
+        share (e.g. AsyncCanvasDataFetcher's semaphore)
+        """
+        key = hashlib.sha256(api_token.encode()).hexdigest()
+        with cls._shared_lock:
+            limiter = cls._shared.get(key)
+            if limiter is None:
+                limiter = cls._shared[key] = cls()
+            if max_concurrency is not None:
+                limiter.raise_concurrency(max_concurrency)
+            return limiter
+    
+    def raise_concurrency(self, max_concurrency: int):
+        """Allow at least max_concurrency requests in flight (never lowers the ceiling)"""
+        with self._lock:
+            self.max_concurrency = max(self.max_concurrency, max_concurrency)
+    
+    def limits(self) -> Tuple[int, float]:
+        """Current (allowed concurrency, spacing in seconds) for the quota left"""
+        if self.remaining is None or not self.capacity:
+            return self.max_concurrency, self.min_interval
+        ratio = self.remaining / self.capacity
+        headroom = min(1.0, max(0.0, (ratio - self.low_water) / (self.high_water - self.low_water)))
+        slow_interval = min(self.max_interval, self.cost / self.refill_rate)
+        concurrency = max(1, round(1 + (self.max_concurrency - 1) * headroom))
+        # Never more requests in flight than the quota left can pay for
+        concurrency = min(concurrency, max(1, int(self.remaining / max(self.cost, 1e-9))))
+        return concurrency, slow_interval + (self.min_interval - slow_interval) * headroom
+    
+    def _reserve(self) -> float:
+        """Take a request slot and return 0, or return how long to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            concurrency, interval = self.limits()
+            wait = max(self.blocked_until - now, self.next_slot - now)
+            if wait <= 0 and self.in_flight < concurrency:
+                self.in_flight += 1
+                self.next_slot = now + interval
+                self.stats['requests'] += 1
+                return 0.0
+            # At the concurrency cap: poll again after roughly one request's spacing
+            wait = max(wait, interval, 0.01)
+            self.stats['waited_seconds'] += wait
+            return wait
+    
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            wait = self._reserve()
+            if not wait:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """Wait (without blocking the loop) until a request may be sent"""
+        while True:
+            wait = self._reserve()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+    
+    @staticmethod
+    def is_throttled(status: Optional[int], body: str = '') -> bool:
+        """Canvas answers 403 "Rate Limit Exceeded" when the bucket is empty; others use 429"""
+        return status == 429 or (status == 403 and 'rate limit' in body.lower())
+    
+    def release(self, status: Optional[int], headers: Mapping[str, str], body: str = '') -> Optional[float]:
+        """
+        Record a finished request (status None if it never got a response)
+        Returns the backoff delay if the request was throttled and should be retried
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            remaining = headers.get('X-Rate-Limit-Remaining')
+            
+            if not self.is_throttled(status, body):
+                if remaining is not None:
+                    self.remaining = float(remaining)
+                    self.capacity = max(self.capacity, self.remaining)
+                cost = headers.get('X-Request-Cost')
+                if cost is not None:
+                    # Smooth the per-request cost; single requests vary a lot
+                    self.cost = float(cost) if not self.cost_samples else 0.8 * self.cost + 0.2 * float(cost)
+                    self.cost_samples += 1
+                if status is not None:
+                    self.consecutive_throttles = 0
+                return None
+            
+            self.stats['throttled'] += 1
+            self.consecutive_throttles += 1
+            if remaining is not None:
+                # Wait until the bucket holds one request's cost again; the quota is
+                # at most what this response reports, whatever earlier ones said
+                self.remaining = min(self.remaining if self.remaining is not None else float(remaining), float(remaining))
+                refill_wait = max(0.0, self.cost - float(remaining)) / self.refill_rate
+                delay = min(self.backoff_cap, refill_wait * random.uniform(1.0, 1.25) + random.uniform(0, 0.05))
+            else:
+                ceiling = min(self.backoff_cap, self.backoff_base * 2 ** (self.consecutive_throttles - 1))
+                delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            return delay
+
+class RunningAnalysis:
+    """
+    The analyze_data() insights built up page by page, so streamed records need
+    not be kept - only the counters and the first upcoming/overdue assignments
+    """
+    
+    def __init__(self, now: Optional[datetime] = None, upcoming_limit: int = 10, overdue_limit: int = 5):
+        self.now = now or datetime.now()
+        self.next_week = self.now + timedelta(days=7)
+        self.upcoming_limit = upcoming_limit
+        self.overdue_limit = overdue_limit
+        
+        self.total_assignments = 0
+        self.counts = {'upcoming': 0, 'overdue': 0, 'completed': 0}
+        self.upcoming: List[Dict] = []
+        self.overdue: List[Dict] = []
+        
+        self.total_graded = 0
+        self.score_sum = 0
+        self.score_count = 0
+        self.points_sum = 0
+        self.points_count = 0
+    
+    def add_assignments(self, assignments: Iterable[Dict]):
+        for assignment in assignments:
+            self.total_assignments += 1
+            if not assignment.get('due_at'):
+                continue
+                
+            try:
+                due_date = datetime.fromisoformat(assignment['due_at'].replace('Z', '+00:00'))
+                
+                # Check if submitted
+                is_submitted = assignment.get('submission') and assignment['submission'].get('submitted_at')
+                
+                if is_submitted:
+                    self.counts['completed'] += 1
+                elif due_date < self.now:
+                    self.counts['overdue'] += 1
+                    if len(self.overdue) < self.overdue_limit:
+                        self.overdue.append(assignment)
+                elif due_date <= self.next_week:
+                    self.counts['upcoming'] += 1
+                    if len(self.upcoming) < self.upcoming_limit:
+                        self.upcoming.append(assignment)
+                    
+            except (ValueError, TypeError):
+                continue
+    
+    def add_submissions(self, submissions: Iterable[Dict]):
+        for submission in submissions:
+            self.total_graded += 1
+            if submission.get('score') is not None:
+                self.score_sum += submission['score']
+                self.score_count += 1
+            if submission.get('assignment') and submission['assignment'].get('points_possible'):
+                self.points_sum += submission['assignment']['points_possible']
+                self.points_count += 1
+    
+    def result(self) -> Dict:
+        """Analysis in the shape analyze_data() has always returned"""
+        avg_score = self.score_sum / self.score_count if self.score_count else 0
+        avg_points = self.points_sum / self.points_count if self.points_count else 0
+        overall_percentage = (avg_score / avg_points * 100) if avg_points > 0 else 0
+        
+        return {
+            'assignments': {
+                'total': self.total_assignments,
+                'upcoming': self.counts['upcoming'],
+                'overdue': self.counts['overdue'],
+                'completed': self.counts['completed']
+            },
+            'grades': {
+                'total_graded': self.total_graded,
+                'average_score': round(avg_score, 2),
+                'average_points_possible': round(avg_points, 2),
+                'overall_percentage': round(overall_percentage, 2)
+            },
+            'upcoming_assignments': list(self.upcoming),  # Top 10 upcoming
+            'overdue_assignments': list(self.overdue)     # Top 5 overdue
+        }
+
+class NDJSONWriter:
+    """
+    Newline-delimited JSON output written while pages arrive
+    One {"type": "course"|"assignment"|"submission", "data": {...}} line per
+    record, then a final {"type": "summary", ...} line with metadata, statistics
+    and analysis. Each page is flushed, so a run that dies midway still leaves
+    every record fetched so far on disk (just without the summary line).
+    """
+    
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.counts = {'course': 0, 'assignment': 0, 'submission': 0}
+        self._file = open(filename, 'w', encoding='utf-8')
+    
+    def write(self, kind: str, records: Iterable[Dict]):
+        lines = [json.dumps({'type': kind, 'data': record}, default=str, ensure_ascii=False) for record in records]
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+        self.counts[kind] += len(lines)
+    
+    def close(self, summary: Optional[Dict] = None):
+        if self._file.closed:
+            return
+        if summary is not None:
+            self._file.write(json.dumps({'type': 'summary', **summary}, default=str, ensure_ascii=False) + '\n')
+        self._file.close()
 
 class CanvasDataFetcher:
-    def __init__(self, canvas_url: str, api_token: str, verbose: bool = True):
+    def __init__(self, canvas_url: str, api_token: str, verbose: bool = True,
+                 sync_state: Optional[SyncState] = None, http_cache: Optional[HttpCache] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None, checkpoint: Optional[FetchCheckpoint] = None):
         """
         Initialize the Canvas Data Fetcher
         
@@ -20,10 +478,22 @@ class CanvasDataFetcher:
             canvas_url: Canvas instance URL (e.g., https://yourschool.instructure.com)
             api_token: Canvas API token
             verbose: Whether to print detailed progress information
+            sync_state: Delta-sync state - when given, only changed records are requested
+            http_cache: Conditional GET cache - unchanged pages come back as 304s
+            rate_limiter: Shared limiter for this token (default: AdaptiveRateLimiter.shared)
+            checkpoint: Journal of finished units - a resumed one skips what is already done
         """
         self.canvas_url = canvas_url.rstrip('/')
         self.api_token = api_token
         self.verbose = verbose
+        self.sync_state = sync_state
+        self.http_cache = http_cache
+        self.checkpoint = checkpoint
+        # A resumed run advances delta cursors from when it originally started
+        self.sync_started = checkpoint.started if checkpoint else datetime.now(timezone.utc).isoformat()
+        self.failed_endpoints = set()
+        # NumPy analysis engine (--numpy): same result plus per-course grades
+        self.vectorized_analysis = False
         self.session = requests.Session()
         self.session.headers.update({
             'Authorization': f'Bearer {api_token}',
@@ -31,9 +501,8 @@ class CanvasDataFetcher:
             'User-Agent': 'Canvas-LMS-Dashboard-Fetcher/1.0'
         })
         
-        # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 0.1  # 100ms between requests
+        # Rate limiting - adapts to the quota Canvas reports, shared per token
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter.shared(api_token)
         
         # Statistics
         self.stats = {
@@ -54,55 +523,156 @@ class CanvasDataFetcher:
     
     def rate_limit(self):
         """Implement rate limiting to be respectful to Canvas API"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        self.rate_limiter.acquire()
     
-    def make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Optional[List[Dict]]:
+    def request_page(self, url: str, params: Dict[str, Any] = None) -> Tuple[Optional[List[Dict]], Optional[str]]:
         """
-        Make a request to Canvas API with error handling and rate limiting
+        Fetch a single page from Canvas API with error handling and rate limiting
         
         Args:
-            endpoint: API endpoint (e.g., '/api/v1/courses')
-            params: Query parameters
+            url: Full page URL (the endpoint URL, or a Link rel="next" URL)
+            params: Query parameters (None for next links, which carry their own)
             
         Returns:
-            Response data or None if failed
+            (page data, next page URL) - data is None if the request failed
         """
-        self.rate_limit()
-        
-        url = f"{self.canvas_url}{endpoint}"
+        endpoint = url[len(self.canvas_url):] if url.startswith(self.canvas_url) else url
         
         try:
-            self.log(f"📡 API Call: {endpoint}")
-            self.stats['api_calls'] += 1
+            query = self.encode_params(params)
+            cached = self.http_cache.lookup(url, query, self.api_token) if self.http_cache else None
             
-            response = self.session.get(url, params=params, timeout=30)
+            for attempt in range(self.rate_limiter.max_retries + 1):
+                self.rate_limit()
+                self.log(f"📡 API Call: {endpoint}")
+                self.stats['api_calls'] += 1
+                
+                try:
+                    response = self.session.get(
+                        url, params=query, headers=HttpCache.conditional_headers(cached), timeout=30
+                    )
+                except requests.exceptions.RequestException:
+                    self.rate_limiter.release(None, {})
+                    raise
+                
+                body = response.text if response.status_code == 403 else ''
+                delay = self.rate_limiter.release(response.status_code, response.headers, body)
+                if delay is None or attempt == self.rate_limiter.max_retries:
+                    break
+                self.log(f"⏳ Throttled ({response.status_code}) on {endpoint}, backing off {delay:.1f}s", 'WARN')
+            
+            if response.status_code == 304 and cached:
+                return self.http_cache.not_modified(cached)
             response.raise_for_status()
             
-            return response.json()
+            next_url = response.links.get('next', {}).get('url')
+            if self.http_cache:
+                self.http_cache.save(url, query, self.api_token, response.headers, response.content, next_url)
+            return response.json(), next_url
             
         except requests.exceptions.RequestException as e:
             error_msg = f"API request failed for {endpoint}: {str(e)}"
             self.log(error_msg, 'ERROR')
             self.stats['errors'].append(error_msg)
+            self.failed_endpoints.add(urlsplit(endpoint).path)
+            return None, None
+    
+    @staticmethod
+    def encode_params(params: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """Flatten list values into repeated keys, so requests and aiohttp send the same query"""
+        pairs = []
+        for key, value in (params or {}).items():
+            for item in (value if isinstance(value, (list, tuple)) else [value]):
+                pairs.append((key, str(item)))
+        return pairs
+    
+    def iter_pages(self, endpoint: str, params: Dict[str, Any] = None, prefetch: bool = True) -> Iterator[List[Dict]]:
+        """
+        Yield each page of a paginated endpoint, following Link rel="next" headers
+        
+        With prefetch the next page is requested in a background thread while the
+        caller processes the current one. Only one request is in flight at a time.
+        Stops at the first failed page (the error is recorded in stats).
+        """
+        pool = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page, next_url = self.request_page(f"{self.canvas_url}{endpoint}", params)
+            while page is not None:
+                pending = pool.submit(self.request_page, next_url) if pool and next_url else None
+                yield page
+                if not next_url:
+                    break
+                page, next_url = pending.result() if pending else self.request_page(next_url)
+        finally:
+            if pool:
+                pool.shutdown(wait=True)
+    
+    def make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Optional[List[Dict]]:
+        """
+        Make a request to Canvas API and return every page's records
+        
+        Returns:
+            Response data or None if the first page failed
+        """
+        records = None
+        for page in self.iter_pages(endpoint, params):
+            records = records if records is not None else []
+            records.extend(page)
+        return records
+    
+    def restore_unit(self, resource: str, course: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """A unit's records from the checkpoint journal, or None if it still has to be fetched"""
+        if not self.checkpoint:
             return None
+        records = self.checkpoint.get(resource, course['id'] if course else None)
+        if records is not None and course is not None:
+            self.stats[f'{resource}_fetched'] += len(records)
+            self.log(f"  ♻️ Resumed {resource} for: {course.get('name', 'Unknown Course')} ({len(records)} records)")
+        elif records is not None:
+            self.log(f"♻️ Resumed course list ({len(records)} courses)")
+        return records
+    
+    def checkpoint_unit(self, resource: str, course: Optional[Dict], records: List[Dict]):
+        """Journal a finished unit - unless one of its requests failed, so --resume retries it"""
+        if not self.checkpoint:
+            return
+        endpoint = (getattr(self, f'{resource}_request')(course) if course else self.courses_request())[0]
+        if endpoint not in self.failed_endpoints:
+            self.checkpoint.record(resource, course['id'] if course else None, records)
+    
+    def finish_checkpoint(self, result: Dict) -> Dict:
+        """Drop the journal after a clean run; keep it when something failed"""
+        if self.checkpoint:
+            if self.failed_endpoints:
+                self.checkpoint.close()
+                self.log(f"🧷 {len(self.checkpoint.units)} finished units kept in {self.checkpoint.path} - "
+                         f"rerun with --resume to fetch only the rest", 'WARN')
+            else:
+                self.checkpoint.complete()
+        return result
     
     def fetch_courses(self) -> List[Dict]:
         """Fetch all active courses"""
         self.log("📚 Fetching courses...")
         
-        courses = self.make_request('/api/v1/courses', {
+        restored = self.restore_unit('courses')
+        if restored is not None:
+            return self.process_courses([restored])
+        courses = self.process_courses(self.iter_pages(*self.courses_request()))
+        self.checkpoint_unit('courses', None, courses)
+        return courses
+    
+    def courses_request(self) -> Tuple[str, Dict[str, Any]]:
+        """Endpoint and params for the active course list"""
+        return '/api/v1/courses', {
             'enrollment_state': 'active',
             'per_page': 100,
             'include[]': ['total_scores', 'syllabus_body', 'public_description']
-        })
-        
+        }
+    
+    def process_courses(self, pages: Iterable[List[Dict]]) -> List[Dict]:
+        """Collect, count and log the fetched course pages"""
+        courses = [course for page in pages for course in page]
         if courses:
             self.stats['courses_fetched'] = len(courses)
             self.log(f"✅ Found {len(courses)} courses")
@@ -120,32 +690,55 @@ class CanvasDataFetcher:
         all_assignments = []
         
         for course in courses:
-            course_id = course['id']
             course_name = course.get('name', 'Unknown Course')
             
-            self.log(f"  📂 Fetching assignments for: {course_name}")
+            restored = self.restore_unit('assignments', course)
+            if restored is not None:
+                all_assignments.extend(restored)
+                continue
             
-            assignments = self.make_request(f'/api/v1/courses/{course_id}/assignments', {
-                'per_page': 100,
-                'include[]': ['submission']
-            })
+            self.log(f"  📂 Fetching assignments for: {course_name}")
             
-            if assignments:
-                # Enrich assignments with course info
-                for assignment in assignments:
-                    assignment['course_name'] = course_name
-                    assignment['course_code'] = course.get('course_code', '')
-                    assignment['course_id'] = course_id
-                
-                all_assignments.extend(assignments)
-                self.stats['assignments_fetched'] += len(assignments)
-                self.log(f"    ✅ Found {len(assignments)} assignments")
-            else:
-                self.log(f"    ⚠️ No assignments found for {course_name}")
+            pages = self.iter_pages(*self.assignments_request(course))
+            assignments = self.process_assignments(course, pages)
+            self.checkpoint_unit('assignments', course, assignments)
+            all_assignments.extend(assignments)
         
         self.log(f"📊 Total assignments fetched: {len(all_assignments)}")
         return all_assignments
     
+    def assignments_request(self, course: Dict) -> Tuple[str, Dict[str, Any]]:
+        """Endpoint and params for a course's assignments"""
+        return f"/api/v1/courses/{course['id']}/assignments", {
+            'per_page': 100,
+            'include[]': ['submission']
+        }
+    
+    def process_assignments(self, course: Dict, pages: Iterable[List[Dict]]) -> List[Dict]:
+        """Enrich one course's assignment pages with course info and count them"""
+        return [assignment for page in self.enrich_assignment_pages(course, pages) for assignment in page]
+    
+    def enrich_assignment_pages(self, course: Dict, pages: Iterable[List[Dict]]) -> Iterator[List[Dict]]:
+        """Yield each assignment page enriched with course info; counts and logs once exhausted"""
+        course_name = course.get('name', 'Unknown Course')
+        found = 0
+        
+        for page in pages:
+            # Enrich assignments with course info
+            for assignment in page:
+                assignment['course_name'] = course_name
+                assignment['course_code'] = course.get('course_code', '')
+                assignment['course_id'] = course['id']
+            found += len(page)
+            yield page
+        
+        if not found:
+            self.log(f"    ⚠️ No assignments found for {course_name}")
+            return
+        
+        self.stats['assignments_fetched'] += found
+        self.log(f"    ✅ Found {found} assignments")
+    
     def fetch_submissions(self, courses: List[Dict]) -> List[Dict]:
         """Fetch submission data (grades) for all courses"""
         self.log("🎯 Fetching submissions/grades...")
@@ -153,102 +746,86 @@ class CanvasDataFetcher:
         all_submissions = []
         
         for course in courses:
-            course_id = course['id']
             course_name = course.get('name', 'Unknown Course')
             
-            self.log(f"  📊 Fetching submissions for: {course_name}")
+            restored = self.restore_unit('submissions', course)
+            if restored is not None:
+                all_submissions.extend(restored)
+                continue
             
-            submissions = self.make_request(f'/api/v1/courses/{course_id}/students/self/submissions', {
-                'per_page': 100,
-                'include[]': ['assignment']
-            })
+            self.log(f"  📊 Fetching submissions for: {course_name}")
             
-            if submissions:
-                # Filter for graded submissions and enrich with course info
-                graded_submissions = []
-                for submission in submissions:
-                    if submission.get('score') is not None and submission.get('assignment'):
-                        submission['course_name'] = course_name
-                        submission['course_code'] = course.get('course_code', '')
-                        submission['course_id'] = course_id
-                        graded_submissions.append(submission)
-                
-                all_submissions.extend(graded_submissions)
-                self.stats['submissions_fetched'] += len(graded_submissions)
-                self.log(f"    ✅ Found {len(graded_submissions)} graded submissions")
-            else:
-                self.log(f"    ⚠️ No submissions found for {course_name}")
+            pages = self.iter_pages(*self.submissions_request(course))
+            submissions = self.process_submissions(course, pages)
+            self.checkpoint_unit('submissions', course, submissions)
+            all_submissions.extend(submissions)
         
         self.log(f"📈 Total submissions fetched: {len(all_submissions)}")
         return all_submissions
     
-    def analyze_data(self, assignments: List[Dict], submissions: List[Dict]) -> Dict:
-        """Analyze fetched data and generate insights"""
-        self.log("🔍 Analyzing data...")
+    def submissions_request(self, course: Dict) -> Tuple[str, Dict[str, Any]]:
+        """Endpoint and params for a course's submissions - only newly graded ones in delta mode"""
+        params = {
+            'per_page': 100,
+            'include[]': ['assignment']
+        }
+        cursor = self.sync_state.cursor(course['id'], 'submissions') if self.sync_state else None
+        if cursor:
+            params['graded_since'] = cursor
+        return f"/api/v1/courses/{course['id']}/students/self/submissions", params
+    
+    def process_submissions(self, course: Dict, pages: Iterable[List[Dict]]) -> List[Dict]:
+        """Keep one course's graded submissions, enriched with course info"""
+        return [submission for page in self.enrich_submission_pages(course, pages) for submission in page]
+    
+    def enrich_submission_pages(self, course: Dict, pages: Iterable[List[Dict]]) -> Iterator[List[Dict]]:
+        """Yield the graded submissions of each page, enriched with course info; counts and logs once exhausted"""
+        course_name = course.get('name', 'Unknown Course')
+        seen = False
+        found = 0
         
-        now = datetime.now()
-        next_week = now + timedelta(days=7)
+        for page in pages:
+            seen = seen or bool(page)
+            # Filter for graded submissions and enrich with course info
+            graded_submissions = []
+            for submission in page:
+                if submission.get('score') is not None and submission.get('assignment'):
+                    submission['course_name'] = course_name
+                    submission['course_code'] = course.get('course_code', '')
+                    submission['course_id'] = course['id']
+                    graded_submissions.append(submission)
+            found += len(graded_submissions)
+            yield graded_submissions
         
-        # Upcoming assignments
-        upcoming = []
-        overdue = []
-        completed = []
+        if not seen:
+            self.log(f"    ⚠️ No submissions found for {course_name}")
+            return
         
-        for assignment in assignments:
-            if not assignment.get('due_at'):
-                continue
-                
-            try:
-                due_date = datetime.fromisoformat(assignment['due_at'].replace('Z', '+00:00'))
-                
-                # Check if submitted
-                is_submitted = assignment.get('submission') and assignment['submission'].get('submitted_at')
-                
-                if is_submitted:
-                    completed.append(assignment)
-                elif due_date < now:
-                    overdue.append(assignment)
-                elif due_date <= next_week:
-                    upcoming.append(assignment)
-                    
-            except (ValueError, TypeError):
-                continue
+        self.stats['submissions_fetched'] += found
+        self.log(f"    ✅ Found {found} graded submissions")
+    
+    def analyze_data(self, assignments: List[Dict], submissions: List[Dict]) -> Dict:
+        """Analyze fetched data and generate insights"""
+        self.log("🔍 Analyzing data...")
         
-        # Grade analysis
-        if submissions:
-            scores = [s['score'] for s in submissions if s.get('score') is not None]
-            total_points = [s['assignment']['points_possible'] for s in submissions 
-                          if s.get('assignment') and s['assignment'].get('points_possible')]
-            
-            avg_score = sum(scores) / len(scores) if scores else 0
-            avg_points = sum(total_points) / len(total_points) if total_points else 0
-            overall_percentage = (avg_score / avg_points * 100) if avg_points > 0 else 0
-        else:
-            avg_score = avg_points = overall_percentage = 0
-        
-        analysis = {
-            'assignments': {
-                'total': len(assignments),
-                'upcoming': len(upcoming),
-                'overdue': len(overdue),
-                'completed': len(completed)
-            },
-            'grades': {
-                'total_graded': len(submissions),
-                'average_score': round(avg_score, 2),
-                'average_points_possible': round(avg_points, 2),
-                'overall_percentage': round(overall_percentage, 2)
-            },
-            'upcoming_assignments': upcoming[:10],  # Top 10 upcoming
-            'overdue_assignments': overdue[:5]      # Top 5 overdue
-        }
+        if self.vectorized_analysis:
+            return self.log_analysis(analyze_vectorized(assignments, submissions, per_course=True))
         
+        running = RunningAnalysis()
+        running.add_assignments(assignments)
+        running.add_submissions(submissions)
+        return self.log_analysis(running.result())
+    
+    def log_analysis(self, analysis: Dict) -> Dict:
         self.log(f"📊 Analysis complete:")
         self.log(f"  📝 Total assignments: {analysis['assignments']['total']}")
         self.log(f"  ⏰ Upcoming (next 7 days): {analysis['assignments']['upcoming']}")
         self.log(f"  🚨 Overdue: {analysis['assignments']['overdue']}")
         self.log(f"  ✅ Completed: {analysis['assignments']['completed']}")
         self.log(f"  📈 Overall grade: {analysis['grades']['overall_percentage']:.1f}%")
+        for course in analysis.get('course_grades', []):
+            self.log(f"    📚 {course['course_name']}: {course['overall_percentage']:.1f}% "
+                     f"({course['total_graded']} graded)")
         
         return analysis
     
@@ -260,7 +837,7 @@ class CanvasDataFetcher:
         courses = self.fetch_courses()
         if not courses:
             self.log("❌ No courses found or fetch failed", 'ERROR')
-            return self.generate_result([], [], [])
+            return self.finish_checkpoint(self.generate_result([], [], []))
         
         # Fetch assignments
         assignments = self.fetch_assignments(courses)
@@ -268,16 +845,121 @@ class CanvasDataFetcher:
         # Fetch submissions
         submissions = self.fetch_submissions(courses)
         
-        return self.generate_result(courses, assignments, submissions)
+        return self.finish_checkpoint(self.generate_result(courses, assignments, submissions))
+    
+    def apply_delta(self, courses: List[Dict], assignments: List[Dict],
+                    submissions: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Merge this run's records into the saved snapshot and advance cursors
+        
+        Assignments are always fetched in full (Canvas has no updated-since
+        filter for them); submissions are a delta once a course has a cursor.
+        A course resource whose request failed keeps its previous records and cursor.
+        """
+        state = self.sync_state
+        fetched = {'assignments': assignments, 'submissions': submissions}
+        merged = {'assignments': [], 'submissions': []}
+        
+        for course in courses:
+            course_id = course['id']
+            for resource in SyncState.RESOURCES:
+                endpoint = getattr(self, f'{resource}_request')(course)[0]
+                if endpoint in self.failed_endpoints:
+                    merged[resource].extend(state.keep(resource, course_id))
+                    continue
+                complete = resource == 'assignments' or not state.cursor(course_id, resource)
+                records = [r for r in fetched[resource] if r.get('course_id') == course_id]
+                merged[resource].extend(state.merge(resource, course_id, records, complete))
+                state.advance(course_id, resource, self.sync_started)
+        
+        state.retain_courses(course['id'] for course in courses)
+        state.save()
+        
+        for resource, counts in state.counts.items():
+            self.log(f"🔁 Delta {resource}: {counts['new']} new, {counts['updated']} updated, "
+                     f"{counts['unchanged']} unchanged, {counts['stale']} stale (fetch failed)")
+        return merged['assignments'], merged['submissions']
+    
+    def stream_all_data(self, writer: 'NDJSONWriter') -> Dict:
+        """
+        Fetch all Canvas data, writing records to `writer` as pages arrive
+        Only the course list is kept; the analysis comes from running aggregates.
+        Returns metadata, statistics and analysis (no 'data' section)
+        """
+        if self.sync_state or self.checkpoint:
+            raise ValueError("Streaming output cannot be combined with delta sync or checkpoints")
+        self.log("🚀 Starting streaming Canvas data fetch...")
+        running = RunningAnalysis()
+        
+        courses = self.fetch_courses()
+        writer.write('course', courses)
+        if not courses:
+            self.log("❌ No courses found or fetch failed", 'ERROR')
+            return self.finish_stream(writer, running)
+        
+        self.log("📝 Fetching assignments...")
+        for course in courses:
+            self.log(f"  📂 Fetching assignments for: {course.get('name', 'Unknown Course')}")
+            pages = self.iter_pages(*self.assignments_request(course))
+            for page in self.enrich_assignment_pages(course, pages):
+                writer.write('assignment', page)
+                running.add_assignments(page)
+        
+        self.log("🎯 Fetching submissions/grades...")
+        for course in courses:
+            self.log(f"  📊 Fetching submissions for: {course.get('name', 'Unknown Course')}")
+            pages = self.iter_pages(*self.submissions_request(course))
+            for page in self.enrich_submission_pages(course, pages):
+                writer.write('submission', page)
+                running.add_submissions(page)
+        
+        return self.finish_stream(writer, running)
+    
+    def finish_stream(self, writer: 'NDJSONWriter', running: 'RunningAnalysis') -> Dict:
+        """Summarize a streamed fetch and append the summary line"""
+        self.log("🔍 Analyzing data...")
+        analysis = self.log_analysis(running.result())
+        summary = self.summarize(writer.counts['course'], writer.counts['assignment'],
+                                 writer.counts['submission'], analysis)
+        writer.close(summary)
+        return summary
+    
+    def write_result(self, writer: 'NDJSONWriter', result: Dict) -> Dict:
+        """Write a fetch_all_data() result through a streaming writer; returns it without 'data'"""
+        for kind in ('course', 'assignment', 'submission'):
+            writer.write(kind, result['data'][f'{kind}s'])
+        summary = {key: value for key, value in result.items() if key != 'data'}
+        writer.close(summary)
+        return summary
     
     def generate_result(self, courses: List[Dict], assignments: List[Dict], submissions: List[Dict]) -> Dict:
         """Generate final result with all data and analysis"""
-        self.stats['end_time'] = datetime.now()
-        duration = self.stats['end_time'] - self.stats['start_time']
+        if self.sync_state and courses:
+            assignments, submissions = self.apply_delta(courses, assignments, submissions)
         
         # Analyze data
         analysis = self.analyze_data(assignments, submissions)
         
+        summary = self.summarize(len(courses), len(assignments), len(submissions), analysis)
+        if self.sync_state and courses:
+            summary['metadata']['delta'] = {'since': self.sync_started, **self.sync_state.counts}
+        
+        return {
+            'metadata': summary['metadata'],
+            'statistics': summary['statistics'],
+            'data': {
+                'courses': courses,
+                'assignments': assignments,
+                'submissions': submissions
+            },
+            'analysis': analysis
+        }
+    
+    def summarize(self, courses: int, assignments: int, submissions: int, analysis: Dict) -> Dict:
+        """Metadata, statistics and analysis for a finished fetch"""
+        self.stats['end_time'] = datetime.now()
+        duration = self.stats['end_time'] - self.stats['start_time']
+        
         result = {
             'metadata': {
                 'fetch_time': self.stats['end_time'].isoformat(),
@@ -287,11 +969,6 @@ class CanvasDataFetcher:
                 'errors': self.stats['errors']
             },
             'statistics': {
-                'courses': len(courses),
-                'assignments': len(assignments),
-                'submissions': len(submissions)
-            },
-            'data': {
                 'courses': courses,
                 'assignments': assignments,
                 'submissions': submissions
@@ -299,6 +976,13 @@ class CanvasDataFetcher:
             'analysis': analysis
         }
         
+        result['metadata']['rate_limit'] = {
+            **self.rate_limiter.stats,
+            'remaining': self.rate_limiter.remaining
+        }
+        if self.http_cache:
+            result['metadata']['http_cache'] = dict(self.http_cache.stats)
+        
         self.log(f"🎉 Data fetch completed in {duration.total_seconds():.1f} seconds")
         self.log(f"📊 API calls made: {self.stats['api_calls']}")
         
@@ -325,6 +1009,254 @@ class CanvasDataFetcher:
             self.log(error_msg, 'ERROR')
             raise Exception(error_msg)
 
+class TokenBucket:
+    """Async token bucket: sustained `rate` requests/second with bursts up to `capacity`"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncCanvasDataFetcher(CanvasDataFetcher):
+    """
+    Canvas Data Fetcher that runs per-course requests concurrently
+    
+    Uses a pooled aiohttp session, at most `concurrency` requests in flight and
+    a token bucket of `rate` requests/second; within those ceilings the adaptive
+    limiter narrows concurrency as Canvas quota runs low. fetch_all_data() returns
+    the same result as the sequential fetcher, with courses kept in their original order.
+    """
+    
+    def __init__(self, canvas_url: str, api_token: str, verbose: bool = True,
+                 concurrency: int = 6, rate: float = 10.0, sync_state: Optional[SyncState] = None,
+                 http_cache: Optional[HttpCache] = None, rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 shared_session: Optional['aiohttp.ClientSession'] = None, request_slots: Any = None,
+                 checkpoint: Optional[FetchCheckpoint] = None):
+        """
+        shared_session: pooled session owned by the caller (e.g. one per host in a batch);
+                        the token then travels on each request instead of the session
+        request_slots:  async context manager bounding requests in flight (default:
+                        a semaphore of `concurrency`)
+        """
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for concurrent fetching (pip install aiohttp)")
+        rate_limiter = rate_limiter or AdaptiveRateLimiter.shared(api_token, max_concurrency=concurrency)
+        super().__init__(canvas_url, api_token, verbose, sync_state, http_cache, rate_limiter, checkpoint)
+        self.concurrency = max(1, concurrency)
+        self.request_rate = rate
+        self.shared_session = shared_session
+        self.request_slots = request_slots
+        self.request_headers: Dict[str, str] = {}
+        self.async_session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.bucket: Optional[TokenBucket] = None
+    
+    async def request_page_async(self, url: str, params: Dict[str, Any] = None) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """
+        Async request_page - bounded by the concurrency limit, token bucket and adaptive limiter
+        HTTP cache reads and writes (SQLite) run in the default executor
+        """
+        endpoint = url[len(self.canvas_url):] if url.startswith(self.canvas_url) else url
+        loop = asyncio.get_running_loop()
+        
+        async with self.semaphore:
+            try:
+                query = self.encode_params(params)
+                cached = await loop.run_in_executor(None, self.http_cache.lookup, url, query, self.api_token) if self.http_cache else None
+                
+                for attempt in range(self.rate_limiter.max_retries + 1):
+                    await self.bucket.acquire()
+                    await self.rate_limiter.acquire_async()
+                    self.log(f"📡 API Call: {endpoint}")
+                    self.stats['api_calls'] += 1
+                    
+                    try:
+                        async with self.async_session.get(
+                            url, params=query, headers={**self.request_headers, **HttpCache.conditional_headers(cached)}
+                        ) as response:
+                            body = await response.read()
+                    except BaseException:
+                        # Cancellation too - the limiter is shared per token and must get its slot back
+                        self.rate_limiter.release(None, {})
+                        raise
+                    
+                    text = body.decode('utf-8', 'replace') if response.status == 403 else ''
+                    delay = self.rate_limiter.release(response.status, response.headers, text)
+                    if delay is None or attempt == self.rate_limiter.max_retries:
+                        break
+                    self.log(f"⏳ Throttled ({response.status}) on {endpoint}, backing off {delay:.1f}s", 'WARN')
+                
+                if response.status == 304 and cached:
+                    return self.http_cache.not_modified(cached)
+                response.raise_for_status()
+                
+                next_link = response.links.get('next')
+                next_url = str(next_link['url']) if next_link else None
+                if self.http_cache:
+                    await loop.run_in_executor(
+                        None, self.http_cache.save, url, query, self.api_token, response.headers, body, next_url
+                    )
+                return json.loads(body), next_url
+                
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error_msg = f"API request failed for {endpoint}: {str(e) or type(e).__name__}"
+                self.log(error_msg, 'ERROR')
+                self.stats['errors'].append(error_msg)
+                self.failed_endpoints.add(urlsplit(endpoint).path)
+                return None, None
+    
+    async def iter_pages_async(self, endpoint: str, params: Dict[str, Any] = None) -> AsyncIterator[List[Dict]]:
+        """Async iter_pages - the next page is requested while the caller handles the current one"""
+        pending = asyncio.ensure_future(self.request_page_async(f"{self.canvas_url}{endpoint}", params))
+        try:
+            while pending is not None:
+                page, next_url = await pending
+                pending = None
+                if page is None:
+                    break
+                if next_url:
+                    pending = asyncio.ensure_future(self.request_page_async(next_url))
+                yield page
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    async def fetch_pages_async(self, endpoint: str, params: Dict[str, Any] = None) -> List[List[Dict]]:
+        """Collect every page of an endpoint, in order"""
+        return [page async for page in self.iter_pages_async(endpoint, params)]
+    
+    async def fetch_course_pages(self, course: Dict) -> Tuple[Dict, List[List[Dict]], List[List[Dict]]]:
+        """Fetch one course's assignment and submission pages concurrently"""
+        self.log(f"  📂 Fetching assignments and submissions for: {course.get('name', 'Unknown Course')}")
+        assignments, submissions = await asyncio.gather(
+            self.fetch_pages_async(*self.assignments_request(course)),
+            self.fetch_pages_async(*self.submissions_request(course))
+        )
+        return course, assignments, submissions
+    
+    async def fetch_course_data(self, course: Dict) -> Tuple[List[Dict], List[Dict]]:
+        """Fetch one course's assignments and submissions concurrently (skipping checkpointed ones)"""
+        assignments = self.restore_unit('assignments', course)
+        submissions = self.restore_unit('submissions', course)
+        if assignments is None and submissions is None:
+            _, assignment_pages, submission_pages = await self.fetch_course_pages(course)
+            assignments = self.process_assignments(course, assignment_pages)
+            submissions = self.process_submissions(course, submission_pages)
+            self.checkpoint_unit('assignments', course, assignments)
+            self.checkpoint_unit('submissions', course, submissions)
+        elif assignments is None:
+            assignments = self.process_assignments(course, await self.fetch_pages_async(*self.assignments_request(course)))
+            self.checkpoint_unit('assignments', course, assignments)
+        elif submissions is None:
+            submissions = self.process_submissions(course, await self.fetch_pages_async(*self.submissions_request(course)))
+            self.checkpoint_unit('submissions', course, submissions)
+        return assignments, submissions
+    
+    @asynccontextmanager
+    async def session_scope(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """Pooled session, concurrency limit and token bucket for one run"""
+        self.semaphore = self.request_slots or asyncio.Semaphore(self.concurrency)
+        self.bucket = TokenBucket(self.request_rate, max(self.request_rate, self.concurrency))
+        headers = {k: v for k, v in self.session.headers.items() if k != 'Content-Type'}
+        
+        if self.shared_session is not None:
+            # The caller's pool outlives this run; only the headers are ours
+            self.async_session = self.shared_session
+            self.request_headers = headers
+            try:
+                yield self.shared_session
+            finally:
+                self.async_session = None
+                self.request_headers = {}
+            return
+        
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as session:
+            self.async_session = session
+            try:
+                yield session
+            finally:
+                self.async_session = None
+    
+    async def fetch_all_data_async(self) -> Dict:
+        """Fetch all Canvas data with per-course requests running concurrently"""
+        self.log(f"🚀 Starting concurrent Canvas data fetch (concurrency {self.concurrency}, {self.request_rate:g} req/s)...")
+        
+        async with self.session_scope():
+            self.log("📚 Fetching courses...")
+            courses = self.restore_unit('courses')
+            if courses is None:
+                courses = self.process_courses(await self.fetch_pages_async(*self.courses_request()))
+                self.checkpoint_unit('courses', None, courses)
+            else:
+                courses = self.process_courses([courses])
+            if not courses:
+                self.log("❌ No courses found or fetch failed", 'ERROR')
+                return self.finish_checkpoint(self.generate_result([], [], []))
+            
+            per_course = await asyncio.gather(*(self.fetch_course_data(course) for course in courses))
+        
+        assignments = [a for course_assignments, _ in per_course for a in course_assignments]
+        submissions = [s for _, course_submissions in per_course for s in course_submissions]
+        self.log(f"📊 Total assignments fetched: {len(assignments)}")
+        self.log(f"📈 Total submissions fetched: {len(submissions)}")
+        
+        return self.finish_checkpoint(self.generate_result(courses, assignments, submissions))
+    
+    def fetch_all_data(self) -> Dict:
+        """Fetch all Canvas data and return structured result"""
+        return asyncio.run(self.fetch_all_data_async())
+    
+    async def stream_all_data_async(self, writer: NDJSONWriter) -> Dict:
+        """
+        Concurrent stream_all_data - each course's records are written as soon as
+        that course finishes, so only in-flight courses are held in memory
+        """
+        if self.sync_state or self.checkpoint:
+            raise ValueError("Streaming output cannot be combined with delta sync or checkpoints")
+        self.log(f"🚀 Starting concurrent streaming fetch (concurrency {self.concurrency}, {self.request_rate:g} req/s)...")
+        running = RunningAnalysis()
+        
+        async with self.session_scope():
+            self.log("📚 Fetching courses...")
+            courses = self.process_courses(await self.fetch_pages_async(*self.courses_request()))
+            writer.write('course', courses)
+            if not courses:
+                self.log("❌ No courses found or fetch failed", 'ERROR')
+                return self.finish_stream(writer, running)
+            
+            for finished in asyncio.as_completed([self.fetch_course_pages(course) for course in courses]):
+                course, assignment_pages, submission_pages = await finished
+                for page in self.enrich_assignment_pages(course, assignment_pages):
+                    writer.write('assignment', page)
+                    running.add_assignments(page)
+                for page in self.enrich_submission_pages(course, submission_pages):
+                    writer.write('submission', page)
+                    running.add_submissions(page)
+        
+        return self.finish_stream(writer, running)
+    
+    def stream_all_data(self, writer: NDJSONWriter) -> Dict:
+        return asyncio.run(self.stream_all_data_async(writer))
+
 def main():
     """Main function for command line usage"""
     if len(sys.argv) < 3:
@@ -333,7 +1265,17 @@ def main():
         print("\nOptions:")
         print("  --quiet        : Minimize output")
         print("  --output FILE  : Save to specific file")
-        print("  --format json  : Output format (json only for now)")
+        print("  --format FMT   : json (default, one document), ndjson (streamed while fetching)")
+        print("                   or columnar (Parquet if pyarrow is installed, else .ccol; --output is a directory)")
+        print("  --concurrency N: Fetch courses concurrently with N requests in flight")
+        print("  --rate R       : Max requests/second in concurrent mode (default 10)")
+        print("  --delta        : Only fetch records changed since the last --delta run")
+        print("  --state FILE   : Delta sync state file (default .canvas_sync/<host>_<token>.json)")
+        print("  --http-cache [F]: Revalidate with ETag/Last-Modified, keeping bodies in F")
+        print("  --numpy        : Vectorized analysis (needs numpy, opt-in), adds per-course grades")
+        print("  --checkpoint [F]: Journal finished courses to F so an interrupted run can be resumed")
+        print("                   (default .canvas_sync/<host>_<token>.checkpoint.jsonl)")
+        print("  --resume       : Skip courses finished by an interrupted run (implies --checkpoint)")
         print("\nExample:")
         print("  python canvas_fetcher.py https://school.instructure.com your_token_here")
         sys.exit(1)
@@ -350,15 +1292,96 @@ def main():
         if output_index + 1 < len(sys.argv):
             output_file = sys.argv[output_index + 1]
     
+    output_format = 'json'
+    if '--format' in sys.argv:
+        format_index = sys.argv.index('--format')
+        if format_index + 1 < len(sys.argv):
+            output_format = sys.argv[format_index + 1].lower()
+    if output_format not in ('json', 'ndjson', 'columnar'):
+        print(f"❌ Unknown format: {output_format} (use json, ndjson or columnar)")
+        sys.exit(1)
+    
+    concurrency = None
+    if '--concurrency' in sys.argv:
+        concurrency_index = sys.argv.index('--concurrency')
+        if concurrency_index + 1 < len(sys.argv):
+            concurrency = int(sys.argv[concurrency_index + 1])
+    
+    rate = 10.0
+    if '--rate' in sys.argv:
+        rate_index = sys.argv.index('--rate')
+        if rate_index + 1 < len(sys.argv):
+            rate = float(sys.argv[rate_index + 1])
+    
+    sync_state = None
+    if '--delta' in sys.argv or '--state' in sys.argv:
+        state_file = SyncState.default_path(canvas_url, api_token)
+        if '--state' in sys.argv:
+            state_index = sys.argv.index('--state')
+            if state_index + 1 < len(sys.argv):
+                state_file = sys.argv[state_index + 1]
+        sync_state = SyncState(state_file)
+    
+    http_cache = None
+    if '--http-cache' in sys.argv:
+        cache_index = sys.argv.index('--http-cache')
+        cache_file = os.path.join('.canvas_sync', 'http_cache.db')
+        if cache_index + 1 < len(sys.argv) and not sys.argv[cache_index + 1].startswith('--'):
+            cache_file = sys.argv[cache_index + 1]
+        http_cache = HttpCache(cache_file)
+    
+    checkpoint = None
+    resume = '--resume' in sys.argv
+    if resume or '--checkpoint' in sys.argv:
+        checkpoint_file = FetchCheckpoint.default_path(canvas_url, api_token)
+        if '--checkpoint' in sys.argv:
+            checkpoint_index = sys.argv.index('--checkpoint')
+            if checkpoint_index + 1 < len(sys.argv) and not sys.argv[checkpoint_index + 1].startswith('--'):
+                checkpoint_file = sys.argv[checkpoint_index + 1]
+        checkpoint = FetchCheckpoint(checkpoint_file, canvas_url, api_token, resume=resume)
+        if resume and not checkpoint.resumed:
+            print(f"ℹ️ No checkpoint to resume at {checkpoint_file}, starting from scratch")
+    
     # Initialize fetcher
-    fetcher = CanvasDataFetcher(canvas_url, api_token, verbose=verbose)
+    if concurrency:
+        fetcher = AsyncCanvasDataFetcher(canvas_url, api_token, verbose=verbose, concurrency=concurrency,
+                                         rate=rate, sync_state=sync_state, http_cache=http_cache,
+                                         checkpoint=checkpoint)
+    else:
+        fetcher = CanvasDataFetcher(canvas_url, api_token, verbose=verbose,
+                                    sync_state=sync_state, http_cache=http_cache, checkpoint=checkpoint)
+    
+    if '--numpy' in sys.argv:
+        if not vectorized_available():
+            print("❌ numpy is required for --numpy (pip install numpy)")
+            sys.exit(1)
+        fetcher.vectorized_analysis = True
     
     try:
-        # Fetch all data
-        result = fetcher.fetch_all_data()
-        
-        # Save to file
-        saved_file = fetcher.save_to_file(result, output_file)
+        if output_format in ('ndjson', 'columnar'):
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            if output_format == 'ndjson':
+                saved_file = output_file or f'canvas_data_{timestamp}.ndjson'
+                writer = NDJSONWriter(saved_file)
+            else:
+                saved_file = output_file or f'canvas_data_{timestamp}'
+                writer = ColumnarWriter(saved_file)
+            try:
+                if sync_state or checkpoint:
+                    # Delta/checkpointed runs gather (and merge) every record first, then write them
+                    result = fetcher.write_result(writer, fetcher.fetch_all_data())
+                else:
+                    # Stream records to the writer as pages arrive
+                    result = fetcher.stream_all_data(writer)
+            finally:
+                writer.close()
+            fetcher.log(f"💾 Data written to: {saved_file}")
+        else:
+            # Fetch all data
+            result = fetcher.fetch_all_data()
+            
+            # Save to file
+            saved_file = fetcher.save_to_file(result, output_file)
         
         # Print summary
         print(f"\n📋 Fetch Summary:")
@@ -371,6 +1394,15 @@ def main():
         if result['metadata']['errors']:
             print(f"  ⚠️ Errors: {len(result['metadata']['errors'])}")
         
+        http_stats = result['metadata'].get('http_cache')
+        if http_stats:
+            print(f"  📦 HTTP cache: {http_stats['not_modified']} not modified, "
+                  f"{http_stats['bytes_saved']:,} bytes saved, {http_stats['bytes_downloaded']:,} downloaded")
+        
+        for resource, counts in result['metadata'].get('delta', {}).items():
+            if isinstance(counts, dict):
+                print(f"  🔁 {resource}: {counts['new']} new, {counts['updated']} updated, {counts['unchanged']} unchanged")
+        
         # Print upcoming assignments
         upcoming = result['analysis']['upcoming_assignments']
         if upcoming:
@@ -0,0 +1,98 @@
+"""
+Conditional GET cache for Canvas API pages, shared by canvas_fetcher.py and
+the backend's background sync
+
+Response bodies are kept in a SQLite file with their ETag/Last-Modified and
+next page link, per URL, parameter set and token (the same URL returns
+different data per user). Requests revalidate with If-None-Match /
+If-Modified-Since and a 304 is answered from the stored body.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+class HttpCache:
+    """SQLite store of validators and bodies, plus bytes-saved counters"""
+
+    def __init__(self, path: str, max_age: float = 30 * 86400):
+        self.path = path
+        self.stats = {'not_modified': 0, 'bytes_downloaded': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS http_responses (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB NOT NULL,
+                next_url TEXT,
+                stored_at REAL NOT NULL
+            )"""
+        )
+        # Drop entries nobody has revalidated for max_age
+        self._conn.execute('DELETE FROM http_responses WHERE stored_at < ?', (time.time() - max_age,))
+        self._conn.commit()
+
+    @staticmethod
+    def key(url: str, params: List[Tuple[str, str]], token: str) -> str:
+        """Cache key per URL, parameter set and token"""
+        token_id = hashlib.sha256(token.encode()).hexdigest()[:16]
+        raw = json.dumps([token_id, url, sorted(params)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def lookup(self, url: str, params: List[Tuple[str, str]], token: str) -> Optional[Dict[str, Any]]:
+        """The stored response for a request, or None"""
+        key = self.key(url, params, token)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, body, next_url FROM http_responses WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'key': key, 'etag': row[0], 'last_modified': row[1], 'body': row[2], 'next_url': row[3]}
+
+    @staticmethod
+    def conditional_headers(cached: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for a cached response"""
+        headers = {}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def not_modified(self, cached: Dict[str, Any]) -> Tuple[Any, Optional[str]]:
+        """Answer a 304 from the cached body and next link, and mark the entry as revalidated"""
+        with self._lock:
+            self.stats['not_modified'] += 1
+            self.stats['bytes_saved'] += len(cached['body'])
+            self._conn.execute('UPDATE http_responses SET stored_at = ? WHERE key = ?', (time.time(), cached['key']))
+            self._conn.commit()
+        return json.loads(cached['body']), cached['next_url']
+
+    def save(self, url: str, params: List[Tuple[str, str]], token: str, headers: Any,
+             body: bytes, next_url: Optional[str]):
+        """Count a downloaded body and keep it if the response carries validators"""
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        with self._lock:
+            self.stats['bytes_downloaded'] += len(body)
+            if etag or last_modified:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO http_responses VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.key(url, params, token), etag, last_modified, body, next_url, time.time())
+                )
+                self._conn.commit()
+
+    def entries(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM http_responses').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
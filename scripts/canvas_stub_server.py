@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Canvas API endpoints used by canvas_fetcher.py
+Serves synthetic courses, assignments and submissions with Link pagination,
+ETags (304 on If-None-Match) and Canvas-style rate limiting: a leaky bucket per
+token, reported through X-Rate-Limit-Remaining / X-Request-Cost, answering
+403 "Rate Limit Exceeded" once it is empty
+
+Usage: python canvas_stub_server.py [--port 8900] [--courses 12] [--assignments 150]
+                                    [--latency 0.05] [--quota 700] [--refill 10] [--cost 20]
+
+Then: python canvas_fetcher.py http://127.0.0.1:8900 any_token --concurrency 8
+"""
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from typing import Dict, List
+
+from aiohttp import web
+
+class LeakyBucket:
+    """Canvas-like quota: requests spend `cost`, the bucket refills at `refill` units/second"""
+
+    def __init__(self, quota: float, refill: float):
+        self.quota = quota
+        self.refill = refill
+        self.remaining = quota
+        self.updated = time.monotonic()
+
+    def spend(self, cost: float) -> bool:
+        now = time.monotonic()
+        self.remaining = min(self.quota, self.remaining + (now - self.updated) * self.refill)
+        self.updated = now
+        if self.remaining < cost:
+            return False
+        self.remaining -= cost
+        return True
+
+class CanvasStub:
+    def __init__(self, courses: int, assignments: int, latency: float, quota: float, refill: float, cost: float):
+        self.latency = latency
+        self.quota = quota
+        self.refill = refill
+        self.cost = cost
+        self.buckets: Dict[str, LeakyBucket] = {}
+        self.stats = {"requests": 0, "throttled": 0, "not_modified": 0}
+        self.courses = [
+            {"id": c, "name": f"Course {c}", "course_code": f"C{c:03d}"} for c in range(1, courses + 1)
+        ]
+        self.assignments = {
+            c["id"]: [
+                {
+                    "id": c["id"] * 10000 + a,
+                    "name": f"Assignment {a}",
+                    "due_at": f"2030-01-{a % 28 + 1:02d}T23:59:00Z",
+                    "points_possible": 10 + a % 5 * 10,
+                    "submission": {"submitted_at": "2029-12-01T00:00:00Z" if a % 3 == 0 else None}
+                }
+                for a in range(assignments)
+            ]
+            for c in self.courses
+        }
+        self.submissions = {
+            course_id: [
+                {
+                    "id": item["id"],
+                    "score": item["points_possible"] * 0.8 if item["id"] % 2 == 0 else None,
+                    "assignment_id": item["id"],
+                    "graded_at": "2029-12-02T00:00:00Z",
+                    "assignment": {"points_possible": item["points_possible"]}
+                }
+                for item in items
+            ]
+            for course_id, items in self.assignments.items()
+        }
+
+    async def respond(self, request: web.Request, rows: List[Dict]) -> web.Response:
+        """Paginate rows, applying latency, the token's quota and ETag revalidation"""
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.latency)
+
+        token = request.headers.get("Authorization", "")
+        bucket = self.buckets.setdefault(token, LeakyBucket(self.quota, self.refill))
+        if not bucket.spend(self.cost):
+            self.stats["throttled"] += 1
+            return web.Response(
+                status=403,
+                text="403 Forbidden (Rate Limit Exceeded)",
+                headers={"X-Rate-Limit-Remaining": f"{bucket.remaining:.1f}", "X-Request-Cost": "0"}
+            )
+
+        page = int(request.query.get("page", 1))
+        per_page = min(int(request.query.get("per_page", 10)), 100)
+        body = json.dumps(rows[(page - 1) * per_page:page * per_page]).encode()
+        headers = {
+            "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+            "X-Rate-Limit-Remaining": f"{bucket.remaining:.1f}",
+            "X-Request-Cost": f"{self.cost:.1f}"
+        }
+        if page * per_page < len(rows):
+            query = dict(request.query, page=str(page + 1))
+            headers["Link"] = f'<{request.url.with_query(query)}>; rel="next"'
+
+        if request.headers.get("If-None-Match") == headers["ETag"]:
+            self.stats["not_modified"] += 1
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, headers=headers, content_type="application/json")
+
+    async def courses_handler(self, request: web.Request) -> web.Response:
+        return await self.respond(request, self.courses)
+
+    async def assignments_handler(self, request: web.Request) -> web.Response:
+        return await self.respond(request, self.assignments.get(int(request.match_info["course_id"]), []))
+
+    async def submissions_handler(self, request: web.Request) -> web.Response:
+        rows = self.submissions.get(int(request.match_info["course_id"]), [])
+        since = request.query.get("graded_since")
+        if since:
+            rows = [row for row in rows if row["graded_at"] > since]
+        return await self.respond(request, rows)
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/api/v1/courses", self.courses_handler),
+            web.get("/api/v1/courses/{course_id}/assignments", self.assignments_handler),
+            web.get("/api/v1/courses/{course_id}/students/self/submissions", self.submissions_handler),
+            web.get("/stub/stats", self.stats_handler)
+        ])
+        return app
+
+def option(name: str, default: float) -> float:
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return float(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+def main():
+    stub = CanvasStub(
+        courses=int(option("--courses", 12)),
+        assignments=int(option("--assignments", 150)),
+        latency=option("--latency", 0.05),
+        quota=option("--quota", 700),
+        refill=option("--refill", 10),
+        cost=option("--cost", 20)
+    )
+    port = int(option("--port", 8900))
+    print(f"🧪 Canvas stub on http://127.0.0.1:{port} ({len(stub.courses)} courses, stats at /stub/stats)")
+    web.run_app(stub.app(), host="127.0.0.1", port=port, print=None)
+
+if __name__ == "__main__":
+    main()
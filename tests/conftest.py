@@ -0,0 +1,51 @@
+"""
+The backend and scripts use flat imports (run from their own directories),
+so both are put on sys.path for the tests
+"""
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("backend", "scripts"):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+@pytest.fixture
+def canvas_stub():
+    """
+    Serve scripts/canvas_stub_server.py on a free port from a background loop
+    Yields start(**options) -> (base_url, stub); quota is effectively unlimited
+    unless a test passes its own
+    """
+    from aiohttp import web
+    from canvas_stub_server import CanvasStub
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runners = []
+
+    def start(courses=3, assignments=25, latency=0.0, quota=1e9, refill=1e9, cost=1.0):
+        stub = CanvasStub(courses, assignments, latency, quota, refill, cost)
+
+        async def serve():
+            runner = web.AppRunner(stub.app())
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", 0).start()
+            return runner
+
+        runner = asyncio.run_coroutine_threadsafe(serve(), loop).result(10)
+        runners.append(runner)
+        return f"http://127.0.0.1:{runner.addresses[0][1]}", stub
+
+    yield start
+    for runner in runners:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
@@ -0,0 +1,132 @@
+import socket
+import sys
+import time
+
+import pytest
+
+from cache_backends import (
+    CacheBackend,
+    SharedCacheBackend,
+    SharedCacheClient,
+    StripedCacheBackend,
+    TTLCacheBackend,
+    create_backend_factory,
+    default_lock_stripes,
+)
+
+def free_address():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()
+
+@pytest.fixture
+def shared_client():
+    client = SharedCacheClient(free_address(), b"test-key")
+    yield client
+    client.close()
+
+@pytest.fixture(params=["ttl", "striped", "shared"])
+def backend(request):
+    if request.param == "ttl":
+        return TTLCacheBackend(10, 60)
+    if request.param == "striped":
+        return StripedCacheBackend(10, 60, stripes=4)
+    return SharedCacheBackend(request.getfixturevalue("shared_client"), "grades", 10, 60)
+
+def entry(data, expires_in=60.0):
+    now = time.time()
+    return {"data": data, "cached_at": now, "expires_at": now + expires_in}
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend(10, 60)
+
+def test_set_get_pop(backend):
+    backend["grades:u1"] = entry([1, 2])
+
+    assert backend.get("grades:u1")["data"] == [1, 2]
+    assert backend.get("grades:missing", "default") == "default"
+    assert len(backend) == 1
+    assert backend.pop("grades:u1")["data"] == [1, 2]
+    assert backend.get("grades:u1") is None
+    assert len(backend) == 0
+
+def test_entries_expire_at_their_own_expires_at(backend):
+    backend["grades:old"] = entry("old", expires_in=-1)
+    backend["grades:new"] = entry("new")
+
+    assert backend.get("grades:old") is None
+    assert backend.get("grades:new")["data"] == "new"
+
+def test_expiries_reports_only_cached_keys(backend):
+    stored = entry("x")
+    backend["grades:u1"] = stored
+
+    assert backend.expiries(["grades:u1", "grades:u2"]) == {"grades:u1": stored["expires_at"]}
+
+def test_clear(backend):
+    backend["grades:u1"] = entry(1)
+    backend["grades:u2"] = entry(2)
+    backend.clear()
+
+    assert len(backend) == 0
+
+def test_shared_backend_is_visible_to_every_client(shared_client):
+    writer = SharedCacheBackend(shared_client, "grades", 10, 60)
+    other_client = SharedCacheClient(shared_client.address, b"test-key", autostart=False)
+    try:
+        reader = SharedCacheBackend(other_client, "grades", 10, 60)
+        writer["grades:u1"] = {**entry("x"), "json_bytes": b'{"a":1}'}
+
+        assert reader.get("grades:u1")["json_bytes"] == b'{"a":1}'
+        reader.pop("grades:u1")
+        assert writer.get("grades:u1") is None
+    finally:
+        other_client.close()
+
+def test_shared_backend_requires_an_authkey(monkeypatch):
+    monkeypatch.delenv("CACHE_SERVER_AUTHKEY", raising=False)
+
+    with pytest.raises(ValueError, match="CACHE_SERVER_AUTHKEY"):
+        create_backend_factory("shared")
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown CACHE_BACKEND"):
+        create_backend_factory("redis")
+
+def test_striped_backend_shares_one_capacity_across_stripes():
+    backend = StripedCacheBackend(4, 60, stripes=4)
+    for i in range(10):
+        backend[f"grades:u{i}"] = entry(i)
+
+    assert len(backend) == 4
+    # The entry just set is never the one evicted to make room for it
+    assert backend.get("grades:u9")["data"] == 9
+
+def test_striped_byte_budget_counts_every_stripe():
+    backend = StripedCacheBackend(1000, 60, max_bytes=100, stripes=4)
+    for i in range(10):
+        backend[f"grades:u{i}"] = {**entry(i), "size_bytes": 30}
+
+    assert backend.bytes_used <= 100
+    assert backend.get("grades:u9")["data"] == 9
+
+def test_evict_one_never_pops_keep_even_when_it_is_least_recently_used():
+    backend = TTLCacheBackend(3, 60)
+    backend["grades:keep"] = entry("keep")
+    backend["grades:a"] = entry("a")
+    backend["grades:b"] = entry("b")
+    # Other readers touched every other key after keep was set
+    backend.get("grades:a")
+    backend.get("grades:b")
+
+    assert backend.evict_one("grades:keep")
+    assert backend.get("grades:keep")["data"] == "keep"
+    assert backend.get("grades:a") is None
+    assert len(backend) == 2
+
+def test_single_lock_under_the_gil(monkeypatch):
+    monkeypatch.setattr(sys, "_is_gil_enabled", lambda: True, raising=False)
+    assert default_lock_stripes() == 1
+    monkeypatch.setattr(sys, "_is_gil_enabled", lambda: False, raising=False)
+    assert default_lock_stripes() == 16
@@ -0,0 +1,346 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+import cache_manager
+from cache_backends import SQLiteL2Store
+from cache_manager import CachePolicy, PerformanceCache, decode_json, encode_json, load_policies, resolve_codec
+
+def test_concurrent_misses_share_one_load():
+    cache = PerformanceCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [{"id": 1}]
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load_entry("u1", "grades", loader) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["coalesced"] * 4 + ["database"]
+    assert all(entry["data"] == [{"id": 1}] for entry, _ in results)
+    assert cache.coalesced_counts.snapshot()["grades"] == 4
+    assert cache.get("u1", "grades")["data"] == [{"id": 1}]
+
+def test_cancelled_caller_does_not_abort_the_shared_load():
+    cache = PerformanceCache()
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        return [{"id": 2}]
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_load_entry("u1", "courses", loader))
+        second = asyncio.ensure_future(cache.get_or_load_entry("u1", "courses", loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    entry, source = asyncio.run(main())
+
+    assert source == "coalesced"
+    assert entry["data"] == [{"id": 2}]
+    assert cache.get("u1", "courses")["data"] == [{"id": 2}]
+
+def test_entry_past_refresh_threshold_is_served_and_refreshed_in_background():
+    cache = PerformanceCache(policies={"grades": CachePolicy(ttl=10, max_size=10, refresh_threshold=0.01)})
+    versions = iter(["v2", "v3"])
+
+    async def loader(user_id):
+        return next(versions)
+
+    cache.register_loader("grades", loader)
+    cache.set("u1", "grades", "v1")
+
+    async def main():
+        await asyncio.sleep(0.15)
+        served = cache.get("u1", "grades")["data"]
+        assert list(cache.refresh_tasks) == ["grades:u1"]
+        # A second hit while the refresh runs does not start another one
+        cache.get("u1", "grades")
+        await asyncio.gather(*cache.refresh_tasks.values())
+        return served
+
+    assert asyncio.run(main()) == "v1"
+    assert cache.get("u1", "grades")["data"] == "v2"
+    stats = cache.refresh_stats.snapshot()
+    assert (stats["scheduled"], stats["completed"]) == (1, 1)
+
+def test_fresh_entry_does_not_trigger_a_refresh():
+    cache = PerformanceCache()
+
+    async def loader(user_id):
+        raise AssertionError("refreshed a fresh entry")
+
+    cache.register_loader("grades", loader)
+    cache.set("u1", "grades", "v1")
+
+    async def main():
+        cache.get("u1", "grades")
+        return dict(cache.refresh_tasks)
+
+    assert asyncio.run(main()) == {}
+
+def restarted_cache(path, **kwargs):
+    """A fresh cache (empty L1) over the L2 file a previous instance wrote"""
+    return PerformanceCache(l2_store=SQLiteL2Store(str(path)), **kwargs)
+
+def test_l1_miss_is_promoted_from_l2(tmp_path):
+    path = tmp_path / "l2.db"
+    first = restarted_cache(path, store_json=True)
+    first.set("u1", "grades", [{"id": 1}])
+    cached_at = first.get("u1", "grades")["cached_at"]
+    first.l2_store.close()
+
+    cache = restarted_cache(path, store_json=True)
+    promoted = cache.get("u1", "grades")
+    assert promoted["data"] == [{"id": 1}]
+    assert promoted["cached_at"] == cached_at
+    assert promoted["json_bytes"] == b'[{"id":1}]'
+
+    # Now served from L1 - L2 is not read again
+    cache.get("u1", "grades")
+    assert cache.l2_hit_counts.snapshot()["grades"] == 1
+    assert cache.get("u2", "grades") is None
+    assert cache.l2_miss_counts.snapshot()["grades"] == 1
+    cache.l2_store.close()
+
+def test_warm_from_l2_skips_expired_entries(tmp_path):
+    path = tmp_path / "l2.db"
+    first = restarted_cache(path)
+    first.set("u1", "courses", ["live"])
+    first.set("u2", "courses", ["expired"])
+    first.l2_store.put("courses:u2", "courses", {**first.get("u2", "courses"), "expires_at": time.time() - 1}, 0)
+    first.l2_store.close()
+
+    cache = restarted_cache(path)
+    assert cache.warm_from_l2() == 1
+    assert cache.courses_cache.get("courses:u1")["data"] == ["live"]
+    assert cache.courses_cache.get("courses:u2") is None
+    cache.l2_store.close()
+
+def test_byte_budget_evicts_least_recently_used_entries():
+    cache = PerformanceCache(policies={"grades": CachePolicy(ttl=60, max_size=1000, max_bytes=100)})
+    payload = "x" * 30  # 32 bytes as JSON
+
+    for user_id in ("u1", "u2", "u3"):
+        assert cache.set(user_id, "grades", payload)
+    cache.get("u1", "grades")  # u2 is now least recently used
+    assert cache.set("u4", "grades", payload)
+
+    assert cache.grades_cache.bytes_used <= 100
+    assert cache.grades_cache.get("grades:u2") is None
+    assert all(cache.grades_cache.get(f"grades:{u}") for u in ("u1", "u3", "u4"))
+
+def test_entry_larger_than_the_byte_budget_is_not_cached():
+    cache = PerformanceCache(policies={"grades": CachePolicy(ttl=60, max_size=1000, max_bytes=100)})
+    cache.set("u1", "grades", "small")
+
+    assert not cache.set("u2", "grades", "x" * 200)
+    assert cache.get("u1", "grades")["data"] == "small"
+    assert cache.get_stats()["cache_bytes"]["grades"] == cache.grades_cache.bytes_used
+
+def test_sizes_are_not_estimated_without_a_byte_budget():
+    cache = PerformanceCache()
+    cache.set("u1", "grades", [1, 2, 3])
+
+    assert "size_bytes" not in cache.grades_cache.get("grades:u1")
+    assert cache.get_stats()["cache_bytes"]["grades"] is None
+
+def test_store_json_keeps_encoded_bytes_for_hits():
+    cache = PerformanceCache(store_json=True)
+    rows = [{"id": 1, "name": "Área 51", "due_at": datetime(2026, 1, 2, 3, 4)}]
+    cache.set("u1", "assignments", rows)
+
+    entry = cache.get("u1", "assignments")
+    assert decode_json(entry["json_bytes"]) == [{"id": 1, "name": "Área 51", "due_at": "2026-01-02T03:04:00"}]
+    assert entry["size_bytes"] == len(entry["json_bytes"])
+
+def test_stdlib_encoder_matches_orjson(monkeypatch):
+    rows = [{"id": 1, "name": "Área 51", "due_at": datetime(2026, 1, 2, 3, 4)}]
+    monkeypatch.setattr(cache_manager, "orjson", None)
+
+    assert json.loads(encode_json(rows)) == [{"id": 1, "name": "Área 51", "due_at": "2026-01-02T03:04:00"}]
+
+def test_json_bytes_are_not_kept_unless_store_json_is_on():
+    cache = PerformanceCache()
+    cache.set("u1", "assignments", [{"id": 1}])
+
+    assert "json_bytes" not in cache.get("u1", "assignments")
+
+def compressed_cache(**kwargs):
+    policy = CachePolicy(ttl=60, max_size=10, compression="zlib", stale_ttl=30)
+    return PerformanceCache(policies={"assignments": policy}, compression_threshold=100, **kwargs)
+
+def test_large_entries_are_compressed_and_round_trip():
+    cache = compressed_cache(store_json=True)
+    rows = [{"id": i, "course_name": "Introduction to Biology", "course_code": "BIO-101"} for i in range(50)]
+    cache.set("u1", "assignments", rows)
+
+    stored = cache.assignments_cache.get("assignments:u1")
+    assert stored["codec"] == "zlib" and "data" not in stored
+    assert "stale_until" in stored
+
+    entry = cache.get("u1", "assignments")
+    assert entry["data"] == rows
+    assert decode_json(entry["json_bytes"]) == rows
+    summary = cache.get_stats()["compression_stats"]["assignments"]
+    assert summary["entries"] == 1
+    assert summary["ratio"] > 1
+
+def test_small_entries_are_stored_uncompressed():
+    cache = compressed_cache()
+    cache.set("u1", "assignments", [{"id": 1}])
+
+    stored = cache.assignments_cache.get("assignments:u1")
+    assert "compressed" not in stored and "json_bytes" not in stored
+    assert cache.get("u1", "assignments")["data"] == [{"id": 1}]
+
+def test_lz4_falls_back_to_zlib_when_not_installed(monkeypatch):
+    monkeypatch.setattr(cache_manager, "lz4_frame", None)
+
+    assert resolve_codec("LZ4") == "zlib"
+    with pytest.raises(ValueError, match="brotli"):
+        resolve_codec("brotli")
+
+def write_policy_file(tmp_path, policies):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps(policies))
+    return str(path)
+
+def test_load_policies_applies_file_then_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_JITTER_GRADES", "0.3")
+    policies = load_policies(write_policy_file(tmp_path, {"grades": {"ttl": 120, "jitter": 0.2}}))
+
+    assert (policies["grades"].ttl, policies["grades"].jitter) == (120, 0.3)
+    assert policies["courses"].ttl == 1800
+
+def test_load_policies_names_an_unknown_data_type(tmp_path):
+    with pytest.raises(ValueError, match="unknown cache data type 'grade'"):
+        load_policies(write_policy_file(tmp_path, {"grade": {"ttl": 120}}))
+
+def test_load_policies_names_an_unknown_field(tmp_path):
+    with pytest.raises(ValueError, match="unknown grades policy field.*: tll"):
+        load_policies(write_policy_file(tmp_path, {"grades": {"tll": 120}}))
+
+def test_load_policies_names_a_bad_environment_value(monkeypatch):
+    monkeypatch.setenv("CACHE_MAX_SIZE_COURSES", "lots")
+
+    with pytest.raises(ValueError, match="CACHE_MAX_SIZE_COURSES"):
+        load_policies()
+
+def test_load_policies_names_the_type_of_an_invalid_policy(tmp_path):
+    with pytest.raises(ValueError, match="Invalid assignments cache policy: jitter"):
+        load_policies(write_policy_file(tmp_path, {"assignments": {"jitter": 2}}))
+
+def test_update_policy_only_changes_runtime_fields():
+    cache = PerformanceCache()
+
+    assert cache.update_policy("grades", ttl=60).ttl == 60
+    with pytest.raises(ValueError, match="max_size"):
+        cache.update_policy("grades", max_size=5)
+    with pytest.raises(ValueError, match="refresh_threshold"):
+        cache.update_policy("grades", refresh_threshold=0)
+
+def test_compressed_tokens_are_cached():
+    policy = CachePolicy(ttl=60, max_size=10, compression="zlib")
+    cache = PerformanceCache(policies={"tokens": policy}, compression_threshold=10)
+    cache.set("u1", "tokens", {"token": "x" * 100})
+
+    assert cache.user_tokens_cache.get("tokens:u1")["codec"] == "zlib"
+    assert cache.get("u1", "tokens")["data"] == {"token": "x" * 100}
+
+def test_course_tag_invalidates_every_user_and_type_mentioning_it():
+    cache = PerformanceCache()
+    cache.set("u1", "courses", [{"id": 42}, {"id": 7}])
+    cache.set("u1", "assignments", [{"id": 1, "course_id": 42}])
+    cache.set("u2", "grades", [{"id": 2, "course_id": 42}])
+    cache.set("u3", "grades", [{"id": 3, "course_id": 7}])
+
+    assert cache.invalidate_tags(["course:42"]) == 3
+    assert cache.get("u1", "courses") is None
+    assert cache.get("u1", "assignments") is None
+    assert cache.get("u2", "grades") is None
+    assert cache.get("u3", "grades")["data"] == [{"id": 3, "course_id": 7}]
+
+def test_user_course_invalidation_keeps_other_users():
+    cache = PerformanceCache()
+    cache.set("u1", "grades", [{"course_id": 42}])
+    cache.set("u2", "grades", [{"course_id": 42}])
+
+    assert cache.invalidate("u1", course_id=42) == 1
+    assert cache.get("u1", "grades") is None
+    assert cache.get("u2", "grades") is not None
+
+def test_custom_tags_can_be_limited_to_one_type():
+    cache = PerformanceCache()
+    cache.set("u1", "grades", [], tags=["term:2026"])
+    cache.set("u1", "courses", [], tags=["term:2026"])
+
+    assert cache.invalidate_tags(["term:2026"], data_type="grades") == 1
+    assert cache.get("u1", "courses") is not None
+    with pytest.raises(ValueError):
+        cache.invalidate_tags([])
+
+def test_tag_invalidation_reaches_l2(tmp_path):
+    path = tmp_path / "l2.db"
+    cache = restarted_cache(path)
+    cache.set("u1", "grades", [{"course_id": 42}])
+    cache.invalidate_tags(["course:42"])
+    cache.l2_store.close()
+
+    restarted = restarted_cache(path)
+    assert restarted.get("u1", "grades") is None
+    restarted.l2_store.close()
+
+def test_expired_entries_are_not_kept_stale_by_default():
+    assert all(policy.stale_ttl == 0 for policy in PerformanceCache().policies.values())
+    cache = PerformanceCache(policies={"grades": CachePolicy(ttl=0.05, max_size=10)})
+    cache.set("u1", "grades", [{"id": 1}])
+    time.sleep(0.1)
+
+    assert cache.get_stale_entry("u1", "grades") is None
+
+def test_stale_entry_outlives_expiry_until_stale_until():
+    cache = PerformanceCache(policies={"grades": CachePolicy(ttl=0.05, max_size=10, stale_ttl=0.2)})
+    cache.set("u1", "grades", [{"id": 1}])
+    time.sleep(0.1)
+
+    # Expired for readers (a miss), still there as a fallback
+    assert cache.get("u1", "grades") is None
+    stale = cache.get_stale_entry("u1", "grades")
+    assert stale["data"] == [{"id": 1}]
+    assert stale["stale_until"] == pytest.approx(stale["expires_at"] + 0.2)
+
+    time.sleep(0.2)
+    assert cache.get_stale_entry("u1", "grades") is None
+
+def test_stale_entries_count_against_the_size_budget_and_invalidation():
+    cache = PerformanceCache(policies={"grades": CachePolicy(ttl=0.05, max_size=2, stale_ttl=60)})
+    cache.set("u1", "grades", ["old"])
+    cache.set("u2", "grades", ["old"])
+    time.sleep(0.1)
+
+    cache.set("u3", "grades", ["new"])
+
+    # The least recently used stale entry made room for the new one
+    assert cache.get_stale_entry("u1", "grades") is None
+    assert cache.get_stale_entry("u2", "grades")["data"] == ["old"]
+    cache.invalidate("u2")
+    assert cache.get_stale_entry("u2", "grades") is None
+
+def test_stale_ttl_is_opted_into_per_type(tmp_path, monkeypatch):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"courses": {"stale_ttl": 600}}))
+    monkeypatch.setenv("CACHE_STALE_TTL_GRADES", "120")
+
+    policies = load_policies(str(path))
+
+    assert (policies["grades"].stale_ttl, policies["courses"].stale_ttl, policies["assignments"].stale_ttl) == (120, 600, 0)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+from cache_manager import CachePolicy, PerformanceCache
+from cache_warmer import CacheWarmer
+
+def warm_cache(ttl=100):
+    """Cache without jitter, with a loader for grades and courses only"""
+    cache = PerformanceCache(policies={
+        data_type: CachePolicy(ttl=ttl, max_size=100) for data_type in ("grades", "courses", "assignments")
+    })
+
+    async def loader(user_id):
+        return [{"user": user_id, "loaded_at": time.time()}]
+
+    cache.register_loader("grades", loader)
+    cache.register_loader("courses", loader)
+    return cache
+
+def test_due_keys_lists_missing_and_expiring_entries_soonest_first():
+    cache = warm_cache(ttl=100)
+    warmer = CacheWarmer(cache, interval=10, budget=5)
+    now = time.time()
+    cache.set("fresh", "grades", [1])
+    cache.set("fresh", "courses", [1])
+    cache.set("cached", "grades", [1])
+
+    due = warmer.due_keys(["fresh", "cached", "cold"], now)
+
+    # Only missing entries (expiry 0); assignments have no loader and are never due
+    assert [(user_id, data_type, expires_at) for user_id, data_type, expires_at in due] == [
+        ("cold", "grades", 0.0), ("cached", "courses", 0.0), ("cold", "courses", 0.0)
+    ]
+    # Everything expiring before the next cycle ends (interval + budget) is due
+    later = warmer.due_keys(["fresh", "cached", "cold"], now + 90)
+    assert {(user_id, data_type) for user_id, data_type, _ in later} == {
+        ("fresh", "grades"), ("fresh", "courses"), ("cached", "grades"),
+        ("cached", "courses"), ("cold", "grades"), ("cold", "courses")
+    }
+    assert [expires_at for _, _, expires_at in later][:3] == [0.0, 0.0, 0.0]
+    assert [expires_at for _, _, expires_at in later] == sorted(expires_at for _, _, expires_at in later)
+
+def test_active_drops_users_idle_past_the_window():
+    warmer = CacheWarmer(warm_cache(), active_window=60)
+    warmer.record_access("old", "grades")
+    warmer.record_access("recent", "grades")
+    warmer.active_users["old"] -= 120
+
+    assert warmer.active() == ["recent"]
+    assert "old" not in warmer.active_users
+
+def test_cycle_warms_active_users_and_scores_prevented_misses():
+    cache = warm_cache()
+    warmer = CacheWarmer(cache, interval=10, budget=5)
+
+    async def main():
+        warmer.record_access("u1", "grades")
+        first = await warmer.run_cycle()
+        entry = cache.get("u1", "grades")
+        warmer.record_access("u1", "grades", entry, "memory_cache")
+        # Each warmed key is scored once, and only when served from memory
+        warmer.record_access("u1", "grades", entry, "memory_cache")
+        warmer.record_access("u1", "courses", cache.get("u1", "courses"), "database")
+        second = await warmer.run_cycle()
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert (first["due"], first["warmed"], first["failed"]) == (2, 2, 0)
+    # The cold keys would have missed - the reads hit the warmed entries
+    assert (second["reads"], second["prevented_misses"]) == (3, 1)
+    assert second["prevented_miss_rate"] == "33.3%"
+    assert second["due"] == 0
+    assert warmer.totals["prevented_misses"] == 1
+
+def test_read_before_the_replaced_entry_expires_is_not_a_prevented_miss():
+    cache = warm_cache(ttl=0.2)
+    warmer = CacheWarmer(cache, interval=10, budget=5)
+    cache.set("u1", "grades", ["old"])
+    cache.update_policy("grades", ttl=100)
+
+    async def main():
+        warmer.record_access("u1", "grades")
+        await warmer.run_cycle()
+        warmer.record_access("u1", "grades", cache.get("u1", "grades"), "memory_cache")
+        early = warmer._prevented
+        await asyncio.sleep(0.25)
+        warmer.record_access("u1", "grades", cache.get("u1", "grades"), "memory_cache")
+        return early, warmer._prevented
+
+    early, late = asyncio.run(main())
+
+    # The old entry would still have served the first read
+    assert (early, late) == (0, 1)
+
+def test_failing_loader_is_counted_and_skipped_keys_are_reported():
+    cache = warm_cache()
+
+    async def failing(user_id):
+        raise RuntimeError("database down")
+
+    async def slow(user_id):
+        await asyncio.sleep(1)
+        return []
+
+    cache.register_loader("grades", failing)
+    cache.register_loader("courses", slow)
+    warmer = CacheWarmer(cache, interval=10, budget=0.05)
+
+    async def main():
+        warmer.record_access("u1", "grades")
+        return await warmer.run_cycle()
+
+    report = asyncio.run(main())
+
+    assert (report["due"], report["warmed"], report["failed"], report["skipped"]) == (2, 0, 1, 1)
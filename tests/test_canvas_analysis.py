@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from analysis_benchmark import loop_analysis, synthetic_data
+from canvas_analysis import analyze_vectorized, parse_due_dates, parse_one
+from canvas_fetcher import RunningAnalysis
+
+NAIVE_NOW = datetime(2024, 3, 1, 12, 0, 0)
+NOWS = {
+    "naive": NAIVE_NOW,
+    "utc": NAIVE_NOW.replace(tzinfo=timezone.utc),
+    "offset": NAIVE_NOW.replace(tzinfo=timezone(timedelta(hours=-5)))
+}
+
+def edge_assignments():
+    """Every due date shape the loop treats differently, around 2024-03-01 12:00"""
+    due_dates = [
+        "2024-03-02T00:00:00Z",         # canonical UTC
+        "2024-03-02T00:00:00",          # naive
+        "2024-02-28T23:59:59Z",         # past, UTC
+        "2024-02-28T23:59:59",          # past, naive
+        "2024-03-01T12:00:00Z",         # exactly now (UTC)
+        "2024-03-01T17:00:00Z",         # exactly now at -05:00
+        "2024-03-08T12:00:00Z",         # exactly a week ahead (UTC)
+        "2024-03-08T12:00:01Z",         # just past a week ahead
+        "2024-03-03T09:30:00-05:00",    # offset
+        "2024-03-03T09:30:00.250000Z",  # fractional seconds
+        "2024-03-03",                   # date only (naive midnight)
+        "2024-02-29T10:00:00Z",         # leap day
+        "2023-02-29T10:00:00Z",         # not a leap year
+        "2024-13-01T00:00:00Z",
+        "not a date",
+        "",
+        None
+    ]
+    assignments = []
+    for due_at in due_dates:
+        for submitted in (None, "2024-02-01T00:00:00Z"):
+            assignments.append({"id": len(assignments), "due_at": due_at, "submission": {"submitted_at": submitted}})
+    assignments.append({"id": len(assignments), "due_at": "2024-03-02T00:00:00Z"})  # no submission at all
+    return assignments
+
+@pytest.mark.parametrize("label", list(NOWS))
+def test_engines_agree_on_mixed_timestamps(label):
+    now = NOWS[label]
+    assignments, submissions = synthetic_data(5000, 7, now)
+
+    assert analyze_vectorized(assignments, submissions, now) == loop_analysis(assignments, submissions, now)
+
+@pytest.mark.parametrize("label", list(NOWS))
+def test_engines_agree_on_edge_case_due_dates(label):
+    now = NOWS[label]
+    assignments = edge_assignments()
+    submissions = [
+        {"id": 1, "score": 0.1, "assignment": {"points_possible": 0.3}},
+        {"id": 2, "score": None, "assignment": {"points_possible": 0}},
+        {"id": 3, "score": 7, "assignment": None},
+        {"id": 4}
+    ]
+
+    # Limits above the row count, so every binned assignment is compared
+    running = RunningAnalysis(now, upcoming_limit=100, overdue_limit=100)
+    running.add_assignments(assignments)
+    running.add_submissions(submissions)
+
+    assert analyze_vectorized(assignments, submissions, now, upcoming_limit=100, overdue_limit=100) == running.result()
+
+def test_bulk_parse_matches_row_by_row_parse():
+    values = [a["due_at"] for a in edge_assignments()]
+
+    kinds, stamps = parse_due_dates(values)
+
+    assert [(int(kind), int(stamp)) for kind, stamp in zip(kinds, stamps.view("int64"))] == \
+        [parse_one(value) for value in values]
+
+def test_aware_due_dates_are_compared_in_utc():
+    now = datetime(2024, 3, 1, 7, 0, 0, tzinfo=timezone(timedelta(hours=-5)))  # 12:00 UTC
+    assignments = [
+        {"id": 1, "due_at": "2024-03-01T11:59:59Z"},
+        {"id": 2, "due_at": "2024-03-01T07:00:01-05:00"}
+    ]
+
+    analysis = analyze_vectorized(assignments, [], now)
+
+    assert analysis["assignments"]["overdue"] == 1
+    assert analysis["assignments"]["upcoming"] == 1
+    assert analysis == loop_analysis(assignments, [], now)
@@ -0,0 +1,47 @@
+import pytest
+
+from canvas_batch import output_name, read_accounts
+
+def test_read_accounts_skips_header_comments_and_blank_lines(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text(
+        "canvas_url,token,user_id\n"
+        "# staging accounts\n"
+        "\n"
+        "https://school.instructure.com/, tok1 ,alice\n"
+        "https://other.instructure.com,tok2,bob\n",
+        encoding="utf-8",
+    )
+
+    assert read_accounts(str(path)) == [
+        {"canvas_url": "https://school.instructure.com", "token": "tok1", "user_id": "alice"},
+        {"canvas_url": "https://other.instructure.com", "token": "tok2", "user_id": "bob"},
+    ]
+
+def test_read_accounts_reports_the_malformed_line(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text("https://school.instructure.com,tok1,alice\nhttps://school.instructure.com,tok2\n")
+
+    with pytest.raises(ValueError, match=r"accounts\.csv:2:"):
+        read_accounts(str(path))
+
+def test_read_accounts_rejects_user_ids_sharing_an_output_file(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text(
+        "https://school.instructure.com,tok1,alice\n"
+        "https://other.instructure.com,tok2,bob\n"
+        "https://other.instructure.com,tok3,alice\n"
+    )
+
+    with pytest.raises(ValueError, match=r"accounts\.csv:3: .*line 1"):
+        read_accounts(str(path))
+
+    path.write_text("https://school.instructure.com,tok1,a@b\nhttps://school.instructure.com,tok2,a_b\n")
+
+    with pytest.raises(ValueError, match=r"accounts\.csv:2: .*a_b\.json"):
+        read_accounts(str(path))
+
+def test_output_name_is_file_name_safe():
+    assert output_name("alice@school.edu") == "alice_school.edu"
+    assert output_name("../x:y") == ".._x_y"
+    assert output_name("") == "account"
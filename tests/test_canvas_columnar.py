@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from canvas_columnar import CcolTable, ColumnarWriter, read_columns
+
+def write_export(directory):
+    writer = ColumnarWriter(str(directory), use_parquet=False)
+    writer.write("course", [
+        {"id": 1, "name": "Biology", "course_code": "BIO", "start_at": "2024-01-01T00:00:00Z"},
+        {"id": 2, "name": None},
+    ])
+    writer.write("submission", [
+        {"id": 5, "course_id": 1, "course_name": "Biology", "score": 3.5, "late": True, "workflow_state": "graded"},
+        {"id": 6, "course_id": 1, "course_name": "Biology"},
+    ])
+    writer.close()
+
+def test_ccol_round_trip_keeps_values_and_missing_ones(tmp_path):
+    write_export(tmp_path)
+
+    courses = read_columns(str(tmp_path), "courses")
+    assert courses["id"] == [1, 2]
+    assert courses["name"] == ["Biology", None]
+    assert courses["start_at"] == [1704067200000000, None]
+
+    submissions = read_columns(str(tmp_path), "submissions", ["score", "late", "course_name", "workflow_state"])
+    assert submissions == {
+        "score": [3.5, None],
+        "late": [True, None],
+        "course_name": ["Biology", "Biology"],
+        "workflow_state": ["graded", None],
+    }
+
+def test_close_releases_raw_views_still_held(tmp_path):
+    write_export(tmp_path)
+
+    with CcolTable(os.path.join(str(tmp_path), "courses.ccol")) as table:
+        ids = table.raw("id")
+        assert ids.tolist() == [1, 2]
+    # close() succeeded with the view alive; the view is released with the mapping
+    assert table._map.closed
+
+def test_unconvertible_values_are_stored_as_missing(tmp_path):
+    writer = ColumnarWriter(str(tmp_path), use_parquet=False)
+    writer.write("submission", [
+        {"id": "N/A", "course_id": "x", "score": "excused", "assignment": {"points_possible": [10]}},
+        {"id": 7, "course_id": "3", "score": "9.5", "assignment": {"points_possible": 10}},
+    ])
+    writer.close()
+
+    submissions = read_columns(str(tmp_path), "submissions", ["id", "course_id", "score", "points_possible"])
+    assert submissions == {
+        "id": [None, 7],
+        "course_id": [None, 3],
+        "score": [None, 9.5],
+        "points_possible": [None, 10.0],
+    }
+
+def test_parquet_and_ccol_exports_read_back_the_same(tmp_path):
+    pytest.importorskip("pyarrow")
+    write_export(tmp_path / "ccol")
+    writer = ColumnarWriter(str(tmp_path / "parquet"), use_parquet=True)
+    writer.write("course", [
+        {"id": 1, "name": "Biology", "course_code": "BIO", "start_at": "2024-01-01T00:00:00Z"},
+        {"id": 2, "name": None},
+    ])
+    writer.write("submission", [
+        {"id": 5, "course_id": 1, "course_name": "Biology", "score": 3.5, "late": True, "workflow_state": "graded"},
+        {"id": 6, "course_id": 1, "course_name": "Biology"},
+    ])
+    writer.close()
+
+    for table in ("courses", "submissions"):
+        assert read_columns(str(tmp_path / "parquet"), table) == read_columns(str(tmp_path / "ccol"), table)
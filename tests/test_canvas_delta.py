@@ -0,0 +1,47 @@
+from canvas_delta import keep_records, merge_records, new_counts
+from canvas_fetcher import CanvasDataFetcher, SyncState
+
+def test_complete_fetch_replaces_previous_records():
+    previous = {"1": {"id": 1, "score": 5}, "2": {"id": 2, "score": 7}}
+    counts = new_counts()
+
+    merged = merge_records(previous, [{"id": 1, "score": 6}, {"id": 3, "score": 1}], True, counts)
+
+    assert merged == {"1": {"id": 1, "score": 6}, "3": {"id": 3, "score": 1}}
+    assert counts == {"new": 1, "updated": 1, "unchanged": 0, "stale": 0}
+
+def test_delta_fetch_overlays_changes_and_keeps_the_rest():
+    previous = {"1": {"id": 1, "score": 5}, "2": {"id": 2, "score": 7}}
+    counts = new_counts()
+
+    merged = merge_records(previous, [{"id": 2, "score": 7}, {"id": 4, "score": 9}], False, counts)
+
+    assert set(merged) == {"1", "2", "4"}
+    assert counts == {"new": 1, "updated": 0, "unchanged": 2, "stale": 0}
+
+def test_failed_fetch_keeps_previous_records_as_stale():
+    previous = {"1": {"id": 1}}
+    counts = new_counts()
+
+    kept = keep_records(previous, counts)
+
+    assert kept == previous and kept is not previous
+    assert counts == {"new": 0, "updated": 0, "unchanged": 0, "stale": 1}
+
+def test_fetcher_counts_records_of_a_failed_endpoint_as_stale(tmp_path):
+    path = str(tmp_path / "state.json")
+    courses = [{"id": 1}, {"id": 2}]
+    assignments = [{"id": 10, "course_id": 1}, {"id": 20, "course_id": 2}]
+
+    first = CanvasDataFetcher("https://canvas.test", "tok", verbose=False, sync_state=SyncState(path))
+    first.apply_delta(courses, assignments, [{"id": 11, "course_id": 1}, {"id": 21, "course_id": 2}])
+
+    state = SyncState(path)
+    second = CanvasDataFetcher("https://canvas.test", "tok", verbose=False, sync_state=state)
+    second.failed_endpoints.add("/api/v1/courses/2/students/self/submissions")
+    _, submissions = second.apply_delta(courses, assignments, [{"id": 11, "course_id": 1}])
+
+    assert sorted(s["id"] for s in submissions) == [11, 21]
+    assert state.counts["submissions"] == {"new": 0, "updated": 0, "unchanged": 1, "stale": 1}
+    # The failed course keeps its old cursor, so the next run retries from there
+    assert state.cursor(2, "submissions") == first.sync_started
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from canvas_fetcher import AsyncCanvasDataFetcher, CanvasDataFetcher, FetchCheckpoint
+
+def token():
+    """A fresh token per test, so no test shares another's rate limiter"""
+    return f"test-{uuid.uuid4().hex}"
+
+def test_make_request_follows_link_headers(canvas_stub):
+    url, stub = canvas_stub(assignments=25)
+    fetcher = CanvasDataFetcher(url, token(), verbose=False)
+
+    records = fetcher.make_request("/api/v1/courses/1/assignments", {"per_page": 10})
+
+    assert [r["id"] for r in records] == [10000 + a for a in range(25)]
+    assert fetcher.stats["api_calls"] == 3
+
+def test_iter_pages_with_and_without_prefetch_match(canvas_stub):
+    url, stub = canvas_stub(assignments=25)
+    fetcher = CanvasDataFetcher(url, token(), verbose=False)
+
+    prefetched = list(fetcher.iter_pages("/api/v1/courses/2/assignments", {"per_page": 10}))
+    sequential = list(fetcher.iter_pages("/api/v1/courses/2/assignments", {"per_page": 10}, prefetch=False))
+
+    assert [len(page) for page in prefetched] == [10, 10, 5]
+    assert prefetched == sequential
+
+def test_async_pages_arrive_in_order(canvas_stub):
+    url, stub = canvas_stub(assignments=25)
+    fetcher = AsyncCanvasDataFetcher(url, token(), verbose=False, concurrency=4, rate=1000)
+
+    async def fetch():
+        async with fetcher.session_scope():
+            return await fetcher.fetch_pages_async("/api/v1/courses/3/assignments", {"per_page": 10})
+
+    pages = asyncio.run(fetch())
+
+    assert [r["id"] for page in pages for r in page] == [30000 + a for a in range(25)]
+
+def test_sync_and_async_fetchers_return_the_same_data(canvas_stub):
+    url, stub = canvas_stub(courses=3, assignments=25)
+
+    sequential = CanvasDataFetcher(url, token(), verbose=False).fetch_all_data()
+    concurrent = AsyncCanvasDataFetcher(url, token(), verbose=False, concurrency=4, rate=1000).fetch_all_data()
+
+    assert len(sequential["data"]["assignments"]) == 75
+    assert sequential["data"] == concurrent["data"]
+    assert sequential["analysis"] == concurrent["analysis"]
+
+class FailingCourse(dict):
+    """Stub rows whose lookup for one course raises, so the stub answers 500 for it"""
+
+    def __init__(self, rows, course_id):
+        super().__init__(rows)
+        self.course_id = course_id
+
+    def get(self, course_id, default=None):
+        if course_id == self.course_id:
+            raise RuntimeError("simulated Canvas outage")
+        return super().get(course_id, default)
+
+@pytest.mark.parametrize("fetcher_class", [CanvasDataFetcher, AsyncCanvasDataFetcher])
+def test_resume_fetches_only_the_units_that_failed(canvas_stub, tmp_path, fetcher_class):
+    url, stub = canvas_stub(courses=3, assignments=25)
+    api_token = token()
+    path = str(tmp_path / "run.checkpoint.jsonl")
+    expected = CanvasDataFetcher(url, token(), verbose=False).fetch_all_data()
+
+    submissions = stub.submissions
+    stub.submissions = FailingCourse(submissions, 2)
+    interrupted = fetcher_class(url, api_token, verbose=False, checkpoint=FetchCheckpoint(path, url, api_token))
+    first = interrupted.fetch_all_data()
+
+    assert interrupted.failed_endpoints == {"/api/v1/courses/2/students/self/submissions"}
+    assert len(first["data"]["submissions"]) < len(expected["data"]["submissions"])
+    kept = FetchCheckpoint(path, url, api_token, resume=True)
+    assert kept.resumed and kept.get("submissions", 2) is None and kept.get("assignments", 2) is not None
+    kept.close()
+
+    stub.submissions = submissions
+    requests_before = stub.stats["requests"]
+    checkpoint = FetchCheckpoint(path, url, api_token, resume=True)
+    resumed = fetcher_class(url, api_token, verbose=False, checkpoint=checkpoint)
+    second = resumed.fetch_all_data()
+
+    assert stub.stats["requests"] - requests_before == 1
+    assert second["data"] == expected["data"]
+    assert second["analysis"] == expected["analysis"]
+    assert not os.path.exists(path)
+
+def test_resume_ignores_a_journal_of_another_token(tmp_path):
+    path = str(tmp_path / "run.checkpoint.jsonl")
+    first = FetchCheckpoint(path, "https://canvas.test", "tok-a")
+    first.record("courses", None, [{"id": 1}])
+    first.close()
+
+    other = FetchCheckpoint(path, "https://canvas.test", "tok-b", resume=True)
+    other.close()
+
+    assert not other.resumed and other.get("courses") is None
+
+def test_resume_drops_a_torn_last_line(tmp_path):
+    path = str(tmp_path / "run.checkpoint.jsonl")
+    first = FetchCheckpoint(path, "https://canvas.test", "tok")
+    first.record("courses", None, [{"id": 1}])
+    first.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "unit", "unit": "assignments:1", "rec')
+
+    resumed = FetchCheckpoint(path, "https://canvas.test", "tok", resume=True)
+    resumed.record("assignments", 1, [{"id": 10}])
+    resumed.close()
+
+    again = FetchCheckpoint(path, "https://canvas.test", "tok", resume=True)
+    again.close()
+    assert again.get("courses") == [{"id": 1}]
+    assert again.get("assignments", 1) == [{"id": 10}]
@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+
+import aiohttp
+
+import main
+from cache_manager import PerformanceCache
+from canvas_sync import CanvasDeltaSync, SyncStateStore, normalize_snapshot
+
+def test_normalize_snapshot_links_grades_to_assignments_and_courses():
+    result = {
+        "courses": [{"id": 10, "name": "Biology", "course_code": "BIO"}],
+        "assignments": [{"id": 100, "name": "Lab 1", "due_at": None, "course_id": 10, "points_possible": 20}],
+        "submissions": [
+            {"id": 1000, "assignment_id": 100, "course_id": 10, "score": 18, "graded_at": "2024-01-01"},
+            {"id": 1001, "assignment": {"id": 100, "points_possible": 20}, "course_id": 10, "score": 15},
+            {"id": 100, "course_id": 10, "score": 3}
+        ]
+    }
+
+    snapshot = normalize_snapshot(result)
+
+    assert snapshot["courses"] == [{"id": 10, "name": "Biology", "code": "BIO"}]
+    linked, nested, unlinked = snapshot["grades"]
+    assert (linked["assignment"], linked["course"], linked["assignment_id"]) == ("Lab 1", "Biology", 100)
+    assert (nested["assignment"], nested["assignment_id"], nested["points_possible"]) == ("Lab 1", 100, 20)
+    # A submission id that happens to equal an assignment id is not a link
+    assert (unlinked["assignment"], unlinked["assignment_id"]) == (None, None)
+
+def test_second_sync_requests_only_newly_graded_submissions(canvas_stub, tmp_path):
+    url, stub = canvas_stub(courses=2, assignments=10)
+    store = SyncStateStore(str(tmp_path / "sync.db"))
+
+    async def sync_twice():
+        async with aiohttp.ClientSession() as session:
+            first = await CanvasDeltaSync(session, url, "tok", store).run("u1")
+            second = await CanvasDeltaSync(session, url, "tok", store).run("u1")
+            return first, second
+
+    first, second = asyncio.run(sync_twice())
+    store.close()
+
+    assert first["status"] == second["status"] == "ok"
+    assert first["delta"]["submissions"]["new"] == len(first["submissions"]) == 10
+    # Nothing was graded since the first sync, so the kept records count as unchanged
+    assert second["delta"]["submissions"] == {"new": 0, "updated": 0, "unchanged": 10, "stale": 0}
+    assert second["submissions"] == first["submissions"]
+
+def test_loaders_serve_the_synced_snapshot_after_a_background_sync(canvas_stub, tmp_path, monkeypatch):
+    url, stub = canvas_stub(courses=2, assignments=10)
+    store = SyncStateStore(str(tmp_path / "sync.db"))
+    cache = PerformanceCache()
+    monkeypatch.setattr(main, "sync_state_store", store)
+    monkeypatch.setattr(main, "canvas_http_cache", None)
+    monkeypatch.setattr(main, "performance_cache", cache)
+    user_id = f"u-{uuid.uuid4().hex}"
+
+    async def sync_then_reload():
+        async with aiohttp.ClientSession() as session:
+            await main.background_canvas_sync(user_id, url, "tok", session)
+            swapped = cache.get(user_id, "grades")["data"]
+            # What the warmer or a stale-while-revalidate refresh would load next
+            cache.invalidate(user_id)
+            entry, source = await cache.get_or_load_entry(
+                user_id, "grades", lambda: main.fetch_grades_from_db(user_id, session)
+            )
+            return swapped, entry["data"], source
+
+    swapped, reloaded, source = asyncio.run(sync_then_reload())
+    store.close()
+
+    assert len(swapped) == 10
+    assert source == "database"
+    assert reloaded == swapped
+    assert {grade["course"] for grade in reloaded} == {"Course 1", "Course 2"}
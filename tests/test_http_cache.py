@@ -0,0 +1,94 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from canvas_fetcher import CanvasDataFetcher
+from canvas_http_cache import HttpCache
+from http_cache import ConditionalResponseCache
+
+@asynccontextmanager
+async def serve(handler):
+    """Serve handler at /page on a free port; yields its URL"""
+    app = web.Application()
+    app.router.add_get("/page", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    try:
+        yield f"http://127.0.0.1:{runner.addresses[0][1]}/page"
+    finally:
+        await runner.cleanup()
+
+def test_fetcher_revalidates_unchanged_pages(canvas_stub, tmp_path):
+    url, stub = canvas_stub(assignments=25)
+    cache = HttpCache(str(tmp_path / "http.db"))
+
+    first = CanvasDataFetcher(url, "tok-304", verbose=False, http_cache=cache)
+    records = first.make_request("/api/v1/courses/1/assignments", {"per_page": 10})
+    second = CanvasDataFetcher(url, "tok-304", verbose=False, http_cache=cache)
+
+    assert second.make_request("/api/v1/courses/1/assignments", {"per_page": 10}) == records
+    assert stub.stats["not_modified"] == 3
+    assert cache.stats["not_modified"] == 3
+    assert cache.stats["bytes_saved"] == cache.stats["bytes_downloaded"]
+    cache.close()
+
+def test_entries_are_per_token(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.db"))
+    cache.save("https://canvas.test/api/v1/courses", [("per_page", "10")], "alice", {"ETag": '"a"'}, b"[1]", None)
+
+    assert cache.lookup("https://canvas.test/api/v1/courses", [("per_page", "10")], "alice")["body"] == b"[1]"
+    assert cache.lookup("https://canvas.test/api/v1/courses", [("per_page", "10")], "bob") is None
+    cache.close()
+
+def test_backend_cache_serves_304s_from_the_shared_store(canvas_stub, tmp_path):
+    url, stub = canvas_stub(assignments=5)
+    cache = ConditionalResponseCache(str(tmp_path / "http.db"))
+
+    async def fetch_twice():
+        async with aiohttp.ClientSession() as session:
+            first = await cache.get_page(session, f"{url}/api/v1/courses", [("per_page", "10")], "tok")
+            second = await cache.get_page(session, f"{url}/api/v1/courses", [("per_page", "10")], "tok")
+            return first, second
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert first == second
+    stats = cache.get_stats()
+    assert (stats["requests"], stats["not_modified"], stats["entries"]) == (2, 1, 1)
+    cache.close()
+
+def test_304_without_a_stored_body_is_refetched(tmp_path):
+    cache = ConditionalResponseCache(str(tmp_path / "http.db"))
+    seen = []
+
+    async def handler(request):
+        seen.append(request.headers.get("Cache-Control"))
+        if request.headers.get("Cache-Control") != "no-cache":
+            return web.Response(status=304)
+        return web.json_response([{"id": 1}], headers={"ETag": '"v1"'})
+
+    async def fetch():
+        async with serve(handler) as url, aiohttp.ClientSession() as session:
+            return await cache.get_page(session, url, [], "tok")
+
+    assert asyncio.run(fetch()) == ([{"id": 1}], None)
+    assert seen == [None, "no-cache"]
+    cache.close()
+
+def test_repeated_304_for_an_unconditional_request_fails(tmp_path):
+    cache = ConditionalResponseCache(str(tmp_path / "http.db"))
+
+    async def handler(request):
+        return web.Response(status=304)
+
+    async def fetch():
+        async with serve(handler) as url, aiohttp.ClientSession() as session:
+            return await cache.get_page(session, url, [], "tok")
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(fetch())
+    cache.close()
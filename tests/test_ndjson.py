@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from canvas_fetcher import AsyncCanvasDataFetcher, CanvasDataFetcher, NDJSONWriter, SyncState
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+@pytest.mark.parametrize("fetcher_class", [CanvasDataFetcher, AsyncCanvasDataFetcher])
+def test_streamed_output_matches_the_buffered_fetch(canvas_stub, tmp_path, fetcher_class):
+    url, stub = canvas_stub(courses=3, assignments=30)
+    expected = CanvasDataFetcher(url, "tok-ndjson", verbose=False).fetch_all_data()
+
+    path = str(tmp_path / "out.ndjson")
+    summary = fetcher_class(url, "tok-ndjson", verbose=False).stream_all_data(NDJSONWriter(path))
+    lines = read_lines(path)
+
+    records = {kind: [line["data"] for line in lines if line["type"] == kind] for kind in ("course", "assignment", "submission")}
+    assert records["course"] == expected["data"]["courses"]
+    assert sorted(a["id"] for a in records["assignment"]) == sorted(a["id"] for a in expected["data"]["assignments"])
+    assert len(records["submission"]) == len(expected["data"]["submissions"])
+
+    # The summary line comes last and carries the same analysis as the buffered fetch
+    assert lines[-1]["type"] == "summary"
+    assert lines[-1]["statistics"] == expected["statistics"] == summary["statistics"]
+    assert lines[-1]["analysis"]["grades"] == expected["analysis"]["grades"]
+    assert lines[-1]["analysis"]["assignments"]["total"] == expected["analysis"]["assignments"]["total"]
+
+def test_streaming_rejects_delta_sync(tmp_path):
+    fetcher = CanvasDataFetcher("https://canvas.test", "tok", verbose=False, sync_state=SyncState(str(tmp_path / "s.json")))
+    writer = NDJSONWriter(str(tmp_path / "out.ndjson"))
+
+    with pytest.raises(ValueError, match="delta sync"):
+        fetcher.stream_all_data(writer)
+    writer.close()
+
+def test_unfinished_stream_keeps_flushed_records(tmp_path):
+    path = str(tmp_path / "out.ndjson")
+    writer = NDJSONWriter(path)
+    writer.write("course", [{"id": 1}, {"id": 2}])
+
+    # Readable before close - no summary line yet
+    assert [line["data"]["id"] for line in read_lines(path)] == [1, 2]
+    writer.close({"statistics": {"courses": 2}})
+    assert read_lines(path)[-1] == {"type": "summary", "statistics": {"courses": 2}}
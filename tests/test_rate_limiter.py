@@ -0,0 +1,78 @@
+import gc
+import time
+
+import pytest
+
+from canvas_fetcher import AdaptiveRateLimiter, AsyncCanvasDataFetcher, CanvasDataFetcher
+
+def test_sync_and_async_fetchers_share_the_token_limiter():
+    sync_fetcher = CanvasDataFetcher("https://canvas.test", "tok-shared", verbose=False)
+    async_fetcher = AsyncCanvasDataFetcher("https://canvas.test", "tok-shared", verbose=False, concurrency=12)
+    other = CanvasDataFetcher("https://canvas.test", "tok-other", verbose=False)
+
+    assert sync_fetcher.rate_limiter is async_fetcher.rate_limiter
+    assert other.rate_limiter is not sync_fetcher.rate_limiter
+    # The async caller raised the token-wide ceiling; a smaller request never lowers it
+    assert AdaptiveRateLimiter.shared("tok-shared", max_concurrency=2).max_concurrency == 12
+
+def test_shared_limiter_is_dropped_once_unused():
+    limiter = AdaptiveRateLimiter.shared("tok-dropped")
+    limiter.remaining = 5.0
+    del limiter
+    gc.collect()
+
+    assert AdaptiveRateLimiter.shared("tok-dropped").remaining is None
+
+def learned(remaining, capacity=700.0, cost=20.0):
+    limiter = AdaptiveRateLimiter(max_concurrency=8, refill_rate=10.0)
+    limiter.release(200, {"X-Rate-Limit-Remaining": str(capacity), "X-Request-Cost": str(cost)})
+    limiter.release(200, {"X-Rate-Limit-Remaining": str(remaining), "X-Request-Cost": str(cost)})
+    return limiter
+
+def test_full_quota_runs_at_full_concurrency_back_to_back():
+    assert learned(remaining=700).limits() == (8, 0.0)
+
+def test_draining_quota_narrows_concurrency_and_spaces_requests():
+    concurrency, interval = learned(remaining=40).limits()
+
+    # Below the low-water mark: one request at a time, one refill of its cost apart
+    assert concurrency == 1
+    assert interval == pytest.approx(20.0 / 10.0)
+
+def test_concurrency_never_exceeds_what_the_quota_can_pay_for():
+    concurrency, _ = learned(remaining=300, cost=100).limits()
+
+    assert concurrency <= 3
+
+def test_throttle_waits_for_one_request_of_refill_and_blocks_everyone():
+    limiter = learned(remaining=700)
+    limiter.acquire()
+
+    delay = limiter.release(403, {"X-Rate-Limit-Remaining": "5", "X-Request-Cost": "0"}, "Rate Limit Exceeded")
+
+    # (cost 20 - 5 remaining) / 10 per second, plus jitter
+    assert 1.5 <= delay <= 1.5 * 1.25 + 0.05
+    assert limiter._reserve() > 1.0
+    assert limiter.cost == pytest.approx(20.0)  # throttled responses do not feed the estimates
+    assert limiter.stats["throttled"] == 1
+
+def test_throttle_without_quota_headers_backs_off_exponentially():
+    limiter = AdaptiveRateLimiter(backoff_base=1.0, backoff_cap=30.0)
+
+    delays = [limiter.release(429, {}) for _ in range(4)]
+
+    for attempt, delay in enumerate(delays):
+        assert 2 ** attempt / 2 <= delay <= 2 ** attempt
+
+def test_fetch_completes_against_a_throttling_server(canvas_stub):
+    url, stub = canvas_stub(courses=3, assignments=250, quota=100, refill=100, cost=10)
+    fetcher = AsyncCanvasDataFetcher(url, "tok-throttled", verbose=False, concurrency=8, rate=1000)
+
+    started = time.monotonic()
+    result = fetcher.fetch_all_data()
+
+    assert len(result["data"]["assignments"]) == 750
+    assert result["metadata"]["errors"] == []
+    # The limiter learns the quota and keeps throttled requests to a handful
+    assert stub.stats["throttled"] <= 5
+    assert time.monotonic() - started < 30
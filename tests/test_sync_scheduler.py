@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from sync_scheduler import SyncQueueFull, SyncScheduler
+
+class GatedRunner:
+    """Runner that records the jobs it starts and holds each until released"""
+
+    def __init__(self, results=None):
+        self.started = []
+        self.release = asyncio.Event()
+        self.results = results or {}
+
+    async def __call__(self, job):
+        self.started.append((job.user_id, job.canvas_token, job.priority))
+        await self.release.wait()
+        outcome = self.results.get(job.user_id, {"status": "ok"})
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+async def settle():
+    """Let the workers pick up and finish whatever they can"""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def test_repeat_requests_coalesce_into_the_queued_job():
+    async def main():
+        runner = GatedRunner()
+        scheduler = SyncScheduler(runner, workers=1)
+        await scheduler.start()
+        scheduler.submit("busy", "https://canvas.test", "t0")
+        await settle()
+
+        first, first_status = scheduler.submit("u1", "https://canvas.test", "t1", "periodic")
+        second, second_status = scheduler.submit("u1", "https://canvas.test", "t2", "interactive")
+        runner.release.set()
+        await settle()
+        await scheduler.stop()
+        return scheduler, runner, first, second, first_status, second_status
+
+    scheduler, runner, first, second, first_status, second_status = asyncio.run(main())
+
+    assert (first_status, second_status) == ("queued", "coalesced")
+    assert first is second and first.requests == 2
+    # The coalesced job runs once, with the newest token and the more urgent priority
+    assert runner.started == [("busy", "t0", "interactive"), ("u1", "t2", "interactive")]
+    assert first.state == "done" and first.canvas_token is None
+    assert scheduler.stats["coalesced"] == 1 and scheduler.stats["completed"] == 2
+
+def test_interactive_jobs_run_ahead_of_periodic_ones():
+    async def main():
+        runner = GatedRunner()
+        scheduler = SyncScheduler(runner, workers=1)
+        await scheduler.start()
+        scheduler.submit("busy", "https://canvas.test", "t0")
+        await settle()
+
+        scheduler.submit("periodic-1", "https://canvas.test", "t1", "periodic")
+        scheduler.submit("periodic-2", "https://canvas.test", "t2", "periodic")
+        scheduler.submit("interactive", "https://canvas.test", "t3", "interactive")
+        # Upgrading a queued periodic job moves it ahead of the other periodic one
+        scheduler.submit("periodic-2", "https://canvas.test", "t2", "interactive")
+        runner.release.set()
+        await settle()
+        await scheduler.stop()
+        return runner
+
+    runner = asyncio.run(main())
+
+    assert [user_id for user_id, _, _ in runner.started] == ["busy", "interactive", "periodic-2", "periodic-1"]
+
+def test_request_during_a_sync_queues_one_follow_up():
+    async def main():
+        runner = GatedRunner()
+        scheduler = SyncScheduler(runner, workers=4)
+        await scheduler.start()
+        scheduler.submit("u1", "https://canvas.test", "t1")
+        await settle()
+
+        follow_up, status = scheduler.submit("u1", "https://canvas.test", "t2")
+        scheduler.submit("u1", "https://canvas.test", "t3")
+        await settle()
+        # Free workers do not start a second sync for a user mid-sync
+        assert len(runner.started) == 1
+        assert scheduler.status("u1")["state"] == "running"
+        assert scheduler.status("u1")["queued"]["requests"] == 2
+
+        runner.release.set()
+        await settle()
+        await scheduler.stop()
+        return scheduler, runner, follow_up, status
+
+    scheduler, runner, follow_up, status = asyncio.run(main())
+
+    assert status == "queued"
+    assert runner.started == [("u1", "t1", "interactive"), ("u1", "t3", "interactive")]
+    assert follow_up.state == "done"
+    assert scheduler.status("u1")["last"]["requests"] == 2
+
+def test_partial_and_failed_results_are_recorded():
+    async def main():
+        runner = GatedRunner({"partial": {"status": "partial"}, "broken": RuntimeError("canvas down")})
+        runner.release.set()
+        scheduler = SyncScheduler(runner, workers=2)
+        await scheduler.start()
+        partial, _ = scheduler.submit("partial", "https://canvas.test", "t1")
+        broken, _ = scheduler.submit("broken", "https://canvas.test", "t2")
+        await settle()
+        await scheduler.stop()
+        return scheduler, partial, broken
+
+    scheduler, partial, broken = asyncio.run(main())
+
+    assert partial.state == "partial"
+    assert (broken.state, broken.error) == ("failed", "canvas down")
+    assert scheduler.stats["partial"] == 1 and scheduler.stats["failed"] == 1
+
+def test_full_queue_rejects_new_users_but_still_coalesces():
+    async def main():
+        scheduler = SyncScheduler(GatedRunner(), workers=1, max_queued=1)
+        await scheduler.start()
+        scheduler.submit("u1", "https://canvas.test", "t1")
+        await settle()
+        scheduler.submit("u2", "https://canvas.test", "t2")
+        with pytest.raises(SyncQueueFull):
+            scheduler.submit("u3", "https://canvas.test", "t3")
+        _, status = scheduler.submit("u2", "https://canvas.test", "t2")
+        with pytest.raises(ValueError):
+            scheduler.submit("u2", "https://canvas.test", "t2", "urgent")
+        await scheduler.stop()
+        return scheduler, status
+
+    scheduler, status = asyncio.run(main())
+
+    assert status == "coalesced"
+    assert scheduler.stats["rejected"] == 1